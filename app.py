@@ -25,14 +25,11 @@ ensure_init_files()
 
 # Import backend services
 try:
-    from backend.services.physics_service import PhysicsService
-    from backend.services.lesson_storage import LessonStorage
-    from backend.services.multi_llm_service import MultiLLMService
-    from backend.services.rag_service import PhysicsRAG
+    from backend.services.container import get_container
     from frontend.utils.styling import load_css, apply_lesson_mode_styling
     
     # Import frontend modules
-    from frontend.utils.session import initialize_session_state
+    from frontend.utils.session import initialize_session_state, initialize_session_services
     from frontend.components.sidebar import render_sidebar
     from frontend.pages.about import render_about_page
     from frontend.pages.how_to_use import render_how_to_use_page
@@ -47,15 +44,13 @@ except ImportError as e:
 
 def main():
     """Main function to run the PhysicsAI Streamlit app."""
-    # Initialize services
-    llm_service = MultiLLMService()
-    lesson_storage = LessonStorage()
-    physics_service = PhysicsService()
-    rag_service = PhysicsRAG()
-    
     # Initialize session state
     initialize_session_state()
     
+    # Shared services are built once per process; the LLM service holding this
+    # session's API keys and model selection lives in the session state
+    llm_service, physics_service = initialize_session_services(get_container())
+    
     # Only show title on the browse, about, and how_to_use pages
     if st.session_state.mode in ['browse', 'about', 'how_to_use']:
         st.title("Physics Learning Assistant")
@@ -68,7 +63,7 @@ def main():
         apply_lesson_mode_styling()
     
     # Render the sidebar
-    render_sidebar(llm_service, physics_service, rag_service)
+    render_sidebar(llm_service)
     
     # Render the appropriate page based on the current mode
     if st.session_state.mode == 'about':
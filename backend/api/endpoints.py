@@ -1,9 +1,12 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from backend.services.llm_service import generate_response
-from backend.services.llm_service import generate_response, text_to_speech
+from backend.services.llm_service import generate_response, text_to_speech, stream_response
 from backend.services.speech_service import recognize_speech_from_mic
 import uuid  
+import json
+import base64
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -33,6 +36,30 @@ async def handle_query(request: dict):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Streaming query endpoint: server-sent events with the response text as it is generated
+# and, if voice is enabled, "audio" events with base64 MP3 for each sentence in order
+@router.post("/query/stream/")
+async def handle_query_stream(request: dict):
+    input_text = request.get("input_text")
+    voice_enabled = request.get("voice_enabled", True)  # Default to True if not specified
+    if not input_text:
+        raise HTTPException(status_code=400, detail="Input text is required.")
+
+    async def events():
+        async for kind, value in stream_response(input_text, session_id="default", voice_enabled=voice_enabled):
+            if kind == "text":
+                yield f"data: {json.dumps({'text': value})}\n\n"
+            else:
+                yield f"event: audio\ndata: {json.dumps({'audio': base64.b64encode(value).decode('ascii')})}\n\n"
+        yield "event: done\ndata: {}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/speech_input/")
 async def handle_speech_input():
     try:
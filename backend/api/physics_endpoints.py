@@ -3,15 +3,20 @@ Endpoints for the physics learning system.
 """
 
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Dict, Optional
+import json
+import base64
 import logging
-import os
-from ..services.physics_service import PhysicsService
-from ..services.speech_service import text_to_speech
+from ..services.container import get_container
+from ..services.speech_preprocessing import preprocess_math_for_speech
+from ..services.voice_pipeline import stream_with_speech
 
 router = APIRouter(prefix="/physics")
-physics_service = PhysicsService()
+# Uses the shared RAG service and lesson storage, with API keys from the environment
+physics_service = get_container().create_physics_service()
+narration = get_container().narration
 
 class TopicRequest(BaseModel):
     chapter_number: int
@@ -20,6 +25,10 @@ class LessonRequest(BaseModel):
     topic: str
     voice_enabled: bool = True
 
+class SlideAudioRequest(BaseModel):
+    topic: str
+    slide_index: int
+
 class QuestionRequest(BaseModel):
     question: str
     topic: str
@@ -45,6 +54,19 @@ async def get_cached_lessons():
         logging.error(f"Error retrieving cached lessons: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/answer-cache/stats/")
+async def get_answer_cache_stats():
+    """Get hit-rate metrics of the semantic answer cache."""
+    answer_cache = physics_service.rag_service.answer_cache
+    if answer_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **answer_cache.get_stats()}
+
+@router.get("/audio-store/stats/")
+async def get_audio_store_stats():
+    """Get usage metrics of the audio store."""
+    return narration.audio_store.get_stats()
+
 @router.post("/topics/")
 async def get_topics(request: TopicRequest):
     """Get topics for a specific chapter."""
@@ -56,40 +78,27 @@ async def get_topics(request: TopicRequest):
 
 @router.post("/lesson/")
 async def generate_lesson(request: LessonRequest):
-    """Generate a lesson for a specific topic."""
+    """Generate a lesson for a specific topic.
+    
+    The lesson is returned with its slides. With voice enabled, every slide is
+    synthesized in the background and the audio of the first slide is returned;
+    the other slides' audio is fetched from /lesson/slide-audio/.
+    """
     try:
-        # Create a safe filename from the topic for audio caching
-        safe_topic = "".join(c if c.isalnum() else "_" for c in request.topic)
-        audio_cache_dir = "backend/audio/cache"
-        os.makedirs(audio_cache_dir, exist_ok=True)
-        audio_cache_path = os.path.join(audio_cache_dir, f"{safe_topic}.mp3")
-        
         # Get the lesson (either from cache or generate new)
         lesson = await physics_service.generate_lesson(request.topic)
+        slides = await physics_service.get_lesson_slides(request.topic, lesson)
         
         # Generate audio if enabled
         audio_path = None
-        if request.voice_enabled:
-            try:
-                # Check if audio is already cached
-                if os.path.exists(audio_cache_path):
-                    logging.info(f"Using cached audio for topic: {request.topic}")
-                    audio_path = audio_cache_path
-                else:
-                    logging.info(f"Generating new audio for topic: {request.topic}")
-                    audio_content = text_to_speech(lesson)
-                    
-                    # Save audio content to cache
-                    with open(audio_cache_path, "wb") as f:
-                        f.write(audio_content)
-                    audio_path = audio_cache_path
-            except Exception as audio_error:
-                logging.error(f"Error generating audio: {str(audio_error)}")
-                # Continue without audio if there's an error
+        if request.voice_enabled and slides:
+            narration.prefetch(slides)
+            audio_path = await narration.synthesize(slides[0]['speech'])
         
         logging.info(f"Returning lesson response for topic: {request.topic}")
         return {
             "lesson": lesson,
+            "slides": slides,
             "audio_file": audio_path
         }
     except Exception as e:
@@ -98,6 +107,21 @@ async def generate_lesson(request: LessonRequest):
         logging.error(f"Traceback: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/lesson/slide-audio/")
+async def get_slide_audio(request: SlideAudioRequest):
+    """Get the audio of one slide of a lesson, waiting for it if it is still being synthesized."""
+    slides = await physics_service.get_lesson_slides(request.topic)
+    if not 0 <= request.slide_index < len(slides):
+        raise HTTPException(status_code=404, detail=f"Slide {request.slide_index} not found")
+    
+    # Keep the slides after this one coming
+    narration.prefetch(slides[request.slide_index:])
+    audio_path = await narration.synthesize(slides[request.slide_index]['speech'])
+    return {
+        "audio_file": audio_path,
+        "slide_count": len(slides)
+    }
+
 @router.post("/question/")
 async def answer_question(request: QuestionRequest):
     """Answer a question about a specific topic."""
@@ -114,12 +138,7 @@ async def answer_question(request: QuestionRequest):
         # Generate audio if enabled
         audio_path = None
         if request.voice_enabled:
-            audio_content = text_to_speech(answer)
-            # Save audio content
-            os.makedirs("backend/audio", exist_ok=True)
-            audio_path = os.path.join("backend/audio", "answer.mp3")
-            with open(audio_path, "wb") as f:
-                f.write(audio_content)
+            audio_path = await narration.synthesize(preprocess_math_for_speech(answer))
         
         return {
             "answer": answer,
@@ -127,3 +146,58 @@ async def answer_question(request: QuestionRequest):
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/question/stream/")
+async def stream_answer(request: QuestionRequest):
+    """Answer a question about a specific topic as a stream of server-sent events.
+    
+    Each event carries a JSON-encoded chunk of the answer ({"text": ...}); the
+    stream ends with a "done" event.
+    """
+    # Convert chat history to the format expected by the service
+    chat_history = [(msg["user"], msg["assistant"]) for msg in request.chat_history]
+    provider = physics_service.llm_service.active_provider
+    model = physics_service.llm_service.active_model
+    
+    async def events():
+        async for chunk in physics_service.stream_answer(request.question, request.topic, chat_history, provider, model):
+            yield f"data: {json.dumps({'text': chunk})}\n\n"
+        yield "event: done\ndata: {}\n\n"
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/question/voice-stream/")
+async def stream_spoken_answer(request: QuestionRequest):
+    """Answer a question as a stream of server-sent events that also speaks the answer.
+    
+    Text chunks arrive as in /question/stream/. Each sentence is synthesized as
+    soon as it is complete, and its audio follows as an "audio" event carrying
+    base64-encoded MP3 ({"audio": ...}), in sentence order. The stream ends
+    with a "done" event.
+    """
+    chat_history = [(msg["user"], msg["assistant"]) for msg in request.chat_history]
+    provider = physics_service.llm_service.active_provider
+    model = physics_service.llm_service.active_model
+    speech_service = narration.speech_service
+    
+    async def synthesize(text):
+        return await speech_service.synthesize(text, narration.voice, narration.model)
+    
+    async def events():
+        chunks = physics_service.stream_answer(request.question, request.topic, chat_history, provider, model)
+        async for kind, value in stream_with_speech(chunks, synthesize):
+            if kind == "text":
+                yield f"data: {json.dumps({'text': value})}\n\n"
+            else:
+                yield f"event: audio\ndata: {json.dumps({'audio': base64.b64encode(value).decode('ascii')})}\n\n"
+        yield "event: done\ndata: {}\n\n"
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -5,12 +5,16 @@ Endpoints for the RAG-based physics learning system.
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import List, Dict, Optional
-from ..services.rag_service import PhysicsRAG
-from ..services.speech_service import text_to_speech
+from ..services.container import get_container
+from ..services.slides import build_slides
+from ..services.speech_preprocessing import preprocess_math_for_speech
 import os
 
 router = APIRouter(prefix="/rag")
-rag_service = PhysicsRAG()
+# Shared with the physics endpoints and the Streamlit app running in the same process
+rag_service = get_container().rag_service
+# Audio is kept in the shared audio store, so concurrent requests never overwrite each other's files
+narration = get_container().narration
 
 # Initialize the vector store with physics content
 PHYSICS_CONTENT_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "physics_content")
@@ -56,12 +60,11 @@ async def generate_lesson(request: LessonRequest):
         # Generate audio if enabled
         audio_path = None
         if request.voice_enabled:
-            audio_content = text_to_speech(lesson)
-            # Save audio content
-            os.makedirs("backend/audio", exist_ok=True)
-            audio_path = os.path.join("backend/audio", "lesson.mp3")
-            with open(audio_path, "wb") as f:
-                f.write(audio_content)
+            # Narrated per slide, like /physics/lesson/: the first slide now, the rest in the background
+            slides = build_slides(lesson)
+            if slides:
+                narration.prefetch(slides)
+                audio_path = await narration.synthesize(slides[0]['speech'])
         
         return {
             "lesson": lesson,
@@ -77,7 +80,7 @@ async def answer_question(request: QuestionRequest):
         # Convert chat history to the format expected by the RAG service
         chat_history = [(msg["user"], msg["assistant"]) for msg in request.chat_history]
         
-        answer = rag_service.answer_question(
+        answer = await rag_service.answer_question(
             request.question,
             request.topic,
             chat_history
@@ -86,12 +89,7 @@ async def answer_question(request: QuestionRequest):
         # Generate audio if enabled
         audio_path = None
         if request.voice_enabled:
-            audio_content = text_to_speech(answer)
-            # Save audio content
-            os.makedirs("backend/audio", exist_ok=True)
-            audio_path = os.path.join("backend/audio", "answer.mp3")
-            with open(audio_path, "wb") as f:
-                f.write(audio_content)
+            audio_path = await narration.synthesize(preprocess_math_for_speech(answer))
         
         return {
             "answer": answer,
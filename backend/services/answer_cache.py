@@ -0,0 +1,162 @@
+"""
+Semantic cache of answers to student questions.
+
+Answers are stored in SQLite together with the L2-normalized embedding of the
+normalized question. A new question reuses a cached answer when an entry for
+the same topic, model and chat history has a cosine similarity above the
+threshold and has not expired, so rephrasings of a common question ("what is
+the work-energy theorem?") are answered without an LLM call.
+"""
+
+import re
+import time
+import json
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+def normalize_question(question: str) -> str:
+    """Normalize a question for embedding: lowercase, collapsed whitespace, no trailing punctuation."""
+    return re.sub(r'\s+', ' ', question.lower()).strip().rstrip('?!. ')
+
+def hash_chat_history(chat_history: Optional[List[Tuple[str, str]]]) -> str:
+    """Hash a chat history; an empty history hashes to the empty string."""
+    if not chat_history:
+        return ""
+    raw = json.dumps([list(exchange) for exchange in chat_history], ensure_ascii=False)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+def _numbers(text: str) -> List[str]:
+    return re.findall(r'\d+(?:\.\d+)?', text)
+
+class SemanticAnswerCache:
+    """SQLite-backed cache of answers, looked up by question similarity."""
+
+    def __init__(self, db_path: str, similarity_threshold: float = 0.95,
+                 ttl: float = 7 * 24 * 3600, max_entries: int = 10000):
+        """Open (or create) the answer cache.
+
+        Args:
+            db_path: Path to the SQLite database file
+            similarity_threshold: Minimum cosine similarity for a cached answer to be reused
+            ttl: Seconds after which an entry expires
+            max_entries: Maximum number of entries before the oldest are removed
+        """
+        self.db_path = db_path
+        self.similarity_threshold = similarity_threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS answers (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                topic TEXT NOT NULL,
+                model TEXT NOT NULL,
+                history_hash TEXT NOT NULL,
+                question TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                answer TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )"""
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS answers_key ON answers (topic, model, history_hash)")
+        self.conn.commit()
+
+    @staticmethod
+    def _normalize_vector(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype='float32').ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def lookup(self, topic: str, model: str, question: str, embedding,
+               history_hash: str = "") -> Optional[str]:
+        """Find a cached answer to a similar question.
+
+        Questions that mention different numbers (e.g. "Problem 2" and
+        "Problem 3") never match, however similar their embeddings are.
+
+        Args:
+            topic: Normalized topic the question is about
+            model: Model the answer was generated with
+            question: The normalized question
+            embedding: Embedding of the normalized question
+            history_hash: Hash of the chat history (see hash_chat_history)
+
+        Returns:
+            The cached answer, or None on a miss
+        """
+        vector = self._normalize_vector(embedding)
+        numbers = _numbers(question)
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT question, embedding, answer FROM answers "
+                "WHERE topic = ? AND model = ? AND history_hash = ? AND created_at > ?",
+                (topic, model, history_hash, time.time() - self.ttl)
+            ).fetchall()
+
+            best_answer = None
+            best_similarity = self.similarity_threshold
+            for cached_question, blob, answer in rows:
+                cached = np.frombuffer(blob, dtype='float32')
+                if cached.shape != vector.shape or _numbers(cached_question) != numbers:
+                    continue
+                similarity = float(np.dot(cached, vector))
+                if similarity >= best_similarity:
+                    best_answer = answer
+                    best_similarity = similarity
+
+            if best_answer is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                logging.info(f"Answer cache hit for topic '{topic}' (similarity: {best_similarity:.3f})")
+            return best_answer
+
+    def store(self, topic: str, model: str, question: str, embedding, answer: str,
+              history_hash: str = "") -> None:
+        """Cache an answer, removing expired entries and the oldest ones beyond max_entries."""
+        vector = self._normalize_vector(embedding)
+        now = time.time()
+        with self._lock:
+            self.conn.execute(
+                "INSERT INTO answers (topic, model, history_hash, question, embedding, answer, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (topic, model, history_hash, question, vector.tobytes(), answer, now)
+            )
+            self.conn.execute("DELETE FROM answers WHERE created_at <= ?", (now - self.ttl,))
+            self.conn.execute(
+                "DELETE FROM answers WHERE id NOT IN (SELECT id FROM answers ORDER BY created_at DESC LIMIT ?)",
+                (self.max_entries,)
+            )
+            self.conn.commit()
+            self.stores += 1
+
+    def clear(self) -> None:
+        """Remove all cached answers."""
+        with self._lock:
+            self.conn.execute("DELETE FROM answers")
+            self.conn.commit()
+
+    def get_stats(self) -> Dict[str, float]:
+        """Get hit/miss counters, the hit rate and the number of entries."""
+        with self._lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'stores': self.stores,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            'entries': entries,
+            'similarity_threshold': self.similarity_threshold,
+            'ttl': self.ttl
+        }
@@ -0,0 +1,181 @@
+"""
+Bounded, content-addressed store of synthesized audio.
+
+Every clip is stored under the sha256 of what produced it (voice, model and
+normalized text), so identical requests share one file and concurrent users
+never overwrite each other's audio. Files are written to a temporary file and
+renamed into place, so readers never see a partial clip. The total size is
+capped: once it is exceeded the least recently used clips are deleted, as are
+clips that have not been used for max_age seconds. Last use is recorded in the
+file's modification time, so the LRU order survives restarts. Processes
+sharing the directory each keep their own index, so the directory is rescanned
+(sizes and modification times) before every eviction pass: the cap applies to
+the clips of all processes, not only those this process has seen.
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+
+from config.settings import AUDIO_CACHE_DIR, AUDIO_CACHE_MAX_BYTES, AUDIO_CACHE_MAX_AGE
+
+# Temporary files older than this are left over from interrupted writes
+_STALE_TMP_SECONDS = 3600
+
+def normalize_speech_text(text: str) -> str:
+    """Collapse whitespace, so reformatting a text does not change its audio key."""
+    return " ".join(text.split())
+
+def audio_key(text: str, voice: str, model: str) -> str:
+    """Get the content-addressed key of the audio for a text."""
+    payload = json.dumps([voice, model, normalize_speech_text(text)])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class AudioStore:
+    """Disk-backed LRU store of MP3 clips with a byte cap."""
+
+    def __init__(self, root_dir: str = AUDIO_CACHE_DIR, max_bytes: int = AUDIO_CACHE_MAX_BYTES,
+                 max_age: Optional[float] = AUDIO_CACHE_MAX_AGE):
+        """Initialize the audio store.
+
+        Args:
+            root_dir: Directory holding the clips
+            max_bytes: Maximum total size of the clips
+            max_age: Seconds after its last use that a clip is deleted (None keeps clips until evicted by size)
+        """
+        self.root_dir = Path(root_dir)
+        self.root_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        # Key -> (size, last use), ordered from least to most recently used
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self._lock = threading.Lock()
+
+        self._load()
+
+    def _load(self) -> None:
+        """Index the clips already on disk and remove leftovers of interrupted writes."""
+        with self._lock:
+            self._scan(remove_stale=True)
+            self._evict()
+
+    def _scan(self, remove_stale: bool = False) -> None:
+        """Rebuild the index from the clips on disk, ordered by last use. Call with the lock held."""
+        clips = []
+        now = time.time()
+        for path in self.root_dir.iterdir():
+            try:
+                if path.suffix == ".mp3":
+                    stat = path.stat()
+                    clips.append((stat.st_mtime, path.stem, stat.st_size))
+                elif remove_stale and path.suffix == ".tmp" and now - path.stat().st_mtime > _STALE_TMP_SECONDS:
+                    path.unlink()
+            except OSError:
+                # Removed by another process in the meantime
+                continue
+
+        self.entries = OrderedDict((key, (size, last_use)) for last_use, key, size in sorted(clips))
+        self.total_bytes = sum(size for _, _, size in clips)
+
+    def path(self, key: str) -> Path:
+        """The path a clip is stored at."""
+        return self.root_dir / f"{key}.mp3"
+
+    def get(self, key: str) -> Optional[str]:
+        """Get the path of a clip, marking it as recently used.
+
+        Returns:
+            The path, or None if the clip is not stored
+        """
+        path = self.path(key)
+        now = time.time()
+        with self._lock:
+            entry = self.entries.pop(key, None)
+            try:
+                # Clips are also written and evicted by other processes sharing the directory
+                os.utime(path, (now, now))
+                size = entry[0] if entry else path.stat().st_size
+            except OSError:
+                if entry:
+                    self.total_bytes -= entry[0]
+                self.misses += 1
+                return None
+            if entry is None:
+                self.total_bytes += size
+            self.entries[key] = (size, now)
+            self.hits += 1
+        return str(path)
+
+    def put(self, key: str, audio: bytes) -> str:
+        """Store a clip atomically and evict clips beyond the size cap.
+
+        Returns:
+            The path of the clip
+        """
+        path = self.path(key)
+        fd, tmp_path = tempfile.mkstemp(dir=self.root_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(audio)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+        with self._lock:
+            self.writes += 1
+            # Other processes may have added clips this one has not seen
+            self._scan()
+            self._evict(keep=key)
+        return str(path)
+
+    def prune(self) -> None:
+        """Delete expired clips and clips beyond the size cap."""
+        with self._lock:
+            self._scan()
+            self._evict()
+
+    def _evict(self, keep: str = None) -> None:
+        """Delete the least recently used clips until the store is within its limits."""
+        expired_before = time.time() - self.max_age if self.max_age is not None else None
+        while self.entries:
+            key, (size, last_use) = next(iter(self.entries.items()))
+            expired = expired_before is not None and last_use < expired_before
+            if key == keep or (self.total_bytes <= self.max_bytes and not expired):
+                break
+            del self.entries[key]
+            self.total_bytes -= size
+            self.evictions += 1
+            try:
+                # Readers that already opened the file keep reading it
+                self.path(key).unlink()
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logging.warning(f"Error deleting audio clip {key}: {str(e)}")
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get hit/miss counters and the current size of the store."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'writes': self.writes,
+                'evictions': self.evictions,
+                'entries': len(self.entries),
+                'bytes': self.total_bytes,
+                'max_bytes': self.max_bytes
+            }
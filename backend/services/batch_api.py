@@ -0,0 +1,264 @@
+"""
+Provider-agnostic offline batch submission.
+
+Offline work such as regenerating every lesson has no latency needs, so it can
+go through the providers' batch APIs, which are cheaper and have separate rate
+limits, instead of one chat request per topic. Requests are written as JSONL
+payloads, submitted as one batch, polled until the batch ends and their
+results collected by custom ID. LocalBatchBackend is a file-based stand-in
+that answers batches with a local function, for tests and dry runs.
+"""
+
+import io
+import os
+import json
+import uuid
+import logging
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from backend.services.multi_llm_service import GenerationConfig
+
+# Normalized batch states
+IN_PROGRESS = "in_progress"
+COMPLETED = "completed"
+FAILED = "failed"
+
+@dataclass(frozen=True)
+class BatchRequest:
+    """One request in a batch. Messages are in OpenAI chat format."""
+    custom_id: str
+    messages: List[Dict[str, str]]
+    config: GenerationConfig
+
+@dataclass(frozen=True)
+class BatchResult:
+    """The outcome of one request: the generated text or an error."""
+    custom_id: str
+    text: Optional[str] = None
+    error: Optional[str] = None
+
+def _value(value):
+    return getattr(value, 'value', value)
+
+def chat_completion_body(request: BatchRequest) -> Dict:
+    """Build the OpenAI chat completion request body for a batch request."""
+    body = {
+        'model': _value(request.config.model),
+        'messages': request.messages,
+        'temperature': request.config.temperature
+    }
+    if request.config.max_tokens:
+        body['max_tokens'] = request.config.max_tokens
+    return body
+
+def to_jsonl(lines: List[Dict]) -> str:
+    """Serialize payload lines as JSONL."""
+    return "".join(json.dumps(line, ensure_ascii=False) + "\n" for line in lines)
+
+class BatchBackend(ABC):
+    """Interface of a batch API."""
+
+    @abstractmethod
+    def build_payload(self, requests: List[BatchRequest]) -> List[Dict]:
+        """Build the provider's payload lines for the requests."""
+
+    @abstractmethod
+    def submit(self, requests: List[BatchRequest]) -> str:
+        """Submit requests as one batch.
+
+        Returns:
+            The batch ID
+        """
+
+    @abstractmethod
+    def status(self, batch_id: str) -> str:
+        """Get the normalized state of a batch (IN_PROGRESS, COMPLETED or FAILED)."""
+
+    @abstractmethod
+    def results(self, batch_id: str) -> Dict[str, BatchResult]:
+        """Get the results of a finished batch by custom ID."""
+
+class OpenAIBatchBackend(BatchBackend):
+    """OpenAI Batch API (JSONL input file, /v1/chat/completions)."""
+
+    def __init__(self, client, completion_window: str = "24h"):
+        """Initialize the backend.
+
+        Args:
+            client: A synchronous openai.OpenAI client
+            completion_window: Time the provider has to finish the batch
+        """
+        self.client = client
+        self.completion_window = completion_window
+
+    def build_payload(self, requests: List[BatchRequest]) -> List[Dict]:
+        return [
+            {
+                'custom_id': request.custom_id,
+                'method': 'POST',
+                'url': '/v1/chat/completions',
+                'body': chat_completion_body(request)
+            }
+            for request in requests
+        ]
+
+    def submit(self, requests: List[BatchRequest]) -> str:
+        payload = to_jsonl(self.build_payload(requests)).encode('utf-8')
+        input_file = self.client.files.create(file=("batch.jsonl", io.BytesIO(payload)), purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window=self.completion_window
+        )
+        return batch.id
+
+    def status(self, batch_id: str) -> str:
+        state = self.client.batches.retrieve(batch_id).status
+        if state == "completed":
+            return COMPLETED
+        if state in ("failed", "expired", "cancelled"):
+            # Expired and cancelled batches may still have partial results
+            return FAILED
+        return IN_PROGRESS
+
+    def results(self, batch_id: str) -> Dict[str, BatchResult]:
+        batch = self.client.batches.retrieve(batch_id)
+        results = {}
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            for line in self.client.files.content(file_id).text.splitlines():
+                if line.strip():
+                    result = parse_chat_completion_result(json.loads(line))
+                    results[result.custom_id] = result
+        return results
+
+def parse_chat_completion_result(line: Dict) -> BatchResult:
+    """Parse a line of an OpenAI batch output or error file."""
+    custom_id = line['custom_id']
+    response = line.get('response') or {}
+    if line.get('error') or response.get('status_code') != 200:
+        error = line.get('error') or response.get('body', {}).get('error') or f"HTTP {response.get('status_code')}"
+        return BatchResult(custom_id, error=json.dumps(error) if isinstance(error, dict) else str(error))
+    return BatchResult(custom_id, text=response['body']['choices'][0]['message']['content'].strip())
+
+class AnthropicBatchBackend(BatchBackend):
+    """Anthropic Message Batches API."""
+
+    def __init__(self, client):
+        """Initialize the backend.
+
+        Args:
+            client: A synchronous anthropic.Anthropic client
+        """
+        self.client = client
+
+    def build_payload(self, requests: List[BatchRequest]) -> List[Dict]:
+        payload = []
+        for request in requests:
+            system_messages = [msg['content'] for msg in request.messages if msg.get('role') == 'system']
+            params = {
+                'model': _value(request.config.model),
+                'max_tokens': request.config.max_tokens or 4000,  # Anthropic requires max_tokens
+                'temperature': request.config.temperature,
+                'messages': [msg for msg in request.messages if msg.get('role') != 'system']
+            }
+            if system_messages:
+                params['system'] = system_messages[0]
+            payload.append({'custom_id': request.custom_id, 'params': params})
+        return payload
+
+    def submit(self, requests: List[BatchRequest]) -> str:
+        return self.client.messages.batches.create(requests=self.build_payload(requests)).id
+
+    def status(self, batch_id: str) -> str:
+        # Anthropic batches end as a whole; failures are reported per request
+        if self.client.messages.batches.retrieve(batch_id).processing_status == "ended":
+            return COMPLETED
+        return IN_PROGRESS
+
+    def results(self, batch_id: str) -> Dict[str, BatchResult]:
+        results = {}
+        for entry in self.client.messages.batches.results(batch_id):
+            if entry.result.type == "succeeded":
+                text = "".join(block.text for block in entry.result.message.content if block.type == "text")
+                results[entry.custom_id] = BatchResult(entry.custom_id, text=text)
+            else:
+                error = getattr(entry.result, 'error', None)
+                results[entry.custom_id] = BatchResult(entry.custom_id, error=str(error or entry.result.type))
+        return results
+
+class LocalBatchBackend(BatchBackend):
+    """File-based stand-in for a batch API.
+
+    Batches are written to a directory in the OpenAI payload format and answered
+    by a local function the first time their status is polled.
+    """
+
+    def __init__(self, batch_dir: str, respond: Optional[Callable[[Dict], str]] = None):
+        """Initialize the backend.
+
+        Args:
+            batch_dir: Directory to keep batch input, output and status files in
+            respond: Function from a chat completion request body to the response
+                text; raising marks the request as failed. Defaults to echoing
+                the last message.
+        """
+        self.batch_dir = batch_dir
+        self.respond = respond or (lambda body: f"Local response to: {body['messages'][-1]['content']}")
+        os.makedirs(batch_dir, exist_ok=True)
+
+    def _path(self, batch_id: str, name: str) -> str:
+        return os.path.join(self.batch_dir, batch_id, name)
+
+    def build_payload(self, requests: List[BatchRequest]) -> List[Dict]:
+        return OpenAIBatchBackend(client=None).build_payload(requests)
+
+    def submit(self, requests: List[BatchRequest]) -> str:
+        batch_id = f"local-batch-{uuid.uuid4().hex[:12]}"
+        os.makedirs(os.path.join(self.batch_dir, batch_id))
+        with open(self._path(batch_id, "input.jsonl"), 'w') as f:
+            f.write(to_jsonl(self.build_payload(requests)))
+        self._write_status(batch_id, IN_PROGRESS)
+        return batch_id
+
+    def _write_status(self, batch_id: str, state: str) -> None:
+        tmp_path = self._path(batch_id, "status.json.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump({'status': state}, f)
+        os.replace(tmp_path, self._path(batch_id, "status.json"))
+
+    def _process(self, batch_id: str) -> None:
+        """Answer every request in the batch and write the output file."""
+        output = []
+        with open(self._path(batch_id, "input.jsonl"), 'r') as f:
+            for line in f:
+                request = json.loads(line)
+                try:
+                    content = self.respond(request['body'])
+                    response = {'status_code': 200, 'body': {'choices': [{'message': {'role': 'assistant', 'content': content}}]}}
+                    output.append({'custom_id': request['custom_id'], 'response': response, 'error': None})
+                except Exception as e:
+                    logging.error(f"Local batch request {request['custom_id']} failed: {str(e)}")
+                    output.append({'custom_id': request['custom_id'], 'response': None, 'error': {'message': str(e)}})
+        with open(self._path(batch_id, "output.jsonl"), 'w') as f:
+            f.write(to_jsonl(output))
+        self._write_status(batch_id, COMPLETED)
+
+    def status(self, batch_id: str) -> str:
+        with open(self._path(batch_id, "status.json"), 'r') as f:
+            state = json.load(f)['status']
+        if state == IN_PROGRESS:
+            self._process(batch_id)
+            state = COMPLETED
+        return state
+
+    def results(self, batch_id: str) -> Dict[str, BatchResult]:
+        results = {}
+        with open(self._path(batch_id, "output.jsonl"), 'r') as f:
+            for line in f:
+                result = parse_chat_completion_result(json.loads(line))
+                results[result.custom_id] = result
+        return results
@@ -0,0 +1,101 @@
+"""
+Process-wide service container.
+
+Services that are expensive to build and hold no per-user state (the corpus
+snapshot, the RAG index, the lesson storage, the audio store and the narration
+service) are created lazily on first use and shared by every Streamlit
+session, rerun and API request in the process. Per-user state such as API keys and the selected model lives in a
+MultiLLMService owned by each session and is passed in explicitly.
+"""
+
+import logging
+import threading
+from typing import Optional
+
+from config.settings import PHYSICS_CONTENT_DIR
+from backend.services.corpus import CorpusSnapshot, get_corpus
+
+class ServiceContainer:
+    """Lazily constructed, shared service instances."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._rag_service = None
+        self._lesson_storage = None
+        self._audio_store = None
+        self._narration = None
+
+    @property
+    def corpus(self) -> CorpusSnapshot:
+        """The shared snapshot of the physics content directory."""
+        return get_corpus(str(PHYSICS_CONTENT_DIR))
+
+    @property
+    def rag_service(self):
+        """The shared PhysicsRAG instance, built (and its index loaded) on first use."""
+        if self._rag_service is None:
+            with self._lock:
+                if self._rag_service is None:
+                    from backend.services.rag_service import PhysicsRAG
+                    logging.info("Initializing shared RAG service")
+                    self._rag_service = PhysicsRAG()
+        return self._rag_service
+
+    @property
+    def lesson_storage(self):
+        """The shared LessonStorage instance."""
+        if self._lesson_storage is None:
+            with self._lock:
+                if self._lesson_storage is None:
+                    from backend.services.lesson_storage import LessonStorage
+                    self._lesson_storage = LessonStorage()
+        return self._lesson_storage
+
+    @property
+    def audio_store(self):
+        """The shared AudioStore, so every endpoint stays within one size cap."""
+        if self._audio_store is None:
+            with self._lock:
+                if self._audio_store is None:
+                    from backend.services.audio_store import AudioStore
+                    self._audio_store = AudioStore()
+        return self._audio_store
+
+    @property
+    def narration(self):
+        """The shared NarrationService, so concurrent requests share in-flight slide synthesis."""
+        if self._narration is None:
+            with self._lock:
+                if self._narration is None:
+                    from backend.services.narration import NarrationService
+                    self._narration = NarrationService(audio_store=self.audio_store)
+        return self._narration
+
+    def create_physics_service(self, llm_service=None):
+        """Create a PhysicsService on top of the shared services.
+
+        Args:
+            llm_service: The caller's MultiLLMService (holding its API keys and
+                model selection); a new one is created if omitted
+
+        Returns:
+            A PhysicsService that is cheap to create, since it only wraps shared services
+        """
+        from backend.services.physics_service import PhysicsService
+        return PhysicsService(
+            llm_service=llm_service,
+            lesson_storage=self.lesson_storage,
+            rag_service=self.rag_service
+        )
+
+_container: Optional[ServiceContainer] = None
+_container_lock = threading.Lock()
+
+def get_container() -> ServiceContainer:
+    """Get the process-wide service container, creating it on first use."""
+    global _container
+    if _container is None:
+        with _container_lock:
+            if _container is None:
+                _container = ServiceContainer()
+    return _container
@@ -0,0 +1,168 @@
+"""
+Token-budgeted conversation context.
+
+Questions are answered with the last few turns of the conversation verbatim
+and everything before them folded into a rolling summary, so the history sent
+with each question stays within a fixed token budget however long the session
+gets. Summaries are cached under a hash chain of the turns they cover: when a
+turn leaves the verbatim window, the cached summary of the turns before it is
+extended with just that turn instead of summarizing the conversation again.
+"""
+
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from config.settings import (
+    CONVERSATION_TOKEN_BUDGET, CONVERSATION_RECENT_TURNS, CONVERSATION_SUMMARY_MAX_TOKENS,
+    CONVERSATION_SUMMARY_CACHE_SIZE
+)
+from backend.services.embedding_pipeline import count_tokens
+
+Turn = Tuple[str, str]
+
+# Extends a summary (empty at first) with more turns and returns the new summary
+Summarizer = Callable[[str, List[Turn]], Awaitable[str]]
+
+# Tokens added by the chat format for each message
+_MESSAGE_OVERHEAD = 4
+
+def count_turn_tokens(turn: Turn, model: str) -> int:
+    """Count the tokens of a (user, assistant) turn as chat messages."""
+    user_message, assistant_message = turn
+    return count_tokens(user_message, model) + count_tokens(assistant_message, model) + 2 * _MESSAGE_OVERHEAD
+
+def build_summary_messages(summary: str, turns: List[Turn], max_tokens: int = CONVERSATION_SUMMARY_MAX_TOKENS) -> List[Dict[str, str]]:
+    """Build the chat messages asking a model to extend a conversation summary with more turns."""
+    transcript = "\n\n".join(f"Student: {user_message}\nTutor: {assistant_message}" for user_message, assistant_message in turns)
+    prompt = f"""Summary of the tutoring conversation so far:
+{summary or "(none)"}
+
+Next part of the conversation:
+{transcript}
+
+Write an updated summary of the whole conversation in at most {max_tokens * 3 // 4} words. Keep the questions the
+student asked, what they struggled with, and the key results, definitions and formulas (in LaTeX) the tutor gave."""
+    return [
+        {"role": "system", "content": "You summarize physics tutoring conversations concisely and accurately."},
+        {"role": "user", "content": prompt}
+    ]
+
+def _chain(previous: str, turn: Turn) -> str:
+    """Hash of a conversation prefix, from the hash of the prefix before its last turn."""
+    return hashlib.sha256(json.dumps([previous, *turn]).encode('utf-8')).hexdigest()
+
+class ConversationContext:
+    """Fits conversation history into a token budget, summarizing the older turns."""
+
+    def __init__(self, max_tokens: int = CONVERSATION_TOKEN_BUDGET, recent_turns: int = CONVERSATION_RECENT_TURNS,
+                 summary_max_tokens: int = CONVERSATION_SUMMARY_MAX_TOKENS, max_summaries: int = CONVERSATION_SUMMARY_CACHE_SIZE):
+        """Initialize the conversation context.
+
+        Args:
+            max_tokens: Token budget of the history, summary included
+            recent_turns: Number of most recent turns kept verbatim when they fit
+            summary_max_tokens: Tokens reserved for the summary of the older turns
+            max_summaries: Number of summaries cached before evicting the least recently used
+        """
+        self.max_tokens = max_tokens
+        self.recent_turns = recent_turns
+        self.summary_max_tokens = summary_max_tokens
+        self.max_summaries = max_summaries
+
+        self.hits = 0
+        self.summarized_turns = 0
+        # Hash of a conversation prefix -> its summary, ordered from least to most recently used
+        self._summaries = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def build(self, chat_history: Sequence[Turn], model: str,
+                    summarize: Optional[Summarizer] = None) -> Tuple[str, List[Turn]]:
+        """Fit a conversation into the token budget.
+
+        Args:
+            chat_history: The (user, assistant) turns so far, oldest first
+            model: Model the history is sent to, for counting its tokens
+            summarize: Summarizes older turns; without it they are dropped
+
+        Returns:
+            The summary of the older turns (empty if there are none or they
+            could not be summarized) and the recent turns to send verbatim
+        """
+        turns = [tuple(turn) for turn in chat_history]
+
+        # As many of the most recent turns as fit next to the summary
+        kept = 0
+        used = 0
+        while kept < min(self.recent_turns, len(turns)):
+            tokens = count_turn_tokens(turns[-kept - 1], model)
+            reserved = self.summary_max_tokens if kept + 1 < len(turns) else 0
+            if used + tokens + reserved > self.max_tokens:
+                break
+            used += tokens
+            kept += 1
+
+        older = turns[:len(turns) - kept]
+        recent = turns[len(turns) - kept:]
+        if not older:
+            return "", recent
+        if summarize is None:
+            logging.info(f"Dropping {len(older)} earlier turns without a summarizer")
+            return "", recent
+        try:
+            return await self._summary(older, model, summarize), recent
+        except Exception as e:
+            logging.error(f"Error summarizing conversation, dropping {len(older)} earlier turns: {str(e)}")
+            return "", recent
+
+    async def _summary(self, turns: List[Turn], model: str, summarize: Summarizer) -> str:
+        """Get the summary of turns, extending the longest cached summary of a prefix of them."""
+        hashes = []
+        previous = ""
+        for turn in turns:
+            previous = _chain(previous, turn)
+            hashes.append(previous)
+
+        summary = ""
+        start = 0
+        with self._lock:
+            for end in range(len(turns), 0, -1):
+                cached = self._summaries.get(hashes[end - 1])
+                if cached is not None:
+                    self._summaries.move_to_end(hashes[end - 1])
+                    self.hits += 1
+                    summary, start = cached, end
+                    break
+
+        # Fold the remaining turns in chunks that fit the budget, caching each step
+        while start < len(turns):
+            end = start + 1
+            tokens = count_turn_tokens(turns[start], model)
+            while end < len(turns) and tokens + count_turn_tokens(turns[end], model) <= self.max_tokens:
+                tokens += count_turn_tokens(turns[end], model)
+                end += 1
+            summary = (await summarize(summary, turns[start:end])).strip()
+            self._store(hashes[end - 1], summary)
+            self.summarized_turns += end - start
+            start = end
+        return summary
+
+    def _store(self, key: str, summary: str) -> None:
+        with self._lock:
+            self._summaries[key] = summary
+            self._summaries.move_to_end(key)
+            while len(self._summaries) > self.max_summaries:
+                self._summaries.popitem(last=False)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get the number of cached summaries, cache hits and turns summarized so far."""
+        with self._lock:
+            return {
+                'summaries': len(self._summaries),
+                'hits': self.hits,
+                'summarized_turns': self.summarized_turns,
+                'max_summaries': self.max_summaries
+            }
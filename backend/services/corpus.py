@@ -0,0 +1,173 @@
+"""
+In-memory snapshot of the physics content corpus.
+
+The snapshot walks the content directory once, keeps every file's text (and a
+lowercased copy, token set and content hash) in memory together with an
+inverted word index, and only re-reads files whose mtime or size changed.
+It is shared by the RAG service and PhysicsService so the tree is not walked
+again for every lookup.
+"""
+
+import os
+import re
+import time
+import hashlib
+import logging
+import threading
+from typing import Dict, List, Set
+
+from config.settings import PHYSICS_CONTENT_DIR
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase word tokens."""
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+class CorpusSnapshot:
+    """Snapshot of the content files under a content directory."""
+
+    def __init__(self, content_dir: str, refresh_interval: float = 2.0):
+        """Initialize the snapshot and load every content file.
+
+        Args:
+            content_dir: Directory containing one sub-directory per chapter
+            refresh_interval: Minimum number of seconds between checks for changed files
+        """
+        self.content_dir = content_dir
+        self.refresh_interval = refresh_interval
+        # Relative path -> file entry
+        self.files = {}
+        # Word -> relative paths of the files containing it
+        self.word_index = {}
+        # Incremented whenever the set of files or their content changes
+        self.version = 0
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+        self.refresh(force=True)
+
+    def _scan(self) -> Dict[str, os.stat_result]:
+        """Stat every content file without reading it."""
+        stats = {}
+        if not os.path.exists(self.content_dir):
+            logging.warning(f"Content directory not found: {self.content_dir}")
+            return stats
+
+        for chapter in os.scandir(self.content_dir):
+            if not chapter.is_dir():
+                continue
+            for entry in os.scandir(chapter.path):
+                if entry.is_file() and entry.name.endswith('.txt'):
+                    stats[os.path.join(chapter.name, entry.name)] = entry.stat()
+        return stats
+
+    def _load_file(self, rel_path: str, stat: os.stat_result) -> Dict:
+        """Read a content file and build its snapshot entry."""
+        chapter_dir, file = os.path.split(rel_path)
+        path = os.path.join(self.content_dir, rel_path)
+        with open(path, 'rb') as f:
+            raw = f.read()
+        content = raw.decode('utf-8')
+        content_lower = content.lower()
+
+        return {
+            'rel_path': rel_path,
+            'path': path,
+            'chapter_dir': chapter_dir,
+            'chapter': chapter_dir.replace('_', ' '),
+            'topic': file.replace('.txt', '').replace('_', ' '),
+            'content': content,
+            'content_lower': content_lower,
+            'tokens': set(tokenize(content_lower)),
+            'hash': hashlib.sha256(raw).hexdigest(),
+            'mtime': stat.st_mtime_ns,
+            'size': stat.st_size
+        }
+
+    def refresh(self, force: bool = False) -> bool:
+        """Reload files whose mtime or size changed since the last check.
+
+        Args:
+            force: Check the directory even if refresh_interval has not elapsed
+
+        Returns:
+            True if the snapshot changed
+        """
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._last_check < self.refresh_interval:
+                return False
+            self._last_check = now
+
+            stats = self._scan()
+            changed = False
+
+            for rel_path in list(self.files):
+                if rel_path not in stats:
+                    del self.files[rel_path]
+                    changed = True
+
+            for rel_path, stat in stats.items():
+                entry = self.files.get(rel_path)
+                if entry and entry['mtime'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+                    continue
+                try:
+                    self.files[rel_path] = self._load_file(rel_path, stat)
+                    changed = True
+                except Exception as e:
+                    logging.error(f"Error reading file {os.path.join(self.content_dir, rel_path)}: {str(e)}")
+
+            if changed:
+                word_index = {}
+                for rel_path, entry in self.files.items():
+                    for word in entry['tokens']:
+                        word_index.setdefault(word, set()).add(rel_path)
+                self.word_index = word_index
+                self.version += 1
+                logging.info(f"Loaded corpus snapshot with {len(self.files)} files")
+
+            return changed
+
+    def get_files(self) -> List[Dict]:
+        """Get all file entries, sorted by relative path."""
+        self.refresh()
+        return [self.files[rel_path] for rel_path in sorted(self.files)]
+
+    def get_file(self, rel_path: str) -> Dict:
+        """Get the entry for a single file, or None if it does not exist."""
+        self.refresh()
+        return self.files.get(rel_path)
+
+    def get_file_hashes(self) -> Dict[str, str]:
+        """Get the content hash of every file, keyed by relative path."""
+        return {entry['rel_path']: entry['hash'] for entry in self.get_files()}
+
+    def get_chapter_topics(self) -> Dict[str, List[str]]:
+        """Get the topic names (file stems with spaces) for each chapter directory."""
+        chapters = {}
+        for entry in self.get_files():
+            chapters.setdefault(entry['chapter_dir'], []).append(entry['topic'])
+        return chapters
+
+    def find_files_with_words(self, words: Set[str]) -> Dict[str, int]:
+        """Count how many of the given words appear in each file.
+
+        Returns:
+            A mapping of relative path to the number of words it contains
+        """
+        self.refresh()
+        counts = {}
+        for word in words:
+            for rel_path in self.word_index.get(word, ()):
+                counts[rel_path] = counts.get(rel_path, 0) + 1
+        return counts
+
+_snapshots = {}
+_snapshots_lock = threading.Lock()
+
+def get_corpus(content_dir: str = None) -> CorpusSnapshot:
+    """Get the process-wide snapshot for a content directory, loading it on first use."""
+    content_dir = os.path.abspath(content_dir or str(PHYSICS_CONTENT_DIR))
+    with _snapshots_lock:
+        if content_dir not in _snapshots:
+            _snapshots[content_dir] = CorpusSnapshot(content_dir)
+        return _snapshots[content_dir]
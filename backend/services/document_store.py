@@ -0,0 +1,123 @@
+"""
+On-disk document store for RAG chunks.
+
+Chunks are kept in a SQLite database (memory-mapped through PRAGMA mmap_size)
+instead of a pickle that every process loads in full. Searches fetch only the
+chunks they return, and loading the store never runs pickle code.
+"""
+
+import sqlite3
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Chunk metadata columns, in table order after the ID
+COLUMNS = ('content', 'chapter', 'topic', 'section', 'path', 'chunk_index')
+
+class DocumentStore:
+    """SQLite-backed store of chunks keyed by chunk ID."""
+
+    def __init__(self, db_path: str, mmap_size: int = 256 * 1024 * 1024):
+        """Open (or create) the document store.
+
+        Args:
+            db_path: Path to the SQLite database file
+            mmap_size: Number of bytes of the database file to memory-map
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(f"PRAGMA mmap_size={int(mmap_size)}")
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS chunks (
+                id INTEGER PRIMARY KEY,
+                content TEXT NOT NULL,
+                chapter TEXT NOT NULL,
+                topic TEXT NOT NULL,
+                section TEXT NOT NULL,
+                path TEXT NOT NULL,
+                chunk_index INTEGER NOT NULL
+            )"""
+        )
+        self.conn.commit()
+
+    @staticmethod
+    def _row_to_doc(row: Tuple) -> Dict:
+        return dict(zip(COLUMNS, row))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def __contains__(self, chunk_id: int) -> bool:
+        with self._lock:
+            return self.conn.execute("SELECT 1 FROM chunks WHERE id = ?", (int(chunk_id),)).fetchone() is not None
+
+    def get(self, chunk_id: int) -> Optional[Dict]:
+        """Get a single chunk, or None if it does not exist."""
+        with self._lock:
+            row = self.conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM chunks WHERE id = ?", (int(chunk_id),)
+            ).fetchone()
+        return self._row_to_doc(row) if row else None
+
+    def get_many(self, chunk_ids: List[int]) -> List[Dict]:
+        """Get several chunks, in the order of the given IDs. Missing IDs are skipped."""
+        if not chunk_ids:
+            return []
+        ids = [int(chunk_id) for chunk_id in chunk_ids]
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT id, {', '.join(COLUMNS)} FROM chunks WHERE id IN ({', '.join('?' * len(ids))})", ids
+            ).fetchall()
+        docs = {row[0]: self._row_to_doc(row[1:]) for row in rows}
+        return [docs[chunk_id] for chunk_id in ids if chunk_id in docs]
+
+    def ids(self) -> List[int]:
+        """Get the IDs of all chunks, in ascending order."""
+        with self._lock:
+            return [row[0] for row in self.conn.execute("SELECT id FROM chunks ORDER BY id")]
+
+    def iter_documents(self, batch_size: int = 500) -> Iterator[Tuple[int, Dict]]:
+        """Iterate over all (chunk ID, chunk) pairs without loading them all at once."""
+        last_id = -1
+        while True:
+            with self._lock:
+                rows = self.conn.execute(
+                    f"SELECT id, {', '.join(COLUMNS)} FROM chunks WHERE id > ? ORDER BY id LIMIT ?",
+                    (last_id, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield row[0], self._row_to_doc(row[1:])
+            last_id = rows[-1][0]
+
+    def add_many(self, items: Iterable[Tuple[int, Dict]]) -> None:
+        """Insert or replace chunks. Changes are written on commit()."""
+        rows = [(int(chunk_id),) + tuple(doc[column] for column in COLUMNS) for chunk_id, doc in items]
+        with self._lock:
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO chunks (id, {', '.join(COLUMNS)}) VALUES ({', '.join('?' * (len(COLUMNS) + 1))})",
+                rows
+            )
+
+    def delete_many(self, chunk_ids: Iterable[int]) -> None:
+        """Delete chunks. Changes are written on commit()."""
+        with self._lock:
+            self.conn.executemany("DELETE FROM chunks WHERE id = ?", [(int(chunk_id),) for chunk_id in chunk_ids])
+
+    def clear(self) -> None:
+        """Delete all chunks. Changes are written on commit()."""
+        with self._lock:
+            self.conn.execute("DELETE FROM chunks")
+
+    def commit(self) -> None:
+        """Write pending changes to disk in a single transaction."""
+        with self._lock:
+            self.conn.commit()
+
+    def rollback(self) -> None:
+        """Discard pending changes."""
+        with self._lock:
+            self.conn.rollback()
@@ -0,0 +1,122 @@
+"""
+Persistent, content-addressed embedding cache.
+
+Embeddings are keyed by (model, sha256(text)) and stored as float32 blobs in a
+SQLite database (memory-mapped through PRAGMA mmap_size, like the document
+store), so cached vectors are read without network calls. SQLite makes the
+cache safe to share between processes (the Streamlit app, the API and the
+generation scripts): every key maps to its own row, so no process can
+overwrite another's vector. The least recently used entries are evicted once
+the cache is full.
+"""
+
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Dict, Optional
+
+import numpy as np
+
+# Reads are recorded for the LRU order in batches of this size, so lookups rarely write
+_TOUCH_BATCH = 100
+
+class EmbeddingCache:
+    """SQLite-backed LRU cache of embedding vectors."""
+
+    def __init__(self, db_path: str, max_entries: int = 50000, mmap_size: int = 256 * 1024 * 1024):
+        """Open (or create) the embedding cache.
+
+        Args:
+            db_path: Path to the SQLite database file
+            max_entries: Maximum number of vectors to keep before evicting
+            mmap_size: Number of bytes of the database file to memory-map
+        """
+        self.db_path = db_path
+        self.max_entries = max_entries
+
+        self.hits = 0
+        self.misses = 0
+        # Keys read since the last flush -> time of the read; written in one batch
+        self._touched = {}
+        self._lock = threading.Lock()
+
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(f"PRAGMA mmap_size={int(mmap_size)}")
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL
+            )"""
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self.conn.commit()
+
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        """Build the cache key for a text embedded with a given model."""
+        return f"{model}:{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+
+    def get(self, model: str, text: str) -> Optional[np.ndarray]:
+        """Get the cached embedding for a text.
+
+        Returns:
+            A copy of the cached vector, or None on a miss
+        """
+        key = self.make_key(model, text)
+        with self._lock:
+            row = self.conn.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._touched[key] = time.time()
+            flush = len(self._touched) >= _TOUCH_BATCH
+        if flush:
+            self.flush()
+        return np.frombuffer(row[0], dtype='float32').copy()
+
+    def put(self, model: str, text: str, vector) -> None:
+        """Store the embedding for a text (committed by flush)."""
+        vector = np.asarray(vector, dtype='float32')
+        key = self.make_key(model, text)
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                (key, vector.tobytes(), time.time())
+            )
+            self._touched.pop(key, None)
+
+    def flush(self) -> None:
+        """Record the reads since the last flush, evict beyond max_entries and commit."""
+        with self._lock:
+            try:
+                self.conn.executemany(
+                    "UPDATE embeddings SET last_used = MAX(last_used, ?) WHERE key = ?",
+                    [(used, key) for key, used in self._touched.items()]
+                )
+                self._touched.clear()
+                self.conn.execute(
+                    """DELETE FROM embeddings WHERE key IN (
+                        SELECT key FROM embeddings ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                    )""",
+                    (self.max_entries,)
+                )
+                self.conn.commit()
+            except sqlite3.Error as e:
+                self.conn.rollback()
+                logging.error(f"Error flushing embedding cache: {str(e)}")
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get hit/miss counters and the current size of the cache."""
+        with self._lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': entries,
+            'max_entries': self.max_entries
+        }
@@ -0,0 +1,262 @@
+"""
+Async embedding pipeline for index builds.
+
+Texts are packed into token-bounded batches which are sent to the embeddings
+API concurrently (bounded by a semaphore). Rate-limit, timeout and server
+errors are retried with exponential backoff. Texts that still fail are
+reported as missing instead of being replaced with placeholder vectors, so the
+caller can leave those chunks out of the index and retry them later. Requests
+go through the shared, pooled clients of llm_clients; texts that fit in a
+single request (e.g. a query) are embedded with the synchronous client, without
+starting an event loop.
+"""
+
+import time
+import random
+import asyncio
+import logging
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+import openai
+from openai import AsyncOpenAI, OpenAI
+
+from backend.services.llm_clients import get_async_client, get_client
+
+try:
+    import tiktoken
+except ImportError:  # Fall back to a character-based estimate
+    tiktoken = None
+
+# Errors worth retrying; anything else (e.g. a 400 for a bad request) fails the batch immediately
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+_encodings = {}
+_encodings_lock = threading.Lock()
+
+def get_encoding(model: str):
+    """Get the tiktoken encoding for a model, or None if it is unavailable.
+
+    Loading an encoding may download its BPE file; a failure is remembered so
+    it is only attempted once per process.
+    """
+    with _encodings_lock:
+        if model not in _encodings:
+            encoding = None
+            if tiktoken is not None:
+                try:
+                    encoding = tiktoken.encoding_for_model(model)
+                except Exception as e:
+                    logging.warning(f"Tokenizer for {model} unavailable, estimating tokens from characters: {str(e)}")
+            _encodings[model] = encoding
+        return _encodings[model]
+
+def count_tokens(text: str, model: str) -> int:
+    """Count (or estimate, without a tokenizer) the tokens in a text."""
+    encoding = get_encoding(model)
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+class EmbeddingPipeline:
+    """Concurrent, rate-limited client for the embeddings API."""
+
+    def __init__(self, api_key: str, model: str, base_url: Optional[str] = None,
+                 max_concurrency: int = 4, max_batch_tokens: int = 50000,
+                 max_batch_size: int = 100, max_retries: int = 5,
+                 backoff_base: float = 1.0, timeout: float = 60.0):
+        """Initialize the pipeline.
+
+        Args:
+            api_key: OpenAI API key
+            model: Embedding model name
+            base_url: Alternative API endpoint (e.g. a proxy or a local server)
+            max_concurrency: Maximum number of requests in flight
+            max_batch_tokens: Maximum estimated tokens per request
+            max_batch_size: Maximum number of texts per request
+            max_retries: Retries per batch for retryable errors
+            backoff_base: Initial backoff in seconds, doubled on every retry
+            timeout: Request timeout in seconds
+        """
+        self.api_key = api_key
+        self.model = model
+        self.base_url = base_url
+        self.max_concurrency = max_concurrency
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.timeout = timeout
+        self.last_run_stats = {}
+
+    def count_tokens(self, text: str) -> int:
+        """Count (or estimate, without a tokenizer) the tokens in a text."""
+        return count_tokens(text, self.model)
+
+    def make_batches(self, texts: List[str]) -> List[List[int]]:
+        """Pack text indices into batches bounded by max_batch_tokens and max_batch_size."""
+        batches = []
+        batch = []
+        batch_tokens = 0
+        for i, text in enumerate(texts):
+            tokens = self.count_tokens(text)
+            if batch and (batch_tokens + tokens > self.max_batch_tokens or len(batch) >= self.max_batch_size):
+                batches.append(batch)
+                batch = []
+                batch_tokens = 0
+            batch.append(i)
+            batch_tokens += tokens
+        if batch:
+            batches.append(batch)
+        return batches
+
+    async def _embed_batch(self, client: AsyncOpenAI, semaphore: asyncio.Semaphore,
+                           texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Embed one batch, retrying retryable errors.
+
+        A batch rejected outright (e.g. because one text is too long) is split
+        in half and retried, so only the offending texts are lost.
+
+        Returns:
+            One embedding per text, or None for texts that could not be embedded
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with semaphore:
+                    response = await client.embeddings.create(model=self.model, input=texts)
+                data = sorted(response.data, key=lambda item: item.index)
+                if len(data) != len(texts):
+                    raise ValueError(f"Expected {len(texts)} embeddings, got {len(data)}")
+                return [np.asarray(item.embedding, dtype='float32') for item in data]
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    logging.error(f"Embedding batch of {len(texts)} texts failed after {attempt + 1} attempts: {str(e)}")
+                    return [None] * len(texts)
+                delay = self.backoff_base * (2 ** attempt) * (0.5 + random.random() / 2)
+                logging.warning(f"Embedding batch failed ({type(e).__name__}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+            except Exception as e:
+                if len(texts) == 1:
+                    logging.error(f"Embedding failed: {str(e)}")
+                    return [None]
+                middle = len(texts) // 2
+                logging.warning(f"Embedding batch of {len(texts)} texts rejected ({str(e)}), splitting it")
+                first, second = await asyncio.gather(
+                    self._embed_batch(client, semaphore, texts[:middle]),
+                    self._embed_batch(client, semaphore, texts[middle:])
+                )
+                return first + second
+
+    def _embed_batch_sync(self, client: OpenAI, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Embed one batch with a synchronous client, like _embed_batch."""
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = client.embeddings.create(model=self.model, input=texts)
+                data = sorted(response.data, key=lambda item: item.index)
+                if len(data) != len(texts):
+                    raise ValueError(f"Expected {len(texts)} embeddings, got {len(data)}")
+                return [np.asarray(item.embedding, dtype='float32') for item in data]
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    logging.error(f"Embedding batch of {len(texts)} texts failed after {attempt + 1} attempts: {str(e)}")
+                    return [None] * len(texts)
+                delay = self.backoff_base * (2 ** attempt) * (0.5 + random.random() / 2)
+                logging.warning(f"Embedding batch failed ({type(e).__name__}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+            except Exception as e:
+                if len(texts) == 1:
+                    logging.error(f"Embedding failed: {str(e)}")
+                    return [None]
+                middle = len(texts) // 2
+                logging.warning(f"Embedding batch of {len(texts)} texts rejected ({str(e)}), splitting it")
+                return self._embed_batch_sync(client, texts[:middle]) + self._embed_batch_sync(client, texts[middle:])
+
+    def _client_options(self) -> dict:
+        """Options applied to the shared clients: the pipeline retries and times out requests itself."""
+        options = {'max_retries': 0, 'timeout': self.timeout}
+        if self.base_url:
+            options['base_url'] = self.base_url
+        return options
+
+    def _record_run(self, texts: List[str], results: Dict[int, np.ndarray], batches: int, start: float) -> None:
+        """Store the statistics of an embedding run in last_run_stats."""
+        total_tokens = sum(self.count_tokens(text) for text in texts)
+        elapsed = max(time.monotonic() - start, 1e-9)
+        self.last_run_stats = {
+            'texts': len(texts),
+            'embedded': len(results),
+            'failed': len(texts) - len(results),
+            'batches': batches,
+            'estimated_tokens': total_tokens,
+            'seconds': round(elapsed, 3),
+            'texts_per_second': round(len(results) / elapsed, 1),
+            'tokens_per_second': round(total_tokens / elapsed, 1)
+        }
+        logging.info(f"Embedding run finished: {self.last_run_stats}")
+
+    async def embed(self, texts: List[str]) -> Dict[int, np.ndarray]:
+        """Embed texts concurrently.
+
+        Returns:
+            A mapping of text index to embedding; texts that failed are missing
+        """
+        if not texts:
+            return {}
+
+        batches = self.make_batches(texts)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        results = {}
+        done = 0
+        start = time.monotonic()
+
+        # A copy of the shared client, so the connection pool is reused (and not closed here)
+        client = get_async_client("openai", self.api_key).with_options(**self._client_options())
+
+        async def run(batch):
+            nonlocal done
+            embeddings = await self._embed_batch(client, semaphore, [texts[i] for i in batch])
+            results.update((i, embedding) for i, embedding in zip(batch, embeddings) if embedding is not None)
+            done += 1
+            logging.info(f"Embedding progress: {done}/{len(batches)} batches, {len(results)}/{len(texts)} texts")
+
+        await asyncio.gather(*(run(batch) for batch in batches))
+
+        self._record_run(texts, results, len(batches), start)
+        return results
+
+    def embed_sync(self, texts: List[str]) -> Dict[int, np.ndarray]:
+        """Embed texts from synchronous code.
+
+        Texts that fit in a single request are embedded with the shared
+        synchronous client; larger runs go through embed() on an event loop of
+        their own. Either way the calling thread blocks, so async code awaits
+        embed() instead (or runs this through asyncio.to_thread).
+
+        Raises:
+            RuntimeError: If called from a running event loop
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        else:
+            raise RuntimeError("embed_sync() would block the running event loop; await embed() instead")
+
+        if not texts:
+            return {}
+
+        batches = self.make_batches(texts)
+        if len(batches) == 1:
+            start = time.monotonic()
+            client = get_client("openai", self.api_key).with_options(**self._client_options())
+            embeddings = self._embed_batch_sync(client, texts)
+            results = {i: embedding for i, embedding in enumerate(embeddings) if embedding is not None}
+            self._record_run(texts, results, 1, start)
+            return results
+        return asyncio.run(self.embed(texts))
@@ -0,0 +1,516 @@
+"""
+Concurrent batch generation of lessons.
+
+Topics are processed by a bounded pool of workers, with requests to each
+provider spaced out to stay under its rate limit. Every finished topic is
+appended to a checkpoint journal, so an interrupted run resumes where it
+stopped, and topics whose prompt and model are unchanged since their last
+successful generation are skipped. Generation stops starting new topics once
+the token or cost budget would be exceeded.
+
+run_batch_api sends the same jobs through a provider's offline batch API
+instead, for refreshes with no latency needs.
+"""
+
+import json
+import uuid
+import time
+import random
+import asyncio
+import hashlib
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from config.settings import (
+    LESSON_BATCH_MAX_CONCURRENCY, LESSON_BATCH_REQUESTS_PER_MINUTE, LESSON_BATCH_JOURNAL,
+    LESSON_BATCH_MAX_RETRIES, LESSON_EXPECTED_OUTPUT_TOKENS, LLM_PRICES_PER_MILLION_TOKENS
+)
+from backend.services.embedding_pipeline import count_tokens
+from backend.services.multi_llm_service import MultiLLMService, GenerationConfig
+from backend.services.lesson_storage import LessonStorage
+
+LESSON_SYSTEM_PROMPT = """You are a knowledgeable physics professor creating educational content for first-year undergraduate students.
+Your content should be:
+1. Clear and accessible while maintaining academic rigor
+2. Well-structured for easy breakdown into slides
+3. Thorough in explanations without assuming prior knowledge
+4. Rich with visual descriptions that help students form mental models
+5. Precise with mathematical formulas using proper LaTeX notation
+
+IMPORTANT GUIDELINES:
+- Explain concepts as if speaking to a bright but new student
+- Use concrete examples to illustrate abstract concepts
+- Break down complex ideas into digestible parts
+- Include intuitive explanations alongside mathematical formulas
+- Ensure all content is scientifically accurate and up-to-date
+- Make connections to everyday experiences when possible
+
+Remember that this content will be used as lesson material that students will read, not as interactive content."""
+
+def build_lesson_prompt(topic: str) -> str:
+    """Build the lesson generation prompt for a topic."""
+    return f"""Create a comprehensive physics lesson about {topic} for first-year undergraduate students.
+
+IMPORTANT: DO NOT include a title or top-level header at the beginning of the lesson. Start directly with:
+
+## Introduction
+[Introduction content here]
+
+## Key Concepts and Principles
+[Key concepts content here]
+
+Then include the following sections:
+1. Important formulas with LaTeX formatting (use $ for inline and $$ for display equations)
+2. Real-world applications
+3. Example problems with solutions
+
+Format the content with clear section headers (using ## for sections) and organize it in a logical progression.
+"""
+
+def estimate_cost(model: str, input_tokens: int, output_tokens: int) -> float:
+    """Estimate the cost in USD of a request, or 0 if the model has no known price."""
+    input_price, output_price = LLM_PRICES_PER_MILLION_TOKENS.get(model, (0.0, 0.0))
+    return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+@dataclass(frozen=True)
+class LessonJob:
+    """A lesson to generate: the topic and the exact request for it."""
+    topic: str
+    prompt: str
+    system_prompt: str
+    config: GenerationConfig
+
+    @property
+    def request_hash(self) -> str:
+        """Hash of the prompt and model settings; a lesson is regenerated when it changes."""
+        request = {
+            'prompt': self.prompt,
+            'system_prompt': self.system_prompt,
+            'provider': getattr(self.config.provider, 'value', self.config.provider),
+            'model': getattr(self.config.model, 'value', self.config.model),
+            'temperature': self.config.temperature,
+            'max_tokens': self.config.max_tokens
+        }
+        return hashlib.sha256(json.dumps(request, sort_keys=True).encode('utf-8')).hexdigest()
+
+class RateLimiter:
+    """Spaces out requests to stay under a requests-per-minute limit."""
+
+    def __init__(self, requests_per_minute: float):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self.next_time = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Wait for the next free request slot."""
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            wait = self.next_time - now
+            self.next_time = max(now, self.next_time) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+class CheckpointJournal:
+    """Append-only JSONL record of finished topics."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def load(self) -> Dict[str, Dict]:
+        """Get the last successful record for every topic."""
+        records = {}
+        if not self.path.exists():
+            return records
+        with open(self.path, 'r') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A line cut short by an interrupted run
+                    continue
+                if record.get('status') == 'generated':
+                    records[record['topic']] = record
+        return records
+
+    def load_pending_batch(self) -> Optional[Dict]:
+        """Get the last submitted batch if its results were not ingested yet."""
+        pending = None
+        if not self.path.exists():
+            return None
+        with open(self.path, 'r') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if record.get('status') == 'batch_submitted':
+                    pending = record
+                elif record.get('status') == 'batch_ingested' and pending and record.get('batch_id') == pending['batch_id']:
+                    pending = None
+        return pending
+
+    def start_forced_run(self) -> Dict:
+        """Get the unfinished forced regeneration run, or start a new one.
+
+        A forced run regenerates every topic once; until it finishes, later
+        forced runs resume it instead of starting over.
+        """
+        run = None
+        if self.path.exists():
+            with open(self.path, 'r') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if record.get('status') == 'forced_run_started':
+                        run = record
+                    elif record.get('status') == 'forced_run_finished' and run and record.get('run_id') == run['run_id']:
+                        run = None
+        if run is not None:
+            print(f"Resuming forced regeneration started at {time.ctime(run['time'])}")
+            return run
+        run = {'status': 'forced_run_started', 'run_id': uuid.uuid4().hex, 'time': time.time()}
+        self.append(run)
+        return run
+
+    def finish_forced_run(self, run: Dict) -> None:
+        """Record that every topic of a forced run was regenerated."""
+        self.append({'status': 'forced_run_finished', 'run_id': run['run_id'], 'time': time.time()})
+
+    def append(self, record: Dict) -> None:
+        """Append a record and flush it to disk."""
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+
+class BatchLessonGenerator:
+    """Generates lessons for many topics concurrently and stores them in LessonStorage."""
+
+    def __init__(self, llm_service: MultiLLMService, lesson_storage: LessonStorage,
+                 config: GenerationConfig, max_concurrency: int = LESSON_BATCH_MAX_CONCURRENCY,
+                 requests_per_minute: Optional[Dict[str, float]] = None,
+                 journal_path: str = str(LESSON_BATCH_JOURNAL),
+                 token_budget: Optional[int] = None, cost_budget: Optional[float] = None,
+                 max_retries: int = LESSON_BATCH_MAX_RETRIES, backoff_base: float = 2.0):
+        """Initialize the generator.
+
+        Args:
+            llm_service: Service (with API keys) to generate the lessons with
+            lesson_storage: Storage the lessons are written to
+            config: Provider, model and parameters for every lesson
+            max_concurrency: Maximum number of lessons generated at once
+            requests_per_minute: Rate limit per provider value (e.g. {"openai": 60})
+            journal_path: Checkpoint journal file
+            token_budget: Maximum (estimated) prompt and completion tokens for the run
+            cost_budget: Maximum (estimated) cost in USD for the run
+            max_retries: Retries per lesson after a failed request
+            backoff_base: Initial retry delay in seconds, doubled on every retry
+        """
+        self.llm_service = llm_service
+        self.lesson_storage = lesson_storage
+        self.config = config
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute or LESSON_BATCH_REQUESTS_PER_MINUTE
+        self.journal = CheckpointJournal(journal_path)
+        self.token_budget = token_budget
+        self.cost_budget = cost_budget
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.rate_limiters = {}
+
+    def build_job(self, topic: str) -> LessonJob:
+        """Build the generation job for a topic."""
+        return LessonJob(topic, build_lesson_prompt(topic), LESSON_SYSTEM_PROMPT, self.config)
+
+    def get_rate_limiter(self, provider) -> RateLimiter:
+        """Get the rate limiter shared by all requests to a provider."""
+        provider = getattr(provider, 'value', provider)
+        if provider not in self.rate_limiters:
+            self.rate_limiters[provider] = RateLimiter(self.requests_per_minute.get(provider, 0))
+        return self.rate_limiters[provider]
+
+    async def _generate(self, job: LessonJob) -> str:
+        """Generate one lesson, retrying failed requests with backoff."""
+        limiter = self.get_rate_limiter(job.config.provider)
+        for attempt in range(self.max_retries + 1):
+            await limiter.acquire()
+            try:
+                # No fallback to another provider: the lesson is stored as generated by job.config.model.
+                # No response cache either: a topic is only generated when a new lesson is wanted
+                return await self.llm_service.generate_text(job.prompt, job.system_prompt, config=job.config,
+                                                            allow_fallback=False, use_cache=False)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self.backoff_base * (2 ** attempt) * (0.5 + random.random() / 2)
+                logging.warning(f"Lesson for {job.topic} failed ({str(e)}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def select_jobs(self, topics: List[str], since: Optional[float] = None):
+        """Build the jobs for the topics and split off those that are unchanged.
+
+        Args:
+            topics: Topics to build jobs for
+            since: Start time of a forced run; only topics regenerated since then are skipped
+
+        Returns:
+            The number of topics, the number skipped and the jobs to run
+        """
+        jobs = [self.build_job(topic) for topic in dict.fromkeys(topics)]
+        finished = self.journal.load()
+        stored = await self.lesson_storage.get_all_metadata()
+
+        pending = []
+        for job in jobs:
+            journal_hash = finished[job.topic]['hash'] if job.topic in finished else None
+            if since is not None:
+                unchanged = (job.topic in stored and journal_hash == job.request_hash
+                             and finished[job.topic].get('time', 0) >= since)
+            else:
+                # The stored prompt hash is authoritative; the journal covers lessons stored without one
+                stored_hash = stored[job.topic]['prompt_hash'] if job.topic in stored else None
+                unchanged = job.topic in stored and (stored_hash or journal_hash) == job.request_hash
+            if not unchanged:
+                pending.append(job)
+        return len(jobs), len(jobs) - len(pending), pending
+
+    async def run(self, topics: List[str], force: bool = False) -> Dict:
+        """Generate lessons for the given topics.
+
+        Args:
+            topics: Topics to generate lessons for
+            force: Regenerate topics even if their prompt and model are unchanged. An
+                interrupted forced run is resumed: topics it already regenerated are skipped
+
+        Returns:
+            A summary of the run (counts, tokens, cost, time and throughput)
+        """
+        model = getattr(self.config.model, 'value', self.config.model)
+        forced_run = self.journal.start_forced_run() if force else None
+        total, skipped, pending = await self.select_jobs(topics, forced_run['time'] if forced_run else None)
+
+        stats = {'topics': total, 'skipped': skipped, 'generated': 0, 'failed': 0,
+                 'over_budget': 0, 'tokens': 0, 'cost': 0.0}
+        reserved_tokens = 0
+        reserved_cost = 0.0
+        budget_lock = asyncio.Lock()
+        queue = asyncio.Queue()
+        for job in pending:
+            queue.put_nowait(job)
+        start = time.monotonic()
+        print(f"{total} topics: {skipped} unchanged, {len(pending)} to generate with {model} "
+              f"({self.max_concurrency} workers)")
+
+        def report(job: LessonJob, status: str, detail: str = "") -> None:
+            done = stats['generated'] + stats['failed'] + stats['over_budget']
+            print(f"[{done}/{len(pending)}] {job.topic}: {status}{detail}")
+
+        async def worker():
+            nonlocal reserved_tokens, reserved_cost
+            while True:
+                try:
+                    job = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+
+                # Reserve the expected usage so concurrent workers cannot overshoot the budget
+                input_tokens = count_tokens(job.prompt + job.system_prompt, model)
+                expected_tokens = input_tokens + (job.config.max_tokens or LESSON_EXPECTED_OUTPUT_TOKENS)
+                expected_cost = estimate_cost(model, input_tokens, expected_tokens - input_tokens)
+                async with budget_lock:
+                    over_tokens = self.token_budget is not None and stats['tokens'] + reserved_tokens + expected_tokens > self.token_budget
+                    over_cost = self.cost_budget is not None and stats['cost'] + reserved_cost + expected_cost > self.cost_budget
+                    if over_tokens or over_cost:
+                        stats['over_budget'] += 1
+                        report(job, "skipped (budget exhausted)")
+                        continue
+                    reserved_tokens += expected_tokens
+                    reserved_cost += expected_cost
+
+                job_start = time.monotonic()
+                try:
+                    lesson = await self._generate(job)
+                    output_tokens = count_tokens(lesson, model)
+                    if not await self.lesson_storage.store_lesson(job.topic, lesson, model=model, prompt_hash=job.request_hash):
+                        raise RuntimeError("the lesson could not be stored")
+                    self.journal.append({
+                        'topic': job.topic,
+                        'hash': job.request_hash,
+                        'status': 'generated',
+                        'model': model,
+                        'tokens': input_tokens + output_tokens,
+                        'time': time.time()
+                    })
+                    async with budget_lock:
+                        stats['generated'] += 1
+                        stats['tokens'] += input_tokens + output_tokens
+                        stats['cost'] += estimate_cost(model, input_tokens, output_tokens)
+                    report(job, "generated", f" ({time.monotonic() - job_start:.1f}s, {output_tokens} tokens)")
+                except Exception as e:
+                    logging.error(f"Error generating lesson for {job.topic}: {str(e)}")
+                    self.journal.append({'topic': job.topic, 'hash': job.request_hash, 'status': 'failed',
+                                         'error': str(e), 'time': time.time()})
+                    stats['failed'] += 1
+                    report(job, "failed", f" ({str(e)})")
+                finally:
+                    async with budget_lock:
+                        reserved_tokens -= expected_tokens
+                        reserved_cost -= expected_cost
+
+        await asyncio.gather(*(worker() for _ in range(max(1, min(self.max_concurrency, len(pending))))))
+        if forced_run and not stats['failed'] and not stats['over_budget']:
+            self.journal.finish_forced_run(forced_run)
+
+        elapsed = max(time.monotonic() - start, 1e-9)
+        stats['cost'] = round(stats['cost'], 4)
+        stats['seconds'] = round(elapsed, 1)
+        stats['lessons_per_minute'] = round(stats['generated'] * 60 / elapsed, 1)
+        stats['tokens_per_second'] = round(stats['tokens'] / elapsed, 1)
+        return stats
+
+    async def run_batch_api(self, topics: List[str], force: bool = False, backend=None,
+                            poll_interval: Optional[float] = None, timeout: Optional[float] = None) -> Dict:
+        """Generate lessons through the provider's offline batch API.
+
+        All changed topics are submitted as one batch, polled until it ends and
+        the results stored in LessonStorage. The submitted batch is recorded in
+        the journal, so a run interrupted while waiting resumes polling the same
+        batch instead of submitting it again. The token and cost budgets limit
+        which topics are submitted.
+
+        Args:
+            topics: Topics to generate lessons for
+            force: Regenerate topics even if their prompt and model are unchanged
+            backend: Batch backend (see batch_api); defaults to the config's provider
+            poll_interval: Seconds between status checks (default BATCH_POLL_INTERVAL)
+            timeout: Seconds to wait for the batch before giving up
+
+        Returns:
+            A summary of the run, as from run()
+        """
+        model = getattr(self.config.model, 'value', self.config.model)
+        backend = backend or self.llm_service.get_batch_backend(self.config.provider)
+        wait_options = {'timeout': timeout}
+        if poll_interval is not None:
+            wait_options['poll_interval'] = poll_interval
+        start = time.monotonic()
+        stats = {'topics': 0, 'skipped': 0, 'generated': 0, 'failed': 0,
+                 'over_budget': 0, 'tokens': 0, 'cost': 0.0}
+
+        forced_run = self.journal.start_forced_run() if force else None
+        batch = self.journal.load_pending_batch()
+        if batch and batch.get('backend') != type(backend).__name__:
+            logging.warning(f"Not resuming batch {batch['batch_id']}, which was submitted to {batch.get('backend')}")
+            batch = None
+        if batch:
+            print(f"Resuming batch {batch['batch_id']} with {len(batch['jobs'])} lessons")
+            stats['topics'] = len(batch['jobs'])
+        else:
+            total, skipped, pending = await self.select_jobs(topics, forced_run['time'] if forced_run else None)
+            stats['topics'] = total
+            stats['skipped'] = skipped
+
+            # Submit only as many topics as the budget allows
+            selected = []
+            prompt_tokens = {}
+            budget_tokens = 0
+            budget_cost = 0.0
+            for job in pending:
+                input_tokens = count_tokens(job.prompt + job.system_prompt, model)
+                expected_tokens = input_tokens + (job.config.max_tokens or LESSON_EXPECTED_OUTPUT_TOKENS)
+                expected_cost = estimate_cost(model, input_tokens, expected_tokens - input_tokens)
+                if ((self.token_budget is not None and budget_tokens + expected_tokens > self.token_budget) or
+                        (self.cost_budget is not None and budget_cost + expected_cost > self.cost_budget)):
+                    stats['over_budget'] += 1
+                    continue
+                budget_tokens += expected_tokens
+                budget_cost += expected_cost
+                prompt_tokens[job.topic] = input_tokens
+                selected.append(job)
+
+            print(f"{total} topics: {skipped} unchanged, {len(selected)} submitted as a batch to {model}"
+                  + (f", {stats['over_budget']} over budget" if stats['over_budget'] else ""))
+            if not selected:
+                if forced_run and not pending:
+                    self.journal.finish_forced_run(forced_run)
+                stats['seconds'] = round(time.monotonic() - start, 1)
+                stats['lessons_per_minute'] = stats['tokens_per_second'] = 0.0
+                return stats
+
+            requests = [
+                self.llm_service.build_batch_request(f"lesson-{i}", job.prompt, job.system_prompt, config=job.config)
+                for i, job in enumerate(selected)
+            ]
+            batch_id = await self.llm_service.submit_batch(requests, backend)
+            batch = {
+                'status': 'batch_submitted',
+                'batch_id': batch_id,
+                'backend': type(backend).__name__,
+                'model': model,
+                'jobs': {request.custom_id: {'topic': job.topic, 'hash': job.request_hash, 'input_tokens': prompt_tokens[job.topic]}
+                         for request, job in zip(requests, selected)},
+                'time': time.time()
+            }
+            self.journal.append(batch)
+
+        results = await self.llm_service.wait_for_batch(batch['batch_id'], backend, **wait_options)
+
+        for custom_id, job in batch['jobs'].items():
+            result = results.get(custom_id)
+            if result is None or result.error or not result.text:
+                error = result.error if result else "no result"
+                logging.error(f"Batch lesson for {job['topic']} failed: {error}")
+                self.journal.append({'topic': job['topic'], 'hash': job['hash'], 'status': 'failed',
+                                     'error': error, 'time': time.time()})
+                stats['failed'] += 1
+                continue
+
+            input_tokens = job['input_tokens']
+            output_tokens = count_tokens(result.text, model)
+            if not await self.lesson_storage.store_lesson(job['topic'], result.text, model=model, prompt_hash=job['hash']):
+                self.journal.append({'topic': job['topic'], 'hash': job['hash'], 'status': 'failed',
+                                     'error': "the lesson could not be stored", 'time': time.time()})
+                stats['failed'] += 1
+                continue
+            self.journal.append({
+                'topic': job['topic'],
+                'hash': job['hash'],
+                'status': 'generated',
+                'model': model,
+                'tokens': input_tokens + output_tokens,
+                'time': time.time()
+            })
+            stats['generated'] += 1
+            stats['tokens'] += input_tokens + output_tokens
+            stats['cost'] += estimate_cost(model, input_tokens, output_tokens)
+        self.journal.append({'status': 'batch_ingested', 'batch_id': batch['batch_id'], 'time': time.time()})
+        if forced_run and not stats['failed'] and not stats['over_budget']:
+            # A resumed batch only covers part of the run; finish it once every topic is done
+            _, _, remaining = await self.select_jobs(topics, forced_run['time'])
+            if not remaining:
+                self.journal.finish_forced_run(forced_run)
+
+        elapsed = max(time.monotonic() - start, 1e-9)
+        stats['cost'] = round(stats['cost'], 4)
+        stats['seconds'] = round(elapsed, 1)
+        stats['lessons_per_minute'] = round(stats['generated'] * 60 / elapsed, 1)
+        stats['tokens_per_second'] = round(stats['tokens'] / elapsed, 1)
+        return stats
+
+def print_summary(stats: Dict) -> None:
+    """Print the summary returned by BatchLessonGenerator.run."""
+    print("\nBatch generation summary:")
+    print(f"  Topics:      {stats['topics']}")
+    print(f"  Generated:   {stats['generated']}")
+    print(f"  Unchanged:   {stats['skipped']}")
+    print(f"  Failed:      {stats['failed']}")
+    print(f"  Over budget: {stats['over_budget']}")
+    print(f"  Tokens:      {stats['tokens']} (estimated cost ${stats['cost']:.2f})")
+    print(f"  Time:        {stats['seconds']}s ({stats['lessons_per_minute']} lessons/min, "
+          f"{stats['tokens_per_second']} tokens/s)")
@@ -1,83 +1,75 @@
+import argparse
 import asyncio
 import os
 import sys
-import json
 from pathlib import Path
-from typing import List, Dict
+from typing import Dict, Optional
 
 # Add the project root to the Python path
 sys.path.append(str(Path(__file__).parent.parent.parent.parent))
 
+from config.settings import LESSON_BATCH_MAX_CONCURRENCY
 from backend.services.physics_service import PhysicsService
-from backend.services.multi_llm_service import MultiLLMService, LLMProvider, LLMModel
+from backend.services.multi_llm_service import LLMProvider, LLMModel, GenerationConfig
+from backend.services.lesson_generation.batch_generator import BatchLessonGenerator, print_summary
 
-async def generate_all_lessons():
+async def generate_all_lessons(force: bool = False, max_concurrency: int = LESSON_BATCH_MAX_CONCURRENCY,
+                               token_budget: Optional[int] = None, cost_budget: Optional[float] = None,
+                               physics_service: PhysicsService = None, batch_api: bool = False) -> Dict:
+    """Generate lessons for every topic in the book with GPT-4.5-preview.
+
+    Topics whose prompt and model are unchanged since their last successful
+    generation are skipped unless force is set, and an interrupted run resumes
+    from the checkpoint journal. A forced run counts as one run until every
+    topic has been regenerated, so running it again resumes it.
+
+    With batch_api set, the lessons go through the provider's offline batch
+    API instead of chat requests.
+
+    Returns:
+        The run summary from BatchLessonGenerator.run
+    """
     # Initialize services
-    physics_service = PhysicsService()
-    
+    physics_service = physics_service or PhysicsService()
+
     # Set OpenAI API key
-    openai_api_key = input("Enter your OpenAI API key: ")
+    openai_api_key = os.getenv("OPENAI_API_KEY") or input("Enter your OpenAI API key: ")
     physics_service.llm_service.set_api_key(LLMProvider.OPENAI, openai_api_key)
-    
-    # Get all chapters and topics
-    chapters = physics_service.get_chapters()
-    
-    # Create lessons directory if it doesn't exist
-    lessons_dir = Path("backend/data/lessons")
-    lessons_dir.mkdir(exist_ok=True, parents=True)
-    
-    # Track all topics for which we'll generate lessons
-    all_topics = []
-    
-    print("Book Structure:")
-    for chapter in chapters:
-        print(f"Chapter {chapter['number']}: {chapter['title']}")
-        for topic in chapter['topics']:
-            print(f"  - {topic}")
-            all_topics.append(topic)
-    
-    print(f"\nTotal topics to generate: {len(all_topics)}")
-    print("Generating lessons...")
-    
-    # Generate lessons for each topic
-    for i, topic in enumerate(all_topics):
-        print(f"[{i+1}/{len(all_topics)}] Generating lesson for: {topic}")
-        
-        # Create a valid filename from the topic
-        filename = topic.replace(' ', '_').replace("'", '').replace(',', '').replace('(', '').replace(')', '')
-        lesson_path = lessons_dir / f"{filename}.md"
-        
-        # Skip if the lesson already exists (comment this out to regenerate all)
-        # if lesson_path.exists():
-        #     print(f"  - Lesson already exists at {lesson_path}, skipping...")
-        #     continue
-        
-        try:
-            # Generate the lesson
-            lesson = await physics_service.generate_lesson(topic)
-            
-            # Save the lesson to a file
-            with open(lesson_path, "w") as f:
-                f.write(lesson)
-            
-            print(f"  - Lesson saved to {lesson_path}")
-        except Exception as e:
-            print(f"  - Error generating lesson for {topic}: {str(e)}")
-    
-    print("\nAll lessons generated successfully!")
-    
-    # Verify that the RAG system is working properly
-    print("\nTesting RAG system with a sample question...")
-    try:
-        question = "What is the relationship between force and acceleration?"
-        topic = "Newton's Laws"
-        answer = await physics_service.answer_question(question, topic, [])
-        print(f"\nQuestion: {question}")
-        print(f"Topic: {topic}")
-        print(f"Answer: {answer[:500]}...")
-        print("\nRAG system is working properly!")
-    except Exception as e:
-        print(f"Error testing RAG system: {str(e)}")
+
+    # Get all topics
+    topics = [topic for chapter in physics_service.get_chapters() for topic in chapter['topics']]
+
+    config = GenerationConfig(provider=LLMProvider.OPENAI, model=LLMModel.GPT45_PREVIEW, temperature=0.7)
+    generator = BatchLessonGenerator(
+        physics_service.llm_service,
+        physics_service.lesson_storage,
+        config,
+        max_concurrency=max_concurrency,
+        token_budget=token_budget,
+        cost_budget=cost_budget
+    )
+    if batch_api:
+        stats = await generator.run_batch_api(topics, force=force)
+    else:
+        stats = await generator.run(topics, force=force)
+    print_summary(stats)
+    return stats
+
+def parse_args(description: str) -> argparse.Namespace:
+    """Parse the command line options shared by the lesson generation scripts."""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--concurrency", type=int, default=LESSON_BATCH_MAX_CONCURRENCY, help="Lessons generated at once")
+    parser.add_argument("--token-budget", type=int, default=None, help="Maximum estimated tokens for the run")
+    parser.add_argument("--cost-budget", type=float, default=None, help="Maximum estimated cost in USD for the run")
+    parser.add_argument("--batch-api", action="store_true",
+                        help="Submit the lessons as one offline batch (cheaper, finishes within 24h) instead of chat requests")
+    return parser.parse_args()
 
 if __name__ == "__main__":
-    asyncio.run(generate_all_lessons())
+    args = parse_args("Generate lessons for all topics that are missing or out of date.")
+    asyncio.run(generate_all_lessons(
+        max_concurrency=args.concurrency,
+        token_budget=args.token_budget,
+        cost_budget=args.cost_budget,
+        batch_api=args.batch_api
+    ))
@@ -1,116 +1,336 @@
 """
 Lesson storage service for caching and retrieving pre-generated lessons.
+
+Lessons are kept in a SQLite database (WAL mode) with one row per topic
+holding the content and its metadata (model, prompt hash, creation time,
+size and checksum). Every write is a single transaction, so concurrent
+writers (threads, generation workers or processes) cannot corrupt the store
+or lose each other's lessons. Lessons from the older layout (a JSON index
+and one .md file per topic) are imported on first use.
+
+Each lesson's slide deck (see backend.services.slides) is built when the
+lesson is stored and kept next to it, so readers get the slides without
+re-splitting the lesson. Decks missing or built by an older slide format are
+rebuilt on first read.
+
+Recently read lessons are kept in an in-memory LRU. Entries are validated
+against the database's data version, which changes only when another
+connection commits; after such a change each entry is revalidated by its
+checksum before it is served again.
 """
 
 import os
 import json
+import time
+import sqlite3
+import asyncio
+import hashlib
 import logging
-from typing import Dict, Optional, List
-import aiofiles
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, List, Tuple
+
+from config.settings import LESSON_CACHE_MAX_ENTRIES
+from backend.services.slides import SLIDES_VERSION, build_slides
 
 class LessonStorage:
     """Service for storing and retrieving pre-generated lessons."""
-    
-    def __init__(self, storage_dir: str = "backend/data/lessons"):
+
+    def __init__(self, storage_dir: str = "backend/data/lessons", cache_size: int = LESSON_CACHE_MAX_ENTRIES):
         """Initialize the lesson storage service.
-        
+
         Args:
-            storage_dir: Directory to store lesson files
+            storage_dir: Directory holding the lesson database
+            cache_size: Maximum number of lessons kept in memory
         """
         self.storage_dir = storage_dir
         os.makedirs(storage_dir, exist_ok=True)
+        self.db_path = os.path.join(storage_dir, "lessons.db")
         self.lessons_index_path = os.path.join(storage_dir, "lessons_index.json")
-        self.lessons_index = self._load_index()
-    
-    def _load_index(self) -> Dict[str, str]:
-        """Load the lessons index from disk."""
-        if os.path.exists(self.lessons_index_path):
-            try:
-                with open(self.lessons_index_path, 'r') as f:
-                    return json.load(f)
-            except Exception as e:
-                logging.error(f"Error loading lessons index: {str(e)}")
-                return {}
-        return {}
-    
-    async def _save_index(self) -> None:
-        """Save the lessons index to disk."""
-        try:
-            async with aiofiles.open(self.lessons_index_path, 'w') as f:
-                await f.write(json.dumps(self.lessons_index, indent=2))
-        except Exception as e:
-            logging.error(f"Error saving lessons index: {str(e)}")
-    
-    def _get_lesson_path(self, topic: str) -> str:
-        """Get the file path for a lesson."""
-        # Create a safe filename from the topic
-        safe_filename = "".join(c if c.isalnum() else "_" for c in topic)
-        return os.path.join(self.storage_dir, f"{safe_filename}.md")
-    
+
+        self._lock = threading.Lock()
+        # Topic -> (content, checksum, slides or None), ordered from least to most recently used
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        # Cached topics to revalidate after another connection changed the database
+        self._unvalidated = set()
+        self._data_version = None
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_revalidations = 0
+        # The timeout makes writers from other processes wait for the lock instead of failing
+        self.conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        with self.conn:
+            self.conn.execute(
+                """CREATE TABLE IF NOT EXISTS lessons (
+                    topic TEXT PRIMARY KEY,
+                    content TEXT NOT NULL,
+                    model TEXT,
+                    prompt_hash TEXT,
+                    created_at REAL NOT NULL,
+                    size INTEGER NOT NULL,
+                    checksum TEXT NOT NULL,
+                    slides TEXT
+                )"""
+            )
+            columns = [row[1] for row in self.conn.execute("PRAGMA table_info(lessons)")]
+            if 'slides' not in columns:
+                self.conn.execute("ALTER TABLE lessons ADD COLUMN slides TEXT")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._migrate_files()
+
+    @staticmethod
+    def checksum(content: str) -> str:
+        """Get the checksum stored with a lesson."""
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+    def _migrate_files(self) -> None:
+        """Import lessons from the JSON index and .md files, once."""
+        with self._lock:
+            if self.conn.execute("SELECT 1 FROM meta WHERE key = 'files_migrated'").fetchone():
+                return
+
+            # Topic -> lesson file, from the index and from files written without it
+            files = {}
+            for name in sorted(os.listdir(self.storage_dir)):
+                if name.endswith(".md"):
+                    files[name[:-3].replace("_", " ")] = os.path.join(self.storage_dir, name)
+            if os.path.exists(self.lessons_index_path):
+                try:
+                    with open(self.lessons_index_path, 'r') as f:
+                        for topic, path in json.load(f).items():
+                            files.pop(os.path.basename(path)[:-3].replace("_", " "), None)
+                            files[topic] = path if os.path.exists(path) else os.path.join(self.storage_dir, os.path.basename(path))
+                except Exception as e:
+                    logging.error(f"Error loading lessons index: {str(e)}")
+
+            rows = []
+            for topic, path in files.items():
+                try:
+                    with open(path, 'r') as f:
+                        content = f.read()
+                    rows.append((topic, content, os.path.getmtime(path), len(content.encode('utf-8')), self.checksum(content)))
+                except Exception as e:
+                    logging.error(f"Error migrating lesson file {path}: {str(e)}")
+
+            with self.conn:
+                # Lessons already in the database take precedence
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO lessons (topic, content, created_at, size, checksum) VALUES (?, ?, ?, ?, ?)",
+                    rows
+                )
+                self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('files_migrated', ?)", (str(time.time()),))
+            if rows:
+                logging.info(f"Migrated {len(rows)} lesson files into {self.db_path}")
+
+    @staticmethod
+    def _load_slides(value: Optional[str]) -> Optional[List[Dict[str, str]]]:
+        """Decode a stored slide deck, or None if it is missing or from an older slide format."""
+        if not value:
+            return None
+        data = json.loads(value)
+        if data.get('version') != SLIDES_VERSION:
+            return None
+        return data['slides']
+
+    @staticmethod
+    def _dump_slides(slides: List[Dict[str, str]]) -> str:
+        return json.dumps({'version': SLIDES_VERSION, 'slides': slides})
+
+    def _cache_put(self, topic: str, content: str, checksum: str, slides: Optional[List[Dict[str, str]]] = None) -> None:
+        """Add a lesson to the LRU, evicting the least recently used one if full. Call with the lock held."""
+        self._cache[topic] = (content, checksum, slides)
+        self._cache.move_to_end(topic)
+        self._unvalidated.discard(topic)
+        while len(self._cache) > self.cache_size:
+            evicted, _ = self._cache.popitem(last=False)
+            self._unvalidated.discard(evicted)
+
+    def _get_cached(self, topic: str) -> Tuple[bool, Optional[Tuple]]:
+        """Look a lesson up in the LRU.
+
+        Returns:
+            Whether the lookup was answered, and the (content, checksum, slides)
+            entry. Unanswered lookups must read the database.
+        """
+        with self._lock:
+            data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+            if data_version != self._data_version:
+                # Another connection committed; every cached entry may be stale
+                self._unvalidated = set(self._cache)
+                self._data_version = data_version
+
+            entry = self._cache.get(topic)
+            if entry is None:
+                return False, None
+
+            if topic in self._unvalidated:
+                self.cache_revalidations += 1
+                row = self.conn.execute("SELECT checksum FROM lessons WHERE topic = ?", (topic,)).fetchone()
+                if row is None or row[0] != entry[1]:
+                    del self._cache[topic]
+                    self._unvalidated.discard(topic)
+                    return False, None
+                self._unvalidated.discard(topic)
+
+            self._cache.move_to_end(topic)
+            self.cache_hits += 1
+            return True, entry
+
+    def _get_lesson(self, topic: str) -> Optional[Tuple]:
+        """Read a lesson into the LRU, building its slides if they are missing or stale."""
+        with self._lock:
+            self.cache_misses += 1
+            row = self.conn.execute("SELECT content, checksum, slides FROM lessons WHERE topic = ?", (topic,)).fetchone()
+            if row is None:
+                return None
+            content, checksum, stored_slides = row
+            slides = self._load_slides(stored_slides)
+            if slides is None:
+                slides = build_slides(content)
+                with self.conn:
+                    # Only if the lesson was not replaced in the meantime
+                    self.conn.execute(
+                        "UPDATE lessons SET slides = ? WHERE topic = ? AND checksum = ?",
+                        (self._dump_slides(slides), topic, checksum)
+                    )
+            self._cache_put(topic, content, checksum, slides)
+        return content, checksum, slides
+
+    def _store_lesson(self, topic: str, content: str, model: Optional[str], prompt_hash: Optional[str]) -> None:
+        checksum = self.checksum(content)
+        slides = build_slides(content)
+        with self._lock:
+            with self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO lessons (topic, content, model, prompt_hash, created_at, size, checksum, slides) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (topic, content, model, prompt_hash, time.time(), len(content.encode('utf-8')), checksum,
+                     self._dump_slides(slides))
+                )
+            self._cache_put(topic, content, checksum, slides)
+
+    def _delete_lesson(self, topic: str) -> bool:
+        with self._lock:
+            with self.conn:
+                deleted = self.conn.execute("DELETE FROM lessons WHERE topic = ?", (topic,)).rowcount > 0
+            self._cache.pop(topic, None)
+            self._unvalidated.discard(topic)
+        return deleted
+
+    def _get_metadata(self, topic: Optional[str] = None) -> Dict[str, Dict]:
+        query = "SELECT topic, model, prompt_hash, created_at, size, checksum FROM lessons"
+        with self._lock:
+            if topic is None:
+                rows = self.conn.execute(query).fetchall()
+            else:
+                rows = self.conn.execute(query + " WHERE topic = ?", (topic,)).fetchall()
+        columns = ('model', 'prompt_hash', 'created_at', 'size', 'checksum')
+        return {row[0]: dict(zip(columns, row[1:])) for row in rows}
+
     async def get_lesson(self, topic: str) -> Optional[str]:
         """Get a lesson for a topic if it exists in storage.
-        
+
         Args:
             topic: The topic to retrieve a lesson for
-            
+
         Returns:
             The lesson content if found, None otherwise
         """
-        if topic in self.lessons_index:
-            lesson_path = self._get_lesson_path(topic)
-            if os.path.exists(lesson_path):
-                try:
-                    async with aiofiles.open(lesson_path, 'r') as f:
-                        return await f.read()
-                except Exception as e:
-                    logging.error(f"Error reading lesson file for {topic}: {str(e)}")
-        return None
-    
-    async def store_lesson(self, topic: str, content: str) -> None:
-        """Store a lesson for a topic.
-        
+        entry = await self._get_entry(topic)
+        return entry[0] if entry else None
+
+    async def get_slides(self, topic: str) -> Optional[List[Dict[str, str]]]:
+        """Get the slide deck of a stored lesson.
+
+        Args:
+            topic: The topic to retrieve the slides for
+
+        Returns:
+            One dict per slide with the "markdown", "html" and "speech" forms of
+            the slide, or None if there is no lesson for the topic
+        """
+        entry = await self._get_entry(topic)
+        return entry[2] if entry else None
+
+    async def _get_entry(self, topic: str) -> Optional[Tuple]:
+        """Get the (content, checksum, slides) of a lesson, from the LRU if possible."""
+        try:
+            # Cached lessons are served without a thread handoff
+            found, entry = self._get_cached(topic)
+            if found and entry[2] is not None:
+                return entry
+            return await asyncio.to_thread(self._get_lesson, topic)
+        except Exception as e:
+            logging.error(f"Error reading lesson for {topic}: {str(e)}")
+            return None
+
+    async def store_lesson(self, topic: str, content: str, model: Optional[str] = None, prompt_hash: Optional[str] = None) -> bool:
+        """Store a lesson for a topic, replacing any previous one.
+
         Args:
             topic: The topic the lesson is about
             content: The lesson content
+            model: The model that generated the lesson
+            prompt_hash: Hash of the request the lesson was generated from
+
+        Returns:
+            True if the lesson was stored, False otherwise
         """
-        lesson_path = self._get_lesson_path(topic)
         try:
-            async with aiofiles.open(lesson_path, 'w') as f:
-                await f.write(content)
-            
-            # Update the index
-            self.lessons_index[topic] = lesson_path
-            await self._save_index()
+            await asyncio.to_thread(self._store_lesson, topic, content, getattr(model, 'value', model), prompt_hash)
             logging.info(f"Stored lesson for topic: {topic}")
+            return True
         except Exception as e:
             logging.error(f"Error storing lesson for {topic}: {str(e)}")
-    
+            return False
+
     async def get_all_topics(self) -> List[str]:
         """Get all topics that have stored lessons.
-        
+
         Returns:
             List of topics with stored lessons
         """
-        return list(self.lessons_index.keys())
-    
+        return list(await self.get_all_metadata())
+
+    async def get_lesson_metadata(self, topic: str) -> Optional[Dict]:
+        """Get the metadata of a stored lesson.
+
+        Returns:
+            The model, prompt_hash, created_at, size and checksum, or None if there is no lesson
+        """
+        return (await asyncio.to_thread(self._get_metadata, topic)).get(topic)
+
+    async def get_all_metadata(self) -> Dict[str, Dict]:
+        """Get the metadata of every stored lesson, by topic."""
+        return await asyncio.to_thread(self._get_metadata)
+
+    def get_cache_stats(self) -> Dict[str, int]:
+        """Get hit/miss counters and the current size of the in-memory lesson cache."""
+        with self._lock:
+            return {
+                'hits': self.cache_hits,
+                'misses': self.cache_misses,
+                'revalidations': self.cache_revalidations,
+                'entries': len(self._cache),
+                'max_entries': self.cache_size
+            }
+
     async def delete_lesson(self, topic: str) -> bool:
         """Delete a stored lesson.
-        
+
         Args:
             topic: The topic to delete the lesson for
-            
+
         Returns:
             True if the lesson was deleted, False otherwise
         """
-        if topic in self.lessons_index:
-            lesson_path = self._get_lesson_path(topic)
-            if os.path.exists(lesson_path):
-                try:
-                    os.remove(lesson_path)
-                    del self.lessons_index[topic]
-                    await self._save_index()
-                    logging.info(f"Deleted lesson for topic: {topic}")
-                    return True
-                except Exception as e:
-                    logging.error(f"Error deleting lesson for {topic}: {str(e)}")
-        return False
+        try:
+            deleted = await asyncio.to_thread(self._delete_lesson, topic)
+            if deleted:
+                logging.info(f"Deleted lesson for topic: {topic}")
+            return deleted
+        except Exception as e:
+            logging.error(f"Error deleting lesson for {topic}: {str(e)}")
+            return False
@@ -0,0 +1,108 @@
+"""
+In-memory BM25 lexical index and reciprocal-rank fusion.
+
+The lexical index is built over the same chunks as the FAISS vector store, so
+results from both can be fused by chunk ID. It needs no network access, which
+keeps retrieval working when no OpenAI API key is configured.
+"""
+
+import math
+from typing import Dict, Iterable, List, Tuple
+
+# Common words that carry no topical signal in student questions
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'can', 'do', 'does', 'for',
+    'from', 'how', 'i', 'in', 'is', 'it', 'its', 'of', 'on', 'or', 'that', 'the',
+    'this', 'to', 'what', 'when', 'where', 'which', 'who', 'why', 'with', 'you'
+}
+
+class BM25Index:
+    """Okapi BM25 index over tokenized documents."""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        """Initialize an empty index.
+
+        Args:
+            k1: Term frequency saturation
+            b: Document length normalization
+        """
+        self.k1 = k1
+        self.b = b
+        # Term -> {doc ID -> term frequency}
+        self.postings = {}
+        # Doc ID -> distinct terms in the document
+        self.doc_terms = {}
+        # Doc ID -> document length in tokens
+        self.doc_lengths = {}
+        self.total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def add(self, doc_id: int, tokens: List[str]) -> None:
+        """Add a document to the index, replacing it if it already exists."""
+        if doc_id in self.doc_lengths:
+            self.remove(doc_id)
+
+        term_counts = {}
+        for token in tokens:
+            term_counts[token] = term_counts.get(token, 0) + 1
+        for term, count in term_counts.items():
+            self.postings.setdefault(term, {})[doc_id] = count
+        self.doc_terms[doc_id] = list(term_counts)
+
+        self.doc_lengths[doc_id] = len(tokens)
+        self.total_length += len(tokens)
+
+    def remove(self, doc_id: int) -> None:
+        """Remove a document from the index."""
+        if doc_id not in self.doc_lengths:
+            return
+
+        for term in self.doc_terms.pop(doc_id):
+            postings = self.postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self.postings[term]
+
+        self.total_length -= self.doc_lengths.pop(doc_id)
+
+    def search(self, query_tokens: Iterable[str], k: int) -> List[Tuple[int, float]]:
+        """Score documents against a query.
+
+        Returns:
+            Up to k (doc ID, score) pairs, best first
+        """
+        if not self.doc_lengths:
+            return []
+
+        num_docs = len(self.doc_lengths)
+        avg_length = self.total_length / num_docs
+        scores = {}
+
+        for term in set(query_tokens) - STOPWORDS:
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (num_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, tf in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]
+
+def reciprocal_rank_fusion(rankings: List[List[int]], k: int = 60) -> List[Tuple[int, float]]:
+    """Fuse several ranked lists of doc IDs with reciprocal-rank fusion.
+
+    Args:
+        rankings: Ranked lists of doc IDs, best first
+        k: Rank offset that damps the influence of the top positions
+
+    Returns:
+        (doc ID, fused score) pairs, best first
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
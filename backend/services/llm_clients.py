@@ -0,0 +1,97 @@
+"""
+Shared clients for the LLM provider APIs.
+
+Clients are cached per provider, API key (by hash) and event loop, and sit on
+pooled httpx transports with keep-alive, so concurrent requests reuse open
+connections instead of paying a TLS handshake and an executor thread each.
+An httpx connection pool is bound to the event loop it was created on, which
+is why async clients are not shared between loops. Synchronous callers (e.g.
+embedding a single query) get a process-wide client whose pool is shared by
+all threads.
+"""
+
+import asyncio
+import hashlib
+import threading
+import weakref
+from typing import Union
+
+import httpx
+import openai
+import anthropic
+
+from config.settings import (
+    DEFAULT_API_TIMEOUT, LLM_CONNECT_TIMEOUT, LLM_MAX_CONNECTIONS,
+    LLM_MAX_KEEPALIVE_CONNECTIONS, LLM_KEEPALIVE_EXPIRY
+)
+
+# Event loop -> {(provider, key hash) -> client}
+_clients = weakref.WeakKeyDictionary()
+# (provider, key hash) -> synchronous client
+_sync_clients = {}
+_clients_lock = threading.Lock()
+
+def _make_http_client(client_class=httpx.AsyncClient):
+    """Create a pooled httpx client with the configured limits and timeouts."""
+    return client_class(
+        limits=httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=LLM_KEEPALIVE_EXPIRY
+        ),
+        timeout=httpx.Timeout(DEFAULT_API_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+        follow_redirects=True
+    )
+
+def _client_key(provider: str, api_key: str):
+    return (getattr(provider, 'value', provider), hashlib.sha256(api_key.encode('utf-8')).hexdigest())
+
+def get_async_client(provider: str, api_key: str) -> Union[openai.AsyncOpenAI, anthropic.AsyncAnthropic]:
+    """Get the shared async client for a provider and API key on the running event loop.
+
+    Args:
+        provider: "openai" or "anthropic"
+        api_key: The API key the client authenticates with
+
+    Returns:
+        An AsyncOpenAI or AsyncAnthropic client
+    """
+    loop = asyncio.get_running_loop()
+    key = _client_key(provider, api_key)
+
+    with _clients_lock:
+        loop_clients = _clients.setdefault(loop, {})
+        client = loop_clients.get(key)
+        if client is None:
+            if key[0] == "openai":
+                client = openai.AsyncOpenAI(api_key=api_key, http_client=_make_http_client())
+            elif key[0] == "anthropic":
+                client = anthropic.AsyncAnthropic(api_key=api_key, http_client=_make_http_client())
+            else:
+                raise ValueError(f"Unsupported provider: {provider}")
+            loop_clients[key] = client
+        return client
+
+def get_client(provider: str, api_key: str) -> Union[openai.OpenAI, anthropic.Anthropic]:
+    """Get the shared synchronous client for a provider and API key.
+
+    Args:
+        provider: "openai" or "anthropic"
+        api_key: The API key the client authenticates with
+
+    Returns:
+        An OpenAI or Anthropic client
+    """
+    key = _client_key(provider, api_key)
+
+    with _clients_lock:
+        client = _sync_clients.get(key)
+        if client is None:
+            if key[0] == "openai":
+                client = openai.OpenAI(api_key=api_key, http_client=_make_http_client(httpx.Client))
+            elif key[0] == "anthropic":
+                client = anthropic.Anthropic(api_key=api_key, http_client=_make_http_client(httpx.Client))
+            else:
+                raise ValueError(f"Unsupported provider: {provider}")
+            _sync_clients[key] = client
+        return client
@@ -1,16 +1,22 @@
 import os
+import uuid
+import asyncio
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
 from langchain.memory import ConversationBufferMemory
 from langchain_core.runnables import RunnableWithMessageHistory
 from langchain_core.messages import HumanMessage, SystemMessage
 from elevenlabs import ElevenLabs, Voice, VoiceSettings   # ElevenLabs TTS
+from backend.services.voice_pipeline import stream_with_speech
+from backend.services.audio_store import audio_key
+from backend.services.container import get_container
 
 # Load API keys
 load_dotenv()
 api_key = os.getenv("OPENAI_API_KEY")
 elevenlabs_api_key = os.getenv("ELEVENLABS_API_KEY")
 voice_id = os.getenv("ELEVENLABS_VOICE_ID") #Brian
+elevenlabs_model = "eleven_monolingual_v1"
 
 if not api_key:
     raise ValueError("OpenAI API key not found. Make sure it's set in the .env file.")
@@ -42,14 +48,8 @@ conversation = RunnableWithMessageHistory(
     get_session_history=get_session_history,
 )
 
-# Generate response function using conversation memory
-# Generate response function using conversation memory with voice output toggle
-def generate_response(prompt, session_id=None, voice_enabled=True):
-    if session_id is None:
-        session_id = str(uuid.uuid4())  # Generate a new session ID if not provided
-
-    memory = get_session_history(session_id)
-    
+# Build the messages for a prompt: system prompt, conversation so far and the new prompt
+def build_messages(prompt, memory):
     # Retrieve stored messages from memory
     past_messages = memory.load_memory_variables({}).get("history", [])
     
@@ -69,6 +69,16 @@ def generate_response(prompt, session_id=None, voice_enabled=True):
     
     # Add the new prompt as a HumanMessage
     messages.append(HumanMessage(content=prompt))
+    return messages
+
+# Generate response function using conversation memory
+# Generate response function using conversation memory with voice output toggle
+def generate_response(prompt, session_id=None, voice_enabled=True):
+    if session_id is None:
+        session_id = str(uuid.uuid4())  # Generate a new session ID if not provided
+
+    memory = get_session_history(session_id)
+    messages = build_messages(prompt, memory)
 
     # Generate the response
     response = llm.invoke(messages)
@@ -81,24 +91,54 @@ def generate_response(prompt, session_id=None, voice_enabled=True):
     audio_path = text_to_speech(response.content) if voice_enabled else None
     return response.content.strip(), audio_path
 
-# ElevenLabs Text-to-Speech function (Fixed)
-def text_to_speech(text, filename="response.mp3"):
-    audio_stream = elevenlabs_client.generate(
+# Stream the response with voice output: yields ("text", chunk) events as the LLM generates
+# them and, if voice is enabled, ("audio", mp3 bytes) for each sentence as soon as it is spoken
+async def stream_response(prompt, session_id=None, voice_enabled=True):
+    if session_id is None:
+        session_id = str(uuid.uuid4())  # Generate a new session ID if not provided
+
+    memory = get_session_history(session_id)
+    messages = build_messages(prompt, memory)
+    parts = []
+
+    async def chunks():
+        async for message in llm.astream(messages):
+            if message.content:
+                parts.append(message.content)
+                yield message.content
+
+    if voice_enabled:
+        events = stream_with_speech(chunks(), synthesize_speech)
+    else:
+        events = (("text", chunk) async for chunk in chunks())
+    async for event in events:
+        yield event
+
+    # Store the complete response in memory
+    memory.chat_memory.add_message(HumanMessage(content=prompt))
+    memory.chat_memory.add_message(SystemMessage(content="".join(parts)))
+
+# Request ElevenLabs audio for a text; returns an iterator of MP3 chunks
+def elevenlabs_audio(text):
+    return elevenlabs_client.generate(
         text=text,
         voice=Voice(
             voice_id=voice_id,
             settings=VoiceSettings(stability=0.75, similarity_boost=0.75)
         ),
-        model="eleven_monolingual_v1"
+        model=elevenlabs_model
     )
-    
-    audio_dir = "backend/audio"
-    os.makedirs(audio_dir, exist_ok=True)
-    filepath = os.path.join(audio_dir, filename)
 
-    # Convert audio stream to bytes and save
-    with open(filepath, "wb") as audio_file:
-        for chunk in audio_stream:
-            audio_file.write(chunk)
+# Synthesize a text with ElevenLabs without blocking the event loop; returns the MP3 bytes
+async def synthesize_speech(text):
+    return await asyncio.to_thread(lambda: b"".join(elevenlabs_audio(text)))
 
-    return filepath
\ No newline at end of file
+# ElevenLabs Text-to-Speech function; the audio is kept in the shared audio store under a key
+# unique to its content, so concurrent requests never overwrite each other's files
+def text_to_speech(text):
+    audio_store = get_container().audio_store
+    key = audio_key(text, voice_id, elevenlabs_model)
+    audio_path = audio_store.get(key)
+    if audio_path:
+        return audio_path
+    return audio_store.put(key, b"".join(elevenlabs_audio(text)))
@@ -8,13 +8,18 @@ allowing users to choose their preferred model and use their own API keys.
 import os
 import logging
 import asyncio
-from typing import Dict, List, Optional, Tuple, Any, Union
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Any, Union
 from enum import Enum
+from dataclasses import dataclass, replace
 
 # Import LLM providers
 import openai
 import anthropic
 
+from config.settings import DEFAULT_API_TIMEOUT, DEFAULT_TEMPERATURE, BATCH_POLL_INTERVAL
+from backend.services.llm_clients import get_async_client
+from backend.services.response_cache import ResponseCache, make_cache_key, get_response_cache
+
 # LangChain imports for compatibility
 from langchain_openai import ChatOpenAI
 from langchain_anthropic import ChatAnthropic
@@ -38,15 +43,34 @@ class LLMModel(str, Enum):
     CLAUDE_3_SONNET = "claude-3-sonnet-20240229"
     CLAUDE_3_HAIKU = "claude-3-haiku-20240307"
 
+@dataclass(frozen=True)
+class GenerationConfig:
+    """Provider, model and request parameters for a single generation request.
+    
+    Passed explicitly down the call stack instead of switching the service's
+    active provider and model, so one service can serve concurrent requests.
+    """
+    provider: LLMProvider
+    model: LLMModel
+    temperature: float = DEFAULT_TEMPERATURE
+    max_tokens: Optional[int] = None  # None uses the provider default (4000 for Anthropic)
+    timeout: float = DEFAULT_API_TIMEOUT
+
 class MultiLLMService:
     """Service for interacting with multiple LLM providers."""
     
-    def __init__(self):
-        """Initialize the Multi-LLM service."""
+    def __init__(self, response_cache: Optional[ResponseCache] = None):
+        """Initialize the Multi-LLM service.
+        
+        Args:
+            response_cache: Cache of responses to identical requests; defaults to
+                the one configured in the settings (none unless RESPONSE_CACHE_BACKEND is set)
+        """
         self.active_provider = LLMProvider.OPENAI
         self.active_model = LLMModel.GPT4
         self.api_keys = {}
         self.clients = {}
+        self.response_cache = response_cache if response_cache is not None else get_response_cache()
         
         # Initialize with environment variables if available
         if os.getenv("OPENAI_API_KEY"):
@@ -57,14 +81,18 @@ class MultiLLMService:
     
     def set_api_key(self, provider: LLMProvider, api_key: str) -> None:
         """Set the API key for a specific provider."""
+        # Keep the existing client (and its connection pool) if the key did not change
+        if self.api_keys.get(provider) == api_key and provider in self.clients:
+            return
         self.api_keys[provider] = api_key
         
-        # Initialize the client for this provider
+        # Initialize the sync client for this provider, used for embeddings and batch jobs;
+        # generation goes through the shared async clients (see llm_clients).
+        # The key is kept on this instance only (not exported to the environment)
+        # so it does not leak into other sessions.
         if provider == LLMProvider.OPENAI:
-            os.environ["OPENAI_API_KEY"] = api_key
             self.clients[provider] = openai.OpenAI(api_key=api_key)
         elif provider == LLMProvider.ANTHROPIC:
-            os.environ["ANTHROPIC_API_KEY"] = api_key
             self.clients[provider] = anthropic.Anthropic(api_key=api_key)
 
     
@@ -107,62 +135,163 @@ class MultiLLMService:
         
         return provider_models.get(provider, [])
     
-    async def generate_text(self, prompt: str, system_prompt: str = "", temperature: float = 0.7, messages: List[Dict[str, str]] = None) -> str:
-        """Generate text using the active provider and model.
+    def get_generation_config(self, provider: Optional[LLMProvider] = None, model: Optional[LLMModel] = None, **overrides) -> GenerationConfig:
+        """Build a generation config, defaulting to the active provider and model.
+        
+        Args:
+            provider: Provider to use instead of the active one
+            model: Model to use instead of the active one
+            **overrides: Other GenerationConfig fields (temperature, max_tokens, timeout)
+        
+        Returns:
+            An immutable config for a single request
+        """
+        return GenerationConfig(
+            provider=provider or self.active_provider,
+            model=model or self.active_model,
+            **overrides
+        )
+    
+    def _get_fallback_config(self, config: GenerationConfig) -> Optional[GenerationConfig]:
+        """Get the config for retrying a failed request with another available provider."""
+        fallback_providers = [p for p in self.get_available_providers() if p != config.provider]
+        if not fallback_providers:
+            return None
+        fallback = fallback_providers[0]
+        return replace(config, provider=fallback, model=self.get_available_models(fallback)[0])
+    
+    def _response_cache_key(self, prompt: str, system_prompt: str, messages: Optional[List[Dict[str, str]]], config: GenerationConfig) -> str:
+        """Get the response cache key for a request.
+        
+        The key is built from the OpenAI form of the messages, which determines
+        the request for either provider.
+        """
+        return make_cache_key(
+            config.provider,
+            config.model,
+            self._build_openai_messages(prompt, system_prompt, messages),
+            config.temperature,
+            config.max_tokens
+        )
+    
+    async def generate_text(self, prompt: str, system_prompt: str = "", temperature: float = 0.7, messages: List[Dict[str, str]] = None, config: Optional[GenerationConfig] = None, allow_fallback: bool = True, use_cache: bool = True) -> str:
+        """Generate text with the given config (default: the active provider and model).
         
         Args:
             prompt: The prompt to generate text from. If messages is provided, this will be added as the last user message.
             system_prompt: The system prompt to use.
-            temperature: The temperature to use for generation.
+            temperature: The temperature to use for generation (ignored if config is given).
             messages: Optional list of message dictionaries with 'role' and 'content' keys. If provided, these will be used instead of creating a simple system+user message pair.
+            config: Provider, model and request parameters for this call. The service
+                state is never changed, so concurrent calls cannot affect each other.
+            allow_fallback: Whether to retry with another available provider on failure.
+            use_cache: Whether to use the response cache; False bypasses it for this call.
         
         Returns:
             The generated text.
+        
+        Raises:
+            ResponseCacheMiss: If the response cache is in replay mode and has no
+                response for this request
         """
-        if self.active_provider not in self.api_keys:
-            raise ValueError(f"No API key set for provider: {self.active_provider}")
+        config = config or self.get_generation_config(temperature=temperature)
+        
+        cache_key = None
+        if use_cache and self.response_cache is not None:
+            cache_key = self._response_cache_key(prompt, system_prompt, messages, config)
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        if config.provider not in self.api_keys:
+            raise ValueError(f"No API key set for provider: {config.provider}")
         
         try:
             # OpenAI
-            if self.active_provider == LLMProvider.OPENAI:
-                return await self._generate_openai(prompt, system_prompt, temperature, messages)
+            if config.provider == LLMProvider.OPENAI:
+                response = await self._generate_openai(prompt, system_prompt, messages, config)
             
             # Anthropic
-            elif self.active_provider == LLMProvider.ANTHROPIC:
-                return await self._generate_anthropic(prompt, system_prompt, temperature, messages)
+            elif config.provider == LLMProvider.ANTHROPIC:
+                response = await self._generate_anthropic(prompt, system_prompt, messages, config)
             
             else:
-                raise ValueError(f"Unsupported provider: {self.active_provider}")
+                raise ValueError(f"Unsupported provider: {config.provider}")
+            
+            # Responses from a fallback provider are not cached under this request
+            if cache_key is not None:
+                self.response_cache.put(cache_key, response)
+            return response
                 
         except Exception as e:
-            logging.error(f"Error generating text with {self.active_provider} ({self.active_model}): {str(e)}")
+            logging.error(f"Error generating text with {config.provider} ({config.model}): {str(e)}")
             # Try a fallback if available
-            fallback_providers = [p for p in self.get_available_providers() if p != self.active_provider]
-            if fallback_providers:
-                fallback = fallback_providers[0]
-                logging.info(f"Trying fallback provider: {fallback}")
-                old_provider = self.active_provider
-                self.active_provider = fallback
-                self.active_model = self.get_available_models()[0]
-                try:
-                    result = await self.generate_text(prompt, system_prompt, temperature, messages)
-                    return result
-                finally:
-                    # Restore original provider
-                    self.active_provider = old_provider
+            fallback_config = self._get_fallback_config(config) if allow_fallback else None
+            if fallback_config:
+                logging.info(f"Trying fallback provider: {fallback_config.provider}")
+                return await self.generate_text(prompt, system_prompt, messages=messages, config=fallback_config, allow_fallback=False, use_cache=False)
             
             # If no fallback or fallback failed
             raise
     
-    async def _generate_openai(self, prompt: str, system_prompt: str, temperature: float, messages: List[Dict[str, str]] = None) -> str:
-        """Generate text using OpenAI."""
-        client = self.clients[LLMProvider.OPENAI]
+    async def stream_text(self, prompt: str, system_prompt: str = "", temperature: float = 0.7, messages: List[Dict[str, str]] = None, config: Optional[GenerationConfig] = None, allow_fallback: bool = True, use_cache: bool = True) -> AsyncIterator[str]:
+        """Stream text as it is generated.
+        
+        Takes the same arguments as generate_text. If the request fails before any
+        text was produced, the next available provider is tried, as in generate_text.
+        A cached response is yielded as a single chunk.
         
+        Yields:
+            Chunks of the generated text
+        """
+        config = config or self.get_generation_config(temperature=temperature)
+        
+        cache_key = None
+        if use_cache and self.response_cache is not None:
+            cache_key = self._response_cache_key(prompt, system_prompt, messages, config)
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                yield cached
+                return
+        
+        if config.provider not in self.api_keys:
+            raise ValueError(f"No API key set for provider: {config.provider}")
+        
+        if config.provider == LLMProvider.OPENAI:
+            chunks = self._stream_openai(prompt, system_prompt, messages, config)
+        elif config.provider == LLMProvider.ANTHROPIC:
+            chunks = self._stream_anthropic(prompt, system_prompt, messages, config)
+        else:
+            raise ValueError(f"Unsupported provider: {config.provider}")
+        
+        started = False
+        response = []
+        try:
+            async for chunk in chunks:
+                started = True
+                response.append(chunk)
+                yield chunk
+        except Exception as e:
+            logging.error(f"Error streaming text with {config.provider} ({config.model}): {str(e)}")
+            fallback_config = self._get_fallback_config(config) if allow_fallback else None
+            if started or not fallback_config:
+                raise
+            
+            logging.info(f"Trying fallback provider: {fallback_config.provider}")
+            async for chunk in self.stream_text(prompt, system_prompt, messages=messages, config=fallback_config, allow_fallback=False, use_cache=False):
+                yield chunk
+            return
+        
+        if cache_key is not None:
+            self.response_cache.put(cache_key, "".join(response))
+    
+    def _build_openai_messages(self, prompt: str, system_prompt: str, messages: List[Dict[str, str]] = None) -> List[Dict[str, str]]:
+        """Build the message list for an OpenAI chat request."""
         # If messages are provided, use them directly
         if messages:
-            # Make sure we have a system message
+            # Make sure we have a system message (without modifying the caller's list)
             if not any(msg.get("role") == "system" for msg in messages):
-                messages.insert(0, {"role": "system", "content": system_prompt})
+                messages = [{"role": "system", "content": system_prompt}] + list(messages)
                 
             # Log the messages for debugging
             logging.info(f"Using {len(messages)} messages for OpenAI generation")
@@ -173,20 +302,47 @@ class MultiLLMService:
                 {"role": "user", "content": prompt}
             ]
         
-        response = await asyncio.to_thread(
-            lambda: client.chat.completions.create(
-                model=self.active_model,
-                messages=messages,
-                temperature=temperature
-            )
+        return messages
+    
+    def _openai_request_options(self, config: GenerationConfig) -> Dict[str, Any]:
+        """Get the OpenAI request parameters for a config."""
+        options = {
+            "model": config.model,
+            "temperature": config.temperature,
+            "timeout": config.timeout
+        }
+        if config.max_tokens:
+            options["max_tokens"] = config.max_tokens
+        return options
+    
+    async def _generate_openai(self, prompt: str, system_prompt: str, messages: List[Dict[str, str]], config: GenerationConfig) -> str:
+        """Generate text using OpenAI."""
+        client = get_async_client(LLMProvider.OPENAI, self.api_keys[LLMProvider.OPENAI])
+        messages = self._build_openai_messages(prompt, system_prompt, messages)
+        
+        response = await client.chat.completions.create(
+            messages=messages,
+            **self._openai_request_options(config)
         )
         
         return response.choices[0].message.content.strip()
     
-    async def _generate_anthropic(self, prompt: str, system_prompt: str, temperature: float, messages: List[Dict[str, str]] = None) -> str:
-        """Generate text using Anthropic."""
-        client = self.clients[LLMProvider.ANTHROPIC]
+    async def _stream_openai(self, prompt: str, system_prompt: str, messages: List[Dict[str, str]], config: GenerationConfig) -> AsyncIterator[str]:
+        """Stream text using OpenAI."""
+        client = get_async_client(LLMProvider.OPENAI, self.api_keys[LLMProvider.OPENAI])
+        messages = self._build_openai_messages(prompt, system_prompt, messages)
         
+        stream = await client.chat.completions.create(
+            messages=messages,
+            stream=True,
+            **self._openai_request_options(config)
+        )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    
+    def _build_anthropic_messages(self, prompt: str, system_prompt: str, messages: List[Dict[str, str]] = None) -> Tuple[str, List[Dict[str, str]]]:
+        """Build the system prompt and message list for an Anthropic request."""
         # Anthropic has a different message format than OpenAI
         # It separates the system prompt from the messages
         
@@ -205,24 +361,134 @@ class MultiLLMService:
             # Create a simple user message
             anthropic_messages = [{"role": "user", "content": prompt}]
         
-        response = await asyncio.to_thread(
-            lambda: client.messages.create(
-                model=self.active_model,
-                system=system_prompt,
-                messages=anthropic_messages,
-                temperature=temperature,
-                max_tokens=4000  # Adding required max_tokens parameter
-            )
+        return system_prompt, anthropic_messages
+    
+    async def _generate_anthropic(self, prompt: str, system_prompt: str, messages: List[Dict[str, str]], config: GenerationConfig) -> str:
+        """Generate text using Anthropic."""
+        client = get_async_client(LLMProvider.ANTHROPIC, self.api_keys[LLMProvider.ANTHROPIC])
+        system_prompt, anthropic_messages = self._build_anthropic_messages(prompt, system_prompt, messages)
+        
+        response = await client.messages.create(
+            model=config.model,
+            system=system_prompt,
+            messages=anthropic_messages,
+            temperature=config.temperature,
+            max_tokens=config.max_tokens or 4000,  # Anthropic requires max_tokens
+            timeout=config.timeout
         )
         
         return response.content[0].text
     
+    async def _stream_anthropic(self, prompt: str, system_prompt: str, messages: List[Dict[str, str]], config: GenerationConfig) -> AsyncIterator[str]:
+        """Stream text using Anthropic."""
+        client = get_async_client(LLMProvider.ANTHROPIC, self.api_keys[LLMProvider.ANTHROPIC])
+        system_prompt, anthropic_messages = self._build_anthropic_messages(prompt, system_prompt, messages)
+        
+        async with client.messages.stream(
+            model=config.model,
+            system=system_prompt,
+            messages=anthropic_messages,
+            temperature=config.temperature,
+            max_tokens=config.max_tokens or 4000,
+            timeout=config.timeout
+        ) as stream:
+            async for text in stream.text_stream:
+                yield text
+    
+    def build_batch_request(self, custom_id: str, prompt: str, system_prompt: str = "", messages: List[Dict[str, str]] = None, config: Optional[GenerationConfig] = None):
+        """Build a request for offline batch submission (see run_batch).
+        
+        Takes the same prompt arguments as generate_text.
+        """
+        from backend.services.batch_api import BatchRequest
+        
+        return BatchRequest(
+            custom_id=custom_id,
+            messages=self._build_openai_messages(prompt, system_prompt, messages),
+            config=config or self.get_generation_config()
+        )
+    
+    def get_batch_backend(self, provider: LLMProvider):
+        """Get the batch API backend for a provider, using this service's API key."""
+        from backend.services.batch_api import OpenAIBatchBackend, AnthropicBatchBackend
+        
+        if provider not in self.clients:
+            raise ValueError(f"No API key set for provider: {provider}")
+        if provider == LLMProvider.OPENAI:
+            return OpenAIBatchBackend(self.clients[provider])
+        elif provider == LLMProvider.ANTHROPIC:
+            return AnthropicBatchBackend(self.clients[provider])
+        raise ValueError(f"Unsupported provider: {provider}")
+    
+    async def submit_batch(self, requests: List[Any], backend=None) -> str:
+        """Submit requests as one offline batch.
+        
+        Args:
+            requests: Requests from build_batch_request, all for the same provider
+            backend: Batch backend to use; defaults to the requests' provider
+        
+        Returns:
+            The batch ID
+        """
+        providers = {request.config.provider for request in requests}
+        if len(providers) != 1:
+            raise ValueError("A batch must contain requests for exactly one provider")
+        backend = backend or self.get_batch_backend(providers.pop())
+        batch_id = await asyncio.to_thread(backend.submit, requests)
+        logging.info(f"Submitted batch {batch_id} with {len(requests)} requests")
+        return batch_id
+    
+    async def wait_for_batch(self, batch_id: str, backend, poll_interval: float = BATCH_POLL_INTERVAL, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Poll a batch until it ends and collect its results.
+        
+        Args:
+            batch_id: ID returned by submit_batch
+            backend: The backend the batch was submitted to
+            poll_interval: Seconds between status checks
+            timeout: Seconds to wait before giving up (None waits until the batch ends)
+        
+        Returns:
+            BatchResult objects by custom ID; requests without a result are missing
+        """
+        from backend.services.batch_api import IN_PROGRESS, FAILED
+        
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while True:
+            state = await asyncio.to_thread(backend.status, batch_id)
+            if state != IN_PROGRESS:
+                break
+            if deadline is not None and loop.time() >= deadline:
+                raise TimeoutError(f"Batch {batch_id} did not finish within {timeout}s")
+            await asyncio.sleep(poll_interval)
+        
+        if state == FAILED:
+            logging.error(f"Batch {batch_id} failed; collecting any partial results")
+        return await asyncio.to_thread(backend.results, batch_id)
+    
+    async def run_batch(self, requests: List[Any], backend=None, poll_interval: float = BATCH_POLL_INTERVAL, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Submit requests as an offline batch and wait for the results.
+        
+        Batch APIs are cheaper and have separate rate limits, at the cost of
+        latency (up to the provider's completion window), which suits offline
+        jobs like regenerating every lesson.
+        
+        Returns:
+            BatchResult objects by custom ID
+        """
+        if not requests:
+            return {}
+        if backend is None:
+            backend = self.get_batch_backend(requests[0].config.provider)
+        batch_id = await self.submit_batch(requests, backend)
+        return await self.wait_for_batch(batch_id, backend, poll_interval, timeout)
+    
     def get_langchain_model(self):
         """Get a LangChain model for the active provider and model."""
         if self.active_provider == LLMProvider.OPENAI:
-            return ChatOpenAI(model_name=self.active_model, temperature=0.7)
+            return ChatOpenAI(model_name=self.active_model, temperature=0.7, openai_api_key=self.api_keys.get(LLMProvider.OPENAI))
         elif self.active_provider == LLMProvider.ANTHROPIC:
-            return ChatAnthropic(model_name=self.active_model, temperature=0.7)
+            return ChatAnthropic(model_name=self.active_model, temperature=0.7, anthropic_api_key=self.api_keys.get(LLMProvider.ANTHROPIC))
         else:
             # Default to OpenAI if provider doesn't have a LangChain integration
             return ChatOpenAI(model_name=LLMModel.GPT35_TURBO, temperature=0.7)
@@ -0,0 +1,127 @@
+"""
+Narration of lesson slides.
+
+Each slide's speech text is synthesized on its own and kept in the shared
+AudioStore under a content-addressed key, the sha256 of (voice, model,
+normalized text). Editing a lesson therefore only re-synthesizes the slides
+whose text changed, and the same text is never synthesized twice while it is
+stored. Slides are synthesized concurrently with
+bounded parallelism and in slide order, so the first slides are ready first; a
+request for a slide that is already being synthesized waits for that
+synthesis instead of starting another.
+"""
+
+import asyncio
+import logging
+import threading
+import weakref
+from typing import Dict, List, Optional
+
+from config.settings import TTS_MODEL, TTS_VOICE, TTS_MAX_CONCURRENCY, TTS_MAX_INPUT_CHARS
+from backend.services.audio_store import AudioStore, audio_key, normalize_speech_text
+from backend.services.speech_service import SpeechService
+
+def split_speech_text(text: str, max_chars: int = TTS_MAX_INPUT_CHARS) -> List[str]:
+    """Split a speech text into pieces the TTS API accepts, at sentence ends where possible."""
+    text = normalize_speech_text(text)
+    pieces = []
+    while len(text) > max_chars:
+        window = text[:max_chars + 1]
+        cut = max(window.rfind('. '), window.rfind('! '), window.rfind('? '))
+        cut = cut + 1 if cut > 0 else window.rfind(' ')
+        if cut <= 0:
+            cut = max_chars
+        pieces.append(text[:cut].strip())
+        text = text[cut:].strip()
+    if text:
+        pieces.append(text)
+    return pieces
+
+class NarrationService:
+    """Synthesizes and caches the audio of lesson slides."""
+
+    def __init__(self, speech_service: SpeechService = None, audio_store: AudioStore = None,
+                 voice: str = TTS_VOICE, model: str = TTS_MODEL, max_concurrency: int = TTS_MAX_CONCURRENCY):
+        """Initialize the narration service.
+
+        Args:
+            speech_service: Speech service used for synthesis
+            audio_store: Store holding the synthesized audio
+            voice: TTS voice
+            model: TTS model
+            max_concurrency: Maximum number of synthesis requests in flight
+        """
+        self.audio_store = audio_store or AudioStore()
+        self.speech_service = speech_service or SpeechService(self.audio_store)
+        self.voice = voice
+        self.model = model
+        self.max_concurrency = max_concurrency
+        # Event loop -> (semaphore, {audio key -> synthesis task}); asyncio primitives are bound to one loop
+        self._loop_state = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _state(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            state = self._loop_state.get(loop)
+            if state is None:
+                state = self._loop_state[loop] = (asyncio.Semaphore(self.max_concurrency), {})
+            return state
+
+    def get_cached_path(self, text: str) -> Optional[str]:
+        """Get the path of the audio for a text if it has been synthesized."""
+        return self.audio_store.get(audio_key(text, self.voice, self.model))
+
+    async def synthesize(self, text: str) -> Optional[str]:
+        """Get the audio for a text, synthesizing it if it is not cached.
+
+        Returns:
+            Path to the MP3 file, or None if the text is empty or synthesis failed
+        """
+        if not text.strip():
+            return None
+        path = self.get_cached_path(text)
+        if path:
+            return path
+        # A caller that goes away must not cancel a synthesis other callers are waiting for
+        return await asyncio.shield(self._start(text))
+
+    def _start(self, text: str) -> asyncio.Task:
+        """Get the synthesis task for a text, starting one unless it is already in flight."""
+        key = audio_key(text, self.voice, self.model)
+        semaphore, pending = self._state()
+        task = pending.get(key)
+        if task is None:
+            task = asyncio.create_task(self._synthesize(text, key, semaphore))
+            pending[key] = task
+            task.add_done_callback(lambda _: pending.pop(key, None))
+        return task
+
+    async def _synthesize(self, text: str, key: str, semaphore: asyncio.Semaphore) -> Optional[str]:
+        async with semaphore:
+            path = self.audio_store.get(key)
+            if path:
+                # Written by another process while this task was waiting
+                return path
+            try:
+                # Longer texts are synthesized in pieces; MP3 frames can be concatenated as is
+                audio = b"".join([await self.speech_service.synthesize(piece, self.voice, self.model)
+                                  for piece in split_speech_text(text)])
+                return await asyncio.to_thread(self.audio_store.put, key, audio)
+            except Exception as e:
+                logging.error(f"Error synthesizing speech: {str(e)}")
+                return None
+
+    def prefetch(self, slides: List[Dict[str, str]]) -> None:
+        """Start synthesizing the slides in the background, in slide order."""
+        for slide in slides:
+            if slide['speech'].strip() and self.get_cached_path(slide['speech']) is None:
+                self._start(slide['speech'])
+
+    async def narrate_slides(self, slides: List[Dict[str, str]]) -> List[Optional[str]]:
+        """Synthesize every slide and wait for all of them.
+
+        Returns:
+            The audio path of each slide, None where synthesis failed
+        """
+        return list(await asyncio.gather(*(self.synthesize(slide['speech']) for slide in slides)))
@@ -7,24 +7,36 @@ from dotenv import load_dotenv
 import json
 import logging
 import asyncio
-from typing import List, Dict, Tuple
+from typing import AsyncIterator, List, Dict, Optional, Tuple
 from backend.services.lesson_storage import LessonStorage
-from backend.services.multi_llm_service import MultiLLMService, LLMProvider, LLMModel
+from backend.services.slides import build_slides
+from backend.services.multi_llm_service import MultiLLMService, LLMProvider, LLMModel, GenerationConfig
 from backend.services.rag_service import PhysicsRAG
+from backend.services.corpus import get_corpus
 
 # Load environment variables
 load_dotenv()
 
 class PhysicsService:
-    def __init__(self):
+    def __init__(self, llm_service: MultiLLMService = None, lesson_storage: LessonStorage = None, rag_service: PhysicsRAG = None):
+        """Initialize the physics service.
+        
+        Lesson storage and the RAG service default to the process-wide shared
+        instances, so creating a PhysicsService does not reload the vector store.
+        
+        Args:
+            llm_service: The LLM service holding the caller's API keys and model selection
+            lesson_storage: Lesson storage to use
+            rag_service: RAG service to use
+        """
         try:
+            from backend.services.container import get_container
             # Initialize multi-LLM service
-            self.llm_service = MultiLLMService()
+            self.llm_service = llm_service or MultiLLMService()
             self.book_structure = None
-            # Initialize lesson storage
-            self.lesson_storage = LessonStorage()
-            # Initialize RAG service
-            self.rag_service = PhysicsRAG()
+            # Shared lesson storage and RAG service
+            self.lesson_storage = lesson_storage or get_container().lesson_storage
+            self.rag_service = rag_service or get_container().rag_service
         except Exception as e:
             raise ValueError(f"Failed to initialize service: {str(e)}")
         
@@ -43,24 +55,18 @@ class PhysicsService:
             
             content_dir = os.path.join(os.path.dirname(__file__), "..", "data", "physics_content")
             
-            # Get chapters from directory structure
-            if os.path.exists(content_dir):
-                for chapter_dir in sorted(os.listdir(content_dir)):
-                    if os.path.isdir(os.path.join(content_dir, chapter_dir)) and chapter_dir in chapter_mapping:
-                        chapter_info = chapter_mapping[chapter_dir]
-                        topics = []
-                        
-                        # Get topics from files in chapter directory
-                        for file in os.listdir(os.path.join(content_dir, chapter_dir)):
-                            if file.endswith('.txt'):
-                                topic_name = ' '.join(file.replace('.txt', '').split('_')).title()
-                                topics.append(topic_name)
-                        
-                        chapters.append({
-                            'number': chapter_info['number'],
-                            'title': chapter_info['title'],
-                            'topics': sorted(topics)
-                        })
+            # Get chapters from the shared corpus snapshot
+            chapter_topics = get_corpus(content_dir).get_chapter_topics()
+            for chapter_dir in sorted(chapter_topics):
+                if chapter_dir in chapter_mapping:
+                    chapter_info = chapter_mapping[chapter_dir]
+                    topics = [topic.title() for topic in chapter_topics[chapter_dir]]
+                    
+                    chapters.append({
+                        'number': chapter_info['number'],
+                        'title': chapter_info['title'],
+                        'topics': sorted(topics)
+                    })
             
             # If no chapters found from files, use default structure
             if not chapters:
@@ -142,13 +148,8 @@ class PhysicsService:
         """
         
         try:
-            # Save current provider and model to restore later
-            original_provider = self.llm_service.active_provider
-            original_model = self.llm_service.active_model
-            
-            # Set to use OpenAI with GPT-4.5-preview specifically for lesson generation
-            self.llm_service.set_active_provider(LLMProvider.OPENAI)
-            self.llm_service.set_active_model(LLMModel.GPT45_PREVIEW)
+            # Use OpenAI with GPT-4.5-preview specifically for lesson generation
+            config = GenerationConfig(provider=LLMProvider.OPENAI, model=LLMModel.GPT45_PREVIEW, temperature=0.7)
             
             system_prompt = """You are a knowledgeable physics professor creating educational content for first-year undergraduate students. 
             Your content should be:
@@ -160,18 +161,32 @@ class PhysicsService:
             
             Remember that this content will be used as lesson material that students will read, not as interactive content."""
             
-            lesson = await self.llm_service.generate_text(prompt, system_prompt, temperature=0.7)
-            
-            # Restore original provider and model
-            self.llm_service.set_active_provider(original_provider)
-            self.llm_service.set_active_model(original_model)
+            lesson = await self.llm_service.generate_text(prompt, system_prompt, config=config)
             
             # Store the generated lesson for future use
-            await self.lesson_storage.store_lesson(topic, lesson)
+            await self.lesson_storage.store_lesson(topic, lesson, model=config.model)
             return lesson
         except Exception as e:
             logging.error(f"Error generating lesson: {str(e)}")
             return f"I'm sorry, I encountered an error while generating the lesson for {topic}. Please try again later."
+    
+    async def get_lesson_slides(self, topic: str, lesson: Optional[str] = None) -> List[Dict[str, str]]:
+        """Get the slide deck for a topic's lesson, generating the lesson if needed.
+        
+        Args:
+            topic: The topic to get the slides for
+            lesson: The lesson, if the caller already has it from generate_lesson
+            
+        Returns:
+            One dict per slide with the "markdown", "html" and "speech" forms of the slide
+        """
+        if lesson is None:
+            lesson = await self.generate_lesson(topic)
+        slides = await self.lesson_storage.get_slides(topic)
+        if slides is None:
+            # The lesson was not stored, e.g. because generation failed
+            slides = build_slides(lesson)
+        return slides
             
     async def answer_question(self, question: str, topic: str, chat_history: List[Tuple[str, str]], provider=None, model=None) -> str:
         """Answer a question about a specific topic.
@@ -190,7 +205,7 @@ class PhysicsService:
             # First try to use RAG-based answering for better context
             try:
                 # Use the RAG service to get a context-aware answer
-                return await self.rag_service.answer_question(question, topic, chat_history, provider, model)
+                return await self.rag_service.answer_question(question, topic, chat_history, provider, model, llm_service=self.llm_service)
             except Exception as rag_error:
                 logging.warning(f"RAG-based answering failed, falling back to standard LLM: {str(rag_error)}")
                 
@@ -202,25 +217,27 @@ class PhysicsService:
                 
                 system_prompt = "You are a knowledgeable physics professor helping a student understand concepts."
                 
-                # If provider and model are specified, temporarily set them as active
-                original_provider = None
-                original_model = None
-                
-                if provider and model:
-                    original_provider = self.llm_service.active_provider
-                    original_model = self.llm_service.active_model
-                    self.llm_service.set_active_provider(provider)
-                    self.llm_service.set_active_model(model)
+                # Use the specified provider and model for this request only
+                config = self.llm_service.get_generation_config(provider, model, temperature=0.7)
                 
                 # Generate the answer
-                answer = await self.llm_service.generate_text(prompt, system_prompt, temperature=0.7)
-                
-                # Restore original provider and model if they were changed
-                if original_provider and original_model:
-                    self.llm_service.set_active_provider(original_provider)
-                    self.llm_service.set_active_model(original_model)
-                    
-                return answer
+                return await self.llm_service.generate_text(prompt, system_prompt, config=config)
         except Exception as e:
             logging.error(f"Error answering question: {str(e)}")
-            return f"I'm sorry, I encountered an error while answering your question. Please try again later."
\ No newline at end of file
+            return f"I'm sorry, I encountered an error while answering your question. Please try again later."
+    
+    async def stream_answer(self, question: str, topic: str, chat_history: List[Tuple[str, str]], provider=None, model=None) -> AsyncIterator[str]:
+        """Answer a question about a specific topic, streaming the answer as it is generated.
+        
+        Args:
+            question: The question to answer
+            topic: The topic the question is about
+            chat_history: Previous conversation history
+            provider: Optional LLM provider to use
+            model: Optional LLM model to use
+            
+        Yields:
+            Chunks of the answer
+        """
+        async for chunk in self.rag_service.stream_answer(question, topic, chat_history, provider, model, llm_service=self.llm_service):
+            yield chunk
\ No newline at end of file
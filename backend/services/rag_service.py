@@ -7,14 +7,29 @@ from langchain.text_splitter import RecursiveCharacterTextSplitter
 import os
 from dotenv import load_dotenv
 import json
-from typing import List, Dict, Tuple
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 from openai import OpenAI
 import asyncio
 import numpy as np
 import faiss
 import hashlib
-import pickle
-from typing import Dict, List, Tuple, Any
+import re
+from dataclasses import replace
+from config.settings import (
+    CHUNK_SIZE, CHUNK_OVERLAP, SIMILARITY_TOP_K, RRF_K, EMBEDDING_CACHE_MAX_ENTRIES,
+    VECTOR_INDEX_TYPE, VECTOR_INDEX_PARAMS, MIN_SIMILARITY,
+    EMBEDDING_BASE_URL, EMBEDDING_MAX_CONCURRENCY, EMBEDDING_BATCH_MAX_TOKENS,
+    EMBEDDING_BATCH_MAX_SIZE, EMBEDDING_MAX_RETRIES,
+    ANSWER_CACHE_ENABLED, ANSWER_CACHE_SIMILARITY, ANSWER_CACHE_TTL, ANSWER_CACHE_MAX_ENTRIES
+)
+from backend.services.embedding_cache import EmbeddingCache
+from backend.services.answer_cache import SemanticAnswerCache, normalize_question, hash_chat_history
+from backend.services.corpus import get_corpus, tokenize
+from backend.services.lexical_index import BM25Index, reciprocal_rank_fusion
+from backend.services.document_store import DocumentStore
+from backend.services.embedding_pipeline import EmbeddingPipeline
+from backend.services.conversation_context import ConversationContext, build_summary_messages
+from backend.services.llm_clients import get_async_client
 
 # Load environment variables
 load_dotenv()
@@ -38,6 +53,10 @@ class PhysicsRAG:
         else:
             print("Warning: No valid OpenAI API key found. RAG functionality will be limited.")
             
+        # Content directory, loaded once into a snapshot shared with PhysicsService
+        self.content_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'physics_content')
+        self.corpus = get_corpus(self.content_dir)
+        
         # Load book structure
         self.book_structure = self.load_book_structure()
         
@@ -45,13 +64,49 @@ class PhysicsRAG:
         self.vector_store_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'vector_store')
         os.makedirs(self.vector_store_dir, exist_ok=True)
         
-        # Content directory
-        self.content_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'physics_content')
+        # Embeddings are cached on disk and shared by indexing and queries
+        self.embedding_cache = EmbeddingCache(
+            os.path.join(self.vector_store_dir, 'embedding_cache.db'),
+            max_entries=EMBEDDING_CACHE_MAX_ENTRIES
+        )
         
-        # Initialize vector store
+        # Answers to previous questions, reused for similar questions
+        self.answer_cache = None
+        if ANSWER_CACHE_ENABLED:
+            self.answer_cache = SemanticAnswerCache(
+                os.path.join(self.vector_store_dir, 'answer_cache.db'),
+                similarity_threshold=ANSWER_CACHE_SIMILARITY,
+                ttl=ANSWER_CACHE_TTL,
+                max_entries=ANSWER_CACHE_MAX_ENTRIES
+            )
+        
+        # Conversation history is fitted into a token budget, older turns summarized
+        self.conversation_context = ConversationContext()
+        
+        # Initialize vector store (chunk ID -> chunk)
         self.index = None
-        self.documents = []
-        self.document_embeddings = []
+        self.index_params = {}
+        self.documents = DocumentStore(os.path.join(self.vector_store_dir, 'documents.db'))
+        self.lexical_index = BM25Index()
+        
+        # Precomputed context for every topic in the book (normalized topic -> context)
+        self.topic_contexts = {}
+        
+        # Settings that invalidate every stored chunk when they change
+        self.embedding_model = "text-embedding-ada-002"
+        self.index_settings = {
+            'chunk_size': CHUNK_SIZE,
+            'chunk_overlap': CHUNK_OVERLAP,
+            'embedding_model': self.embedding_model,
+            'index_type': VECTOR_INDEX_TYPE,
+            'index_params': VECTOR_INDEX_PARAMS
+        }
+        
+        # Splitter used for sections that are longer than a single chunk
+        self.text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=CHUNK_SIZE,
+            chunk_overlap=CHUNK_OVERLAP
+        )
         
         # Load or create vector store
         try:
@@ -60,142 +115,377 @@ class PhysicsRAG:
             import logging
             logging.error(f"Error initializing vector store: {str(e)}")
             
-    def compute_content_hash(self) -> str:
-        """Compute a hash of all content files to detect changes."""
-        import logging
+    def compute_file_hashes(self) -> Dict[str, str]:
+        """Get the SHA-256 hash of each content file from the corpus snapshot.
         
-        if not os.path.exists(self.content_dir):
-            logging.warning(f"Content directory not found: {self.content_dir}")
-            return ""
+        Returns:
+            A mapping of file path (relative to the content directory) to its hash
+        """
+        return self.corpus.get_file_hashes()
+    
+    def load_manifest(self) -> Dict:
+        """Load the vector store manifest, or return an empty one if it is missing or stale.
         
-        hash_md5 = hashlib.md5()
+        The manifest records the content hash and chunk IDs of every indexed file.
+        It is only reused if it was built with the current chunking and embedding settings.
+        """
+        import logging
         
-        # Get all files and sort them for consistent hashing
-        all_files = []
-        for chapter_dir in os.listdir(self.content_dir):
-            chapter_path = os.path.join(self.content_dir, chapter_dir)
-            if os.path.isdir(chapter_path):
-                for file in os.listdir(chapter_path):
-                    if file.endswith('.txt'):
-                        all_files.append(os.path.join(chapter_path, file))
+        empty_manifest = {
+            'settings': self.index_settings,
+            'next_id': 0,
+            'files': {},
+            'pending': []
+        }
         
-        all_files.sort()
+        manifest_file = os.path.join(self.vector_store_dir, 'manifest.json')
+        if not os.path.exists(manifest_file):
+            return empty_manifest
         
-        # Compute hash of all file contents
-        for file_path in all_files:
-            try:
-                with open(file_path, 'rb') as f:
-                    for chunk in iter(lambda: f.read(4096), b""):
-                        hash_md5.update(chunk)
-            except Exception as e:
-                logging.error(f"Error hashing file {file_path}: {str(e)}")
+        try:
+            with open(manifest_file, 'r') as f:
+                manifest = json.load(f)
+        except Exception as e:
+            logging.error(f"Error loading vector store manifest: {str(e)}")
+            return empty_manifest
         
-        return hash_md5.hexdigest()
+        if manifest.get('settings') != self.index_settings:
+            logging.info("Index settings changed, vector store will be rebuilt")
+            return empty_manifest
+        
+        manifest.setdefault('pending', [])
+        return manifest
     
     def load_or_create_vector_store(self):
-        """Load the vector store from disk or create it if it doesn't exist or content has changed."""
-        import logging
+        """Load the vector store from disk and bring it up to date with the content.
         
-        # Compute content hash
-        content_hash = self.compute_content_hash()
-        if not content_hash:
-            logging.warning("Could not compute content hash, will create new vector store")
+        Only files that are new or whose hash changed are chunked and embedded.
+        Chunks of changed or deleted files are removed from the ID-mapped index.
+        Chunks are stored even when they cannot be embedded yet (e.g. without an
+        OpenAI API key) so lexical search still covers them; they stay pending
+        in the manifest until they are embedded.
+        """
+        import logging
         
-        # Check if vector store exists and has the same content hash
-        hash_file = os.path.join(self.vector_store_dir, 'content_hash.txt')
+        manifest = self.load_manifest()
         index_file = os.path.join(self.vector_store_dir, 'faiss_index.bin')
-        docs_file = os.path.join(self.vector_store_dir, 'documents.pkl')
         
-        if os.path.exists(hash_file) and os.path.exists(index_file) and os.path.exists(docs_file):
+        # Documents from older versions were pickled; they are rebuilt into the document store
+        legacy_docs_file = os.path.join(self.vector_store_dir, 'documents.pkl')
+        if os.path.exists(legacy_docs_file):
+            os.remove(legacy_docs_file)
+        
+        # Load the existing index if the manifest describes the stored chunks
+        self.index = None
+        indexed_ids = sum(len(entry['ids']) for entry in manifest['files'].values())
+        if manifest['files'] and indexed_ids == len(self.documents):
             try:
-                with open(hash_file, 'r') as f:
-                    stored_hash = f.read().strip()
-                
-                if stored_hash == content_hash:
-                    logging.info("Content unchanged, loading vector store from disk")
-                    # Load index
+                if os.path.exists(index_file):
                     self.index = faiss.read_index(index_file)
-                    # Load documents
-                    with open(docs_file, 'rb') as f:
-                        self.documents = pickle.load(f)
-                    
-                    logging.info(f"Loaded vector store with {len(self.documents)} documents")
-                    return
-                else:
-                    logging.info("Content changed, creating new vector store")
+                    self.configure_index_search(self.index)
+                    params_file = os.path.join(self.vector_store_dir, 'index_params.json')
+                    if os.path.exists(params_file):
+                        with open(params_file, 'r') as f:
+                            self.index_params = json.load(f)
+                logging.info(f"Loaded vector store with {len(self.documents)} chunks")
             except Exception as e:
                 logging.error(f"Error loading vector store: {str(e)}")
+                self.index = None
+                manifest['pending'] = self.documents.ids()
         else:
             logging.info("Vector store not found, creating new one")
+            manifest['files'] = {}
+            manifest['pending'] = []
+            self.documents.clear()
+            self.documents.commit()
         
-        # Create new vector store
-        self.create_vector_store()
+        self.corpus.refresh(force=True)
+        file_hashes = self.compute_file_hashes()
+        indexed_files = manifest['files']
         
-        # Save content hash
-        with open(hash_file, 'w') as f:
-            f.write(content_hash)
+        removed = [path for path in indexed_files if path not in file_hashes]
+        changed = [path for path in indexed_files if path in file_hashes and indexed_files[path]['hash'] != file_hashes[path]]
+        added = [path for path in file_hashes if path not in indexed_files]
         
-        logging.info("Vector store created and saved successfully")
+        if removed or changed or added:
+            logging.info(f"Updating vector store: {len(added)} new, {len(changed)} changed, {len(removed)} deleted files")
+        
+        # Drop the chunks of deleted and changed files
+        stale_ids = [chunk_id for path in removed + changed for chunk_id in indexed_files[path]['ids']]
+        if stale_ids:
+            self.documents.delete_many(stale_ids)
+            stale = set(stale_ids)
+            manifest['pending'] = [chunk_id for chunk_id in manifest['pending'] if chunk_id not in stale]
+            if self.index is not None:
+                try:
+                    self.index.remove_ids(np.array(stale_ids, dtype='int64'))
+                except RuntimeError:
+                    # HNSW cannot remove vectors; rebuild it from the (cached) embeddings instead
+                    logging.info("Index does not support removal, rebuilding it from cached embeddings")
+                    self.index = None
+                    manifest['pending'] = self.documents.ids()
+        for path in removed + changed:
+            del indexed_files[path]
+        
+        # Chunk new and changed files; their chunks are pending until embedded
+        for rel_path in changed + added:
+            entry = self.corpus.get_file(rel_path)
+            if entry is None:
+                continue
+            
+            chunks = self.split_document(entry['content'], entry['chapter'], entry['topic'], entry['path'])
+            ids = list(range(manifest['next_id'], manifest['next_id'] + len(chunks)))
+            manifest['next_id'] += len(chunks)
+            indexed_files[rel_path] = {'hash': file_hashes[rel_path], 'ids': ids}
+            self.documents.add_many(zip(ids, chunks))
+            manifest['pending'].extend(ids)
+        
+        embedded = self.embed_pending_chunks(manifest)
+        
+        if removed or changed or added or embedded:
+            # Save index, documents and manifest
+            if self.index is not None:
+                faiss.write_index(self.index, index_file)
+                with open(os.path.join(self.vector_store_dir, 'index_params.json'), 'w') as f:
+                    json.dump(self.index_params, f, indent=2)
+            elif os.path.exists(index_file):
+                os.remove(index_file)
+            self.documents.commit()
+            with open(os.path.join(self.vector_store_dir, 'manifest.json'), 'w') as f:
+                json.dump(manifest, f, indent=2)
+            logging.info("Vector store updated and saved successfully")
+        else:
+            logging.info("Content unchanged, vector store is up to date")
+        
+        self.build_lexical_index()
+        self.load_or_build_topic_contexts(manifest)
     
-    def create_vector_store(self):
-        """Create a new vector store from the physics content."""
+    def embed_pending_chunks(self, manifest: Dict) -> bool:
+        """Embed the chunks listed as pending in the manifest and add them to the index.
+        
+        Returns:
+            True if any chunks were added to the index
+        """
         import logging
         
-        if not os.path.exists(self.content_dir):
-            logging.error(f"Content directory not found: {self.content_dir}")
-            return
+        stored_ids = set(self.documents.ids())
+        pending = [chunk_id for chunk_id in manifest['pending'] if chunk_id in stored_ids]
+        if not pending:
+            return False
         
-        # Clear existing data
-        self.documents = []
-        self.document_embeddings = []
+        if not self.openai_client:
+            logging.warning(f"OpenAI client not initialized, {len(pending)} chunks will be embedded on a later start")
+            return False
         
-        # Process all files
-        for chapter_dir in os.listdir(self.content_dir):
-            chapter_path = os.path.join(self.content_dir, chapter_dir)
-            if os.path.isdir(chapter_path):
-                chapter_name = chapter_dir.replace('_', ' ')
-                
-                for file in os.listdir(chapter_path):
-                    if file.endswith('.txt'):
-                        file_path = os.path.join(chapter_path, file)
-                        topic_name = file.replace('.txt', '').replace('_', ' ')
-                        
-                        try:
-                            with open(file_path, 'r') as f:
-                                content = f.read()
-                                
-                                # Store document with metadata
-                                doc = {
-                                    'content': content,
-                                    'chapter': chapter_name,
-                                    'topic': topic_name,
-                                    'path': file_path
-                                }
-                                
-                                self.documents.append(doc)
-                        except Exception as e:
-                            logging.error(f"Error reading file {file_path}: {str(e)}")
-        
-        if not self.documents:
-            logging.warning("No documents found to index")
+        logging.info(f"Generating embeddings for {len(pending)} chunks")
+        embeddings = self.generate_embeddings([self.get_embedding_text(doc) for doc in self.documents.get_many(pending)])
+        
+        # Chunks that failed to embed stay pending and are retried on a later start
+        embedded_ids = [chunk_id for chunk_id, embedding in zip(pending, embeddings) if embedding is not None]
+        failed_ids = [chunk_id for chunk_id, embedding in zip(pending, embeddings) if embedding is None]
+        if failed_ids:
+            logging.warning(f"{len(failed_ids)} chunks could not be embedded and stay pending")
+        manifest['pending'] = failed_ids
+        if not embedded_ids:
+            return False
+        
+        embeddings_array = np.array([embedding for embedding in embeddings if embedding is not None]).astype('float32')
+        faiss.normalize_L2(embeddings_array)
+        
+        if self.index is None:
+            self.index = self.create_index(embeddings_array)
+        
+        self.index.add_with_ids(embeddings_array, np.array(embedded_ids, dtype='int64'))
+        return True
+    
+    def create_index(self, training_vectors: np.ndarray):
+        """Create an empty inner-product index of the configured type.
+        
+        Vectors are L2-normalized before they are added, so inner product is cosine
+        similarity. IVF indexes are trained on the given vectors; if there are too few
+        of them to train the requested number of clusters, a flat index is used instead.
+        The effective type and parameters are recorded in self.index_params.
+        """
+        import logging
+        
+        dimension = training_vectors.shape[1]
+        params = VECTOR_INDEX_PARAMS
+        index_type = VECTOR_INDEX_TYPE
+        
+        # FAISS needs about 39 training points per centroid (IVF clusters and PQ codebook entries)
+        if index_type in ('ivf', 'ivfpq'):
+            centroids = params['nlist'] if index_type == 'ivf' else max(params['nlist'], 2 ** params['pq_bits'])
+            if len(training_vectors) < centroids * 39:
+                logging.warning(f"Only {len(training_vectors)} vectors to train {index_type} with {centroids} centroids, using a flat index")
+                index_type = 'flat'
+        
+        if index_type == 'flat':
+            index = faiss.IndexIDMap2(faiss.IndexFlatIP(dimension))
+        elif index_type == 'hnsw':
+            index = faiss.IndexIDMap2(faiss.IndexHNSWFlat(dimension, params['hnsw_m'], faiss.METRIC_INNER_PRODUCT))
+        elif index_type == 'ivf':
+            quantizer = faiss.IndexFlatIP(dimension)
+            index = faiss.IndexIVFFlat(quantizer, dimension, params['nlist'], faiss.METRIC_INNER_PRODUCT)
+            index.train(training_vectors)
+        elif index_type == 'ivfpq':
+            quantizer = faiss.IndexFlatIP(dimension)
+            index = faiss.IndexIVFPQ(quantizer, dimension, params['nlist'], params['pq_m'], params['pq_bits'], faiss.METRIC_INNER_PRODUCT)
+            index.train(training_vectors)
+        else:
+            raise ValueError(f"Unsupported vector index type: {index_type}")
+        
+        self.index_params = {
+            'type': index_type,
+            'params': params,
+            'dimension': dimension,
+            'trained_on': len(training_vectors) if index_type in ('ivf', 'ivfpq') else 0
+        }
+        self.configure_index_search(index)
+        logging.info(f"Created {index_type} vector index with dimension {dimension}")
+        return index
+    
+    def configure_index_search(self, index):
+        """Apply the search-time parameters (nprobe, efSearch) to an index."""
+        base = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap2) else index
+        if hasattr(base, 'nprobe'):
+            base.nprobe = VECTOR_INDEX_PARAMS['nprobe']
+        if hasattr(base, 'hnsw'):
+            base.hnsw.efSearch = VECTOR_INDEX_PARAMS['ef_search']
+    
+    def build_lexical_index(self):
+        """Build the BM25 index over the same chunks as the vector store."""
+        self.lexical_index = BM25Index()
+        for chunk_id, doc in self.documents.iter_documents():
+            self.lexical_index.add(chunk_id, tokenize(self.get_embedding_text(doc)))
+    
+    @staticmethod
+    def normalize_topic(topic: str) -> str:
+        """Normalize a topic name for lookups in the topic context table."""
+        return " ".join(topic.replace('_', ' ').lower().split())
+    
+    def load_or_build_topic_contexts(self, manifest: Dict):
+        """Load the precomputed topic -> context table, rebuilding it if the content changed.
+        
+        The table is stored in topic_contexts.json next to the index, together with
+        a fingerprint of the manifest it was built from.
+        """
+        import logging
+        
+        fingerprint = hashlib.sha256(json.dumps(manifest, sort_keys=True).encode()).hexdigest()
+        contexts_file = os.path.join(self.vector_store_dir, 'topic_contexts.json')
+        
+        if os.path.exists(contexts_file):
+            try:
+                with open(contexts_file, 'r') as f:
+                    stored = json.load(f)
+                if stored.get('fingerprint') == fingerprint:
+                    self.topic_contexts = stored['contexts']
+                    logging.info(f"Loaded precomputed context for {len(self.topic_contexts)} topics")
+                    return
+            except Exception as e:
+                logging.error(f"Error loading topic contexts: {str(e)}")
+        
+        if len(self.documents) == 0:
+            self.topic_contexts = {}
             return
         
-        # Generate embeddings
-        logging.info(f"Generating embeddings for {len(self.documents)} documents")
-        self.document_embeddings = self.generate_embeddings([doc['content'] for doc in self.documents])
+        logging.info("Building topic context table")
+        self.topic_contexts = {}
+        for rel_path in manifest['files']:
+            topic = os.path.basename(rel_path).replace('.txt', '')
+            context = self.search_content_for_topic(topic.replace('_', ' '))
+            if context:
+                self.topic_contexts[self.normalize_topic(topic)] = context
+        
+        with open(contexts_file, 'w') as f:
+            json.dump({'fingerprint': fingerprint, 'contexts': self.topic_contexts}, f)
+    
+    def create_vector_store(self):
+        """Rebuild the vector store from scratch, re-embedding every content file."""
+        manifest_file = os.path.join(self.vector_store_dir, 'manifest.json')
+        if os.path.exists(manifest_file):
+            os.remove(manifest_file)
+        self.load_or_create_vector_store()
+    
+    def split_into_sections(self, content: str) -> List[Tuple[str, str]]:
+        """Split content on markdown # and ## headers.
+        
+        Returns:
+            A list of (section title, section text) pairs. Text before the first
+            header is returned with an empty title.
+        """
+        sections = []
+        current_title = ""
+        current_lines = []
+        has_body = False
+        
+        for line in content.splitlines():
+            header = re.match(r'^#{1,2}\s+(.+?)\s*$', line)
+            if header:
+                if has_body:
+                    sections.append((current_title, "\n".join(current_lines).strip()))
+                    current_lines = []
+                # A header with no body (e.g. the document title) is carried into the next section
+                current_title = header.group(1)
+                current_lines.append(line)
+                has_body = False
+            else:
+                current_lines.append(line)
+                has_body = has_body or bool(line.strip())
         
-        # Create FAISS index
-        dimension = len(self.document_embeddings[0])
-        self.index = faiss.IndexFlatL2(dimension)
+        if has_body:
+            sections.append((current_title, "\n".join(current_lines).strip()))
         
-        # Add embeddings to index
-        embeddings_array = np.array(self.document_embeddings).astype('float32')
-        self.index.add(embeddings_array)
+        return sections
+    
+    def split_document(self, content: str, chapter: str, topic: str, path: str) -> List[Dict]:
+        """Split a content file into section-aware chunks with metadata.
         
-        # Save index and documents
-        faiss.write_index(self.index, os.path.join(self.vector_store_dir, 'faiss_index.bin'))
-        with open(os.path.join(self.vector_store_dir, 'documents.pkl'), 'wb') as f:
-            pickle.dump(self.documents, f)
+        Sections longer than CHUNK_SIZE are split further with overlapping windows
+        so no chunk grows with the size of the source file.
+        """
+        chunks = []
+        for section_title, section_text in self.split_into_sections(content):
+            # Files without headers usually open with a plain title line
+            section = section_title or topic
+            for piece in self.text_splitter.split_text(section_text):
+                chunks.append({
+                    'content': piece,
+                    'chapter': chapter,
+                    'topic': topic,
+                    'section': section,
+                    'path': path,
+                    'chunk_index': len(chunks)
+                })
+        return chunks
+    
+    def get_embedding_text(self, doc: Dict) -> str:
+        """Get the text to embed for a chunk, prefixed with its place in the book."""
+        return f"{doc['chapter']} > {doc['topic']} > {doc['section']}\n\n{doc['content']}"
+    
+    def assemble_context(self, chunks: List[Dict]) -> str:
+        """Assemble retrieved chunks into a single context string.
+        
+        Chunks are grouped by source file and kept in document order so that
+        overlapping pieces of the same section read naturally. Files appear in
+        the order of their best-ranked chunk.
+        """
+        file_rank = {}
+        for doc in chunks:
+            file_rank.setdefault(doc['path'], len(file_rank))
+        ordered = sorted(chunks, key=lambda doc: (file_rank[doc['path']], doc['chunk_index']))
+        parts = []
+        last_heading = None
+        for doc in ordered:
+            heading = doc['topic'].title()
+            if doc['section'].lower() != doc['topic'].lower():
+                heading += f" - {doc['section']}"
+            if heading != last_heading and not doc['content'].lstrip().startswith('#'):
+                parts.append(f"## {heading}\n\n{doc['content']}")
+            else:
+                parts.append(doc['content'])
+            last_heading = heading
+        return "\n\n".join(parts)
         
     def load_book_structure(self) -> Dict:
         """Load the book structure from the physics content directory."""
@@ -208,19 +498,12 @@ class PhysicsRAG:
                 'electromagnetism': {'number': 4, 'title': 'Electromagnetism'}
             }
             
-            content_dir = os.path.join(os.path.dirname(__file__), "..", "data", "physics_content")
-            
-            # Get chapters from directory structure
-            for chapter_dir in sorted(os.listdir(content_dir)):
-                if os.path.isdir(os.path.join(content_dir, chapter_dir)) and chapter_dir in chapter_mapping:
+            # Get chapters from the corpus snapshot
+            chapter_topics = self.corpus.get_chapter_topics()
+            for chapter_dir in sorted(chapter_topics):
+                if chapter_dir in chapter_mapping:
                     chapter_info = chapter_mapping[chapter_dir]
-                    topics = []
-                    
-                    # Get topics from files in chapter directory
-                    for file in os.listdir(os.path.join(content_dir, chapter_dir)):
-                        if file.endswith('.txt'):
-                            topic_name = ' '.join(file.replace('.txt', '').split('_')).title()
-                            topics.append(topic_name)
+                    topics = [topic.title() for topic in chapter_topics[chapter_dir]]
                     
                     chapters.append({
                         'number': chapter_info['number'],
@@ -258,15 +541,14 @@ class PhysicsRAG:
         prompt = f"Create a brief physics lesson about {topic}. Include:\n1. One key concept\n2. One important formula with LaTeX formatting\n3. A simple example\nKeep it under 200 words."
         
         try:
-            response = await asyncio.to_thread(
-                lambda: self.openai_client.chat.completions.create(
-                    model="gpt-4-turbo",
-                    messages=[
-                        {"role": "system", "content": "You are a knowledgeable physics professor."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=0.7
-                )
+            client = get_async_client("openai", self.openai_client.api_key)
+            response = await client.chat.completions.create(
+                model="gpt-4-turbo",
+                messages=[
+                    {"role": "system", "content": "You are a knowledgeable physics professor."},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.7
             )
             lesson = response.choices[0].message.content.strip()
             return lesson
@@ -275,91 +557,136 @@ class PhysicsRAG:
             logging.error(f"Error generating lesson with RAG: {str(e)}")
             return f"I'm sorry, I encountered an error while generating a lesson about {topic}. Please try again later."
     
-    def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
-        """Generate embeddings for a list of texts using OpenAI's embeddings API."""
+    def get_embedding_pipeline(self, openai_client: OpenAI = None) -> EmbeddingPipeline:
+        """Get the embedding pipeline for an OpenAI client's API key (default: the service's own client)."""
+        openai_client = openai_client or self.openai_client
+        api_key = openai_client.api_key
+        pipeline = getattr(self, '_embedding_pipeline', None)
+        if pipeline is None or pipeline.api_key != api_key:
+            pipeline = EmbeddingPipeline(
+                api_key=api_key,
+                model=self.embedding_model,
+                base_url=EMBEDDING_BASE_URL or str(openai_client.base_url),
+                max_concurrency=EMBEDDING_MAX_CONCURRENCY,
+                max_batch_tokens=EMBEDDING_BATCH_MAX_TOKENS,
+                max_batch_size=EMBEDDING_BATCH_MAX_SIZE,
+                max_retries=EMBEDDING_MAX_RETRIES
+            )
+            self._embedding_pipeline = pipeline
+        return pipeline
+    
+    def generate_embeddings(self, texts: List[str], openai_client: OpenAI = None) -> List[Optional[np.ndarray]]:
+        """Generate embeddings for a list of texts using OpenAI's embeddings API.
+        
+        Texts already in the embedding cache are served from disk; only the
+        misses are sent to the API, concurrently through the embedding pipeline.
+        This blocks, so async code runs it through asyncio.to_thread.
+        
+        Args:
+            texts: Texts to embed
+            openai_client: Client (i.e. API key) to use instead of the service's own
+        
+        Returns:
+            One embedding per text, or None for texts that could not be embedded
+        """
         import logging
         
-        if not self.openai_client:
-            logging.error("OpenAI client not initialized")
-            return [[0.0] * 1536] * len(texts)  # Return dummy embeddings
+        embeddings = [self.embedding_cache.get(self.embedding_model, text) for text in texts]
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
         
-        embeddings = []
+        if not missing:
+            return embeddings
         
-        # Process in batches to avoid rate limits
-        batch_size = 10
-        for i in range(0, len(texts), batch_size):
-            batch = texts[i:i+batch_size]
-            try:
-                response = self.openai_client.embeddings.create(
-                    model="text-embedding-ada-002",
-                    input=batch
-                )
-                batch_embeddings = [item.embedding for item in response.data]
-                embeddings.extend(batch_embeddings)
-                logging.info(f"Generated embeddings for batch {i//batch_size + 1}/{(len(texts) + batch_size - 1)//batch_size}")
-            except Exception as e:
-                logging.error(f"Error generating embeddings: {str(e)}")
-                # Add dummy embeddings for this batch
-                embeddings.extend([[0.0] * 1536] * len(batch))
+        openai_client = openai_client or self.openai_client
+        if not openai_client:
+            logging.error("OpenAI client not initialized")
+            return embeddings
+        
+        results = self.get_embedding_pipeline(openai_client).embed_sync([texts[i] for i in missing])
+        for position, embedding in results.items():
+            i = missing[position]
+            embeddings[i] = embedding
+            self.embedding_cache.put(self.embedding_model, texts[i], embedding)
         
+        self.embedding_cache.flush()
+        logging.info(f"Embedding cache stats: {self.embedding_cache.get_stats()}")
         return embeddings
     
-    def get_content_for_topic(self, topic: str) -> str:
-        """Retrieve the content for a specific topic using the FAISS vector store."""
+    def get_content_for_topic(self, topic: str, openai_client: OpenAI = None) -> str:
+        """Retrieve the content for a specific topic.
+        
+        Topics from the book structure are served from the precomputed topic context
+        table; anything else falls through to a vector store search.
+        
+        Args:
+            topic: The topic or query
+            openai_client: Client (i.e. API key) used to embed the query instead of the service's own
+        """
+        import logging
+        
+        context = self.topic_contexts.get(self.normalize_topic(topic))
+        if context:
+            logging.info(f"Using precomputed context for topic: {topic}")
+            return context
+        
+        return self.search_content_for_topic(topic, openai_client)
+    
+    def search_content_for_topic(self, topic: str, openai_client: OpenAI = None) -> str:
+        """Retrieve the content for a topic or query with hybrid search.
+        
+        Chunks are ranked by the FAISS vector store (when embeddings are available)
+        and by the BM25 lexical index, and the two rankings are combined with
+        reciprocal-rank fusion. The top SIMILARITY_TOP_K chunks form the context.
+        """
         import logging
         logging.info(f"Retrieving content for topic: {topic}")
         
-        # Check if vector store is initialized
-        if self.index is None or not self.documents:
+        # Check if the chunk store is initialized
+        if len(self.documents) == 0:
             logging.warning("Vector store not initialized, falling back to direct search")
             return self.get_content_for_topic_direct(topic)
         
-        try:
-            # Generate embedding for the query
-            query_embedding = self.generate_embeddings([topic])[0]
-            query_embedding_array = np.array([query_embedding]).astype('float32')
-            
-            # Search the index
-            k = min(3, len(self.documents))  # Get top 3 matches or all if less than 3
-            distances, indices = self.index.search(query_embedding_array, k)
-            
-            # Check if we got any results
-            if len(indices[0]) == 0:
-                logging.warning(f"No matches found in vector store for topic: {topic}")
-                return self.get_content_for_topic_direct(topic)
-            
-            # Get the best matching document
-            best_index = indices[0][0]
-            best_doc = self.documents[best_index]
-            
-            logging.info(f"Best vector match: {best_doc['path']} (distance: {distances[0][0]})")
-            
-            # If the match is too distant, fall back to direct search
-            if distances[0][0] > 0.8:
-                logging.warning(f"Vector match too distant ({distances[0][0]}), falling back to direct search")
-                direct_content = self.get_content_for_topic_direct(topic)
-                if direct_content:
-                    return direct_content
-            
-            # Combine top results if they're from the same chapter
-            combined_content = best_doc['content']
-            chapter = best_doc['chapter']
-            
-            for i in range(1, len(indices[0])):
-                idx = indices[0][i]
-                doc = self.documents[idx]
-                if doc['chapter'] == chapter and distances[0][i] < 0.7:  # Only include if reasonably close
-                    combined_content += "\n\n" + doc['content']
-                    logging.info(f"Adding related content from: {doc['path']}")
-            
-            return combined_content
-            
-        except Exception as e:
-            logging.error(f"Error searching vector store: {str(e)}")
+        candidates = SIMILARITY_TOP_K * 2
+        rankings = []
+        
+        # Vector ranking, skipped when there is no index or no client to embed the query
+        openai_client = openai_client or self.openai_client
+        if self.index is not None and self.index.ntotal > 0 and openai_client:
+            try:
+                query_embedding = self.generate_embeddings([topic], openai_client)[0]
+                if query_embedding is None:
+                    raise RuntimeError("query could not be embedded")
+                query_embedding_array = np.array([query_embedding]).astype('float32')
+                faiss.normalize_L2(query_embedding_array)
+                similarities, indices = self.index.search(query_embedding_array, min(candidates, self.index.ntotal))
+                
+                # Only keep reasonably close matches
+                vector_ranking = [int(idx) for idx, similarity in zip(indices[0], similarities[0]) if idx >= 0 and similarity >= MIN_SIMILARITY]
+                if vector_ranking:
+                    logging.info(f"Best vector match: {self.documents.get(vector_ranking[0])['path']} (similarity: {similarities[0][0]:.3f})")
+                else:
+                    logging.info(f"No close vector matches for topic: {topic} (best similarity: {similarities[0][0]:.3f})")
+                rankings.append(vector_ranking)
+            except Exception as e:
+                logging.error(f"Error searching vector store: {str(e)}")
+        
+        # Lexical ranking
+        lexical_ranking = [chunk_id for chunk_id, _ in self.lexical_index.search(tokenize(topic), candidates)]
+        rankings.append(lexical_ranking)
+        
+        fused = reciprocal_rank_fusion(rankings, k=RRF_K)[:SIMILARITY_TOP_K]
+        if not fused:
+            logging.warning(f"No matches found for topic: {topic}")
             return self.get_content_for_topic_direct(topic)
+        
+        selected = self.documents.get_many([chunk_id for chunk_id, _ in fused])
+        for doc in selected:
+            logging.info(f"Using chunk from: {doc['path']} [{doc['section']}]")
+        
+        return self.assemble_context(selected)
     
     def get_content_for_topic_direct(self, topic: str) -> str:
-        """Fallback method to retrieve content directly from files."""
+        """Fallback method to retrieve content directly from the corpus snapshot."""
         import logging
         logging.info(f"Using direct search for topic: {topic}")
         
@@ -367,8 +694,9 @@ class PhysicsRAG:
         topic_lower = topic.lower().strip()
         topic_words = set(topic_lower.split())
         
-        if not os.path.exists(self.content_dir):
-            logging.error(f"Physics content directory not found: {self.content_dir}")
+        files = self.corpus.get_files()
+        if not files:
+            logging.error(f"No physics content found in: {self.content_dir}")
             return ""
         
         # Track best matches with scores
@@ -381,52 +709,41 @@ class PhysicsRAG:
             logging.info("Detected pendulum-related topic, will prioritize pendulum content")
         
         # Look for matches in filenames
-        for chapter_dir in os.listdir(self.content_dir):
-            chapter_path = os.path.join(self.content_dir, chapter_dir)
-            if os.path.isdir(chapter_path):
-                chapter_name = chapter_dir.replace('_', ' ').lower()
+        for entry in files:
+            chapter_name = entry['chapter'].lower()
+            file_topic = entry['topic'].lower()
+            
+            # Calculate match score
+            score = 0
+            
+            # Boost pendulum content for pendulum-related questions
+            if pendulum_related and ('pendulum' in file_topic):
+                score += 50  # Significant boost for pendulum files
+            
+            # Direct topic matches
+            if topic_lower == file_topic:
+                score = 100  # Exact match
+            elif topic_lower in file_topic:
+                score = 80   # Topic is substring of filename
+            elif file_topic in topic_lower:
+                score = 70   # Filename is substring of topic
+            
+            # Word-level matches
+            file_words = set(file_topic.split())
+            common_words = topic_words.intersection(file_words)
+            if common_words:
+                score = max(score, len(common_words) * 20)
+            
+            # Chapter relevance
+            if any(word in chapter_name for word in topic_words):
+                score += 15
+            
+            if score > 0:
+                # Check content for topic mentions
+                if topic_lower in entry['content_lower']:
+                    score += 25
                 
-                for file in os.listdir(chapter_path):
-                    if file.endswith('.txt'):
-                        file_path = os.path.join(chapter_path, file)
-                        file_topic = file.replace('.txt', '').replace('_', ' ').lower()
-                        
-                        # Calculate match score
-                        score = 0
-                        
-                        # Boost pendulum content for pendulum-related questions
-                        if pendulum_related and ('pendulum' in file_topic):
-                            score += 50  # Significant boost for pendulum files
-                        
-                        # Direct topic matches
-                        if topic_lower == file_topic:
-                            score = 100  # Exact match
-                        elif topic_lower in file_topic:
-                            score = 80   # Topic is substring of filename
-                        elif file_topic in topic_lower:
-                            score = 70   # Filename is substring of topic
-                        
-                        # Word-level matches
-                        file_words = set(file_topic.split())
-                        common_words = topic_words.intersection(file_words)
-                        if common_words:
-                            score = max(score, len(common_words) * 20)
-                        
-                        # Chapter relevance
-                        if any(word in chapter_name for word in topic_words):
-                            score += 15
-                        
-                        if score > 0:
-                            try:
-                                with open(file_path, 'r') as f:
-                                    content = f.read()
-                                    # Check content for topic mentions
-                                    if topic_lower in content.lower():
-                                        score += 25
-                                    
-                                    best_matches.append((score, content, file_path))
-                            except Exception as e:
-                                logging.error(f"Error reading file {file_path}: {str(e)}")
+                best_matches.append((score, entry['content'], entry['path']))
         
         # Sort matches by score (highest first)
         best_matches.sort(reverse=True, key=lambda x: x[0])
@@ -436,239 +753,337 @@ class PhysicsRAG:
             logging.info(f"Best direct match: {best_matches[0][2]} with score {best_matches[0][0]}")
             return best_matches[0][1]
         
-        # If no good matches, try content-based search
-        content_matches = []
-        
-        for chapter_dir in os.listdir(self.content_dir):
-            chapter_path = os.path.join(self.content_dir, chapter_dir)
-            if os.path.isdir(chapter_path):
-                for file in os.listdir(chapter_path):
-                    if file.endswith('.txt'):
-                        file_path = os.path.join(chapter_path, file)
-                        try:
-                            with open(file_path, 'r') as f:
-                                content = f.read().lower()
-                                content_score = 0
-                                
-                                # Check for topic words in content
-                                for word in topic_words:
-                                    if len(word) > 3 and word in content:
-                                        content_score += 10
-                                
-                                if content_score > 0:
-                                    content_matches.append((content_score, content.replace(content.lower(), content), file_path))
-                        except Exception as e:
-                            logging.error(f"Error reading file {file_path}: {str(e)}")
-        
-        # Sort content matches
-        content_matches.sort(reverse=True, key=lambda x: x[0])
-        
-        # Return best content match if we have one
-        if content_matches:
-            logging.info(f"Best content match: {content_matches[0][2]} with score {content_matches[0][0]}")
-            return content_matches[0][1]
+        # If no good matches, try content-based search using the inverted word index
+        word_counts = self.corpus.find_files_with_words({word for word in topic_words if len(word) > 3})
+        
+        if word_counts:
+            rel_path = max(sorted(word_counts), key=lambda path: word_counts[path])
+            entry = self.corpus.get_file(rel_path)
+            logging.info(f"Best content match: {entry['path']} with score {word_counts[rel_path] * 10}")
+            return entry['content']
         
         logging.warning(f"No content found for topic: {topic}")
         return ""
     
-    async def answer_question(self, question: str, topic: str, chat_history: List[Tuple[str, str]], provider=None, model=None) -> str:
-        """Answer a question about a specific topic using RAG.
+    def get_default_llm_service(self):
+        """Get the LLM service configured from the environment, created once and reused.
+        
+        Used when the caller does not pass its own service, so clients and their
+        connections are reused across questions.
+        """
+        from backend.services.multi_llm_service import MultiLLMService
+        
+        if getattr(self, '_default_llm_service', None) is None:
+            self._default_llm_service = MultiLLMService()
+        return self._default_llm_service
+    
+    def resolve_openai_client(self, llm_service=None):
+        """Get the OpenAI client to embed queries and answer with.
+        
+        Uses the caller's LLM service if given, otherwise the service's own client
+        (initialized from the environment if needed).
+        """
+        from backend.services.multi_llm_service import LLMProvider
+        
+        # For embeddings, we still need OpenAI API key, but for answering we can use any provider
+        if llm_service is not None:
+            return llm_service.clients.get(LLMProvider.OPENAI)
+        
+        api_key = os.getenv("OPENAI_API_KEY")
+        
+        # Initialize OpenAI client for embeddings if not already initialized
+        if not self.openai_client and api_key and api_key.startswith("sk-"):
+            try:
+                print(f"Initializing OpenAI client with API key: {api_key[:5]}...")
+                self.openai_client = OpenAI(api_key=api_key)
+            except Exception as e:
+                print(f"Error initializing OpenAI client: {str(e)}")
+                # We'll continue anyway since we might be able to use direct content retrieval
+        return self.openai_client
+    
+    def build_answer_messages(self, question: str, topic: str, chat_history: List[Tuple[str, str]], openai_client: OpenAI = None, summary: str = "") -> List[Dict[str, str]]:
+        """Build the chat messages for answering a question: system prompt, history and the question with context.
         
         Args:
             question: The question to answer
             topic: The topic the question is about
-            chat_history: Previous conversation history
-            provider: Optional provider to use for generating the answer
-            model: Optional model to use for generating the answer
+            chat_history: Previous conversation history sent verbatim
+            openai_client: Client used to embed the query for retrieval
+            summary: Summary of the conversation before chat_history
             
         Returns:
-            The answer to the question
+            Messages in OpenAI chat format
         """
         import logging
-        logging.info(f"RAG service answering question: '{question}' about topic: '{topic}'")
         
-        try:
-            # Check if any API key is available for the specified provider
-            if provider is None:
-                return "⚠️ Error: No LLM provider specified. Please select a provider in the sidebar."
+        # Get relevant content for the topic
+        context = self.get_content_for_topic(topic, openai_client)
+        
+        if not context:
+            logging.warning(f"No context found for topic: {topic}. Using general knowledge.")
+            # Fallback if no context is found
+            prompt = f"""Answer this physics question about {topic}: {question}
             
-            # For embeddings, we still need OpenAI API key, but for answering we can use any provider
-            api_key = os.getenv("OPENAI_API_KEY")
+            Provide a clear and educational explanation, using LaTeX for any mathematical formulas.
+            If you need to include equations, use proper LaTeX notation with $ for inline equations and $$ for display equations.
+            """
+            system_prompt = "You are a knowledgeable physics professor helping a student understand concepts."
+        else:
+            logging.info(f"Found context for topic: {topic}. Using RAG approach.")
             
-            # Initialize OpenAI client for embeddings if not already initialized
-            if not self.openai_client and api_key and api_key.startswith("sk-"):
-                try:
-                    print(f"Initializing OpenAI client with API key: {api_key[:5]}...")
-                    self.openai_client = OpenAI(api_key=api_key)
-                except Exception as e:
-                    print(f"Error initializing OpenAI client: {str(e)}")
-                    # We'll continue anyway since we might be able to use direct content retrieval
-            
-            # Get relevant content for the topic
-            context = self.get_content_for_topic(topic)
-            
-            if not context:
-                logging.warning(f"No context found for topic: {topic}. Using general knowledge.")
-                # Fallback if no context is found
-                prompt = f"""Answer this physics question about {topic}: {question}
-                
-                Provide a clear and educational explanation, using LaTeX for any mathematical formulas.
-                If you need to include equations, use proper LaTeX notation with $ for inline equations and $$ for display equations.
-                """
-                system_prompt = "You are a knowledgeable physics professor helping a student understand concepts."
-            else:
-                logging.info(f"Found context for topic: {topic}. Using RAG approach.")
-                
-                # Check if the question is referring to a specific problem or example in the lesson
-                import re
-                
-                # Check for problem references
-                problem_reference = re.search(r'problem\s*(\d+)', question.lower())
-                example_reference = re.search(r'example\s*(\d+)', question.lower())
-                
-                reference_type = None
-                reference_num = None
+            # Check if the question is referring to a specific problem or example in the lesson
+            import re
+            
+            # Check for problem references
+            problem_reference = re.search(r'problem\s*(\d+)', question.lower())
+            example_reference = re.search(r'example\s*(\d+)', question.lower())
+            
+            reference_type = None
+            reference_num = None
+            
+            if problem_reference:
+                reference_type = "Problem"
+                reference_num = problem_reference.group(1)
+                print(f"Detected reference to Problem {reference_num}")
+            elif example_reference:
+                reference_type = "Example"
+                reference_num = example_reference.group(1)
+                print(f"Detected reference to Example {reference_num}")
+            
+            # Special case for pendulum example
+            pendulum_example = False
+            if reference_type == "Example" and reference_num == "2" and "pendulum" in context.lower():
+                pendulum_example = True
+                print("Detected reference to pendulum example")
+            
+            if reference_type and reference_num:
+                # Try different patterns to extract the specific problem/example and its solution
+                patterns = [
+                    # Standard format with explicit Solution marker
+                    rf"{reference_type}\s*{reference_num}[\s\S]*?Solution:[\s\S]*?(?={reference_type}\s*\d+|$)",
+                    # Format with Example instead of Problem
+                    rf"Example\s*{reference_num}[\s\S]*?Solution:[\s\S]*?(?=Example\s*\d+|Problem\s*\d+|$)",
+                    # Without explicit Solution marker
+                    rf"{reference_type}\s*{reference_num}[\s\S]*?(?={reference_type}\s*\d+|Example\s*\d+|Problem\s*\d+|$)",
+                    # With optional colon
+                    rf"{reference_type}\s*{reference_num}:?[\s\S]*?(?={reference_type}\s*\d+|Example\s*\d+|Problem\s*\d+|$)"
+                ]
                 
-                if problem_reference:
-                    reference_type = "Problem"
-                    reference_num = problem_reference.group(1)
-                    print(f"Detected reference to Problem {reference_num}")
-                elif example_reference:
-                    reference_type = "Example"
-                    reference_num = example_reference.group(1)
-                    print(f"Detected reference to Example {reference_num}")
+                # Special pattern for pendulum example
+                if pendulum_example:
+                    patterns.insert(0, r"A pendulum swings with an amplitude[\s\S]*?maximum displacement in the opposite direction\.")
                 
-                # Special case for pendulum example
-                pendulum_example = False
-                if reference_type == "Example" and reference_num == "2" and "pendulum" in context.lower():
-                    pendulum_example = True
-                    print("Detected reference to pendulum example")
+                problem_match = None
+                for pattern in patterns:
+                    match = re.search(pattern, context, re.IGNORECASE)
+                    if match:
+                        problem_match = match
+                        print(f"Found {reference_type} {reference_num} using pattern: {pattern}")
+                        break
                 
-                if reference_type and reference_num:
-                    # Try different patterns to extract the specific problem/example and its solution
-                    patterns = [
-                        # Standard format with explicit Solution marker
-                        rf"{reference_type}\s*{reference_num}[\s\S]*?Solution:[\s\S]*?(?={reference_type}\s*\d+|$)",
-                        # Format with Example instead of Problem
-                        rf"Example\s*{reference_num}[\s\S]*?Solution:[\s\S]*?(?=Example\s*\d+|Problem\s*\d+|$)",
-                        # Without explicit Solution marker
-                        rf"{reference_type}\s*{reference_num}[\s\S]*?(?={reference_type}\s*\d+|Example\s*\d+|Problem\s*\d+|$)",
-                        # With optional colon
-                        rf"{reference_type}\s*{reference_num}:?[\s\S]*?(?={reference_type}\s*\d+|Example\s*\d+|Problem\s*\d+|$)"
-                    ]
+                if problem_match:
+                    specific_context = problem_match.group(0)
+                    print(f"Found specific {reference_type} {reference_num} in the context")
+                    
+                    # Construct a prompt specifically for explaining a problem or example
+                    prompt = f"""The student is asking about {reference_type} {reference_num} from the lesson on {topic}.
                     
-                    # Special pattern for pendulum example
-                    if pendulum_example:
-                        patterns.insert(0, r"A pendulum swings with an amplitude[\s\S]*?maximum displacement in the opposite direction\.")
+                    Here is the {reference_type.lower()} and solution from the reference material:
+                    {specific_context}
                     
-                    problem_match = None
-                    for pattern in patterns:
-                        match = re.search(pattern, context, re.IGNORECASE)
-                        if match:
-                            problem_match = match
-                            print(f"Found {reference_type} {reference_num} using pattern: {pattern}")
-                            break
+                    Student question: {question}
                     
-                    if problem_match:
-                        specific_context = problem_match.group(0)
-                        print(f"Found specific {reference_type} {reference_num} in the context")
-                        
-                        # Construct a prompt specifically for explaining a problem or example
-                        prompt = f"""The student is asking about {reference_type} {reference_num} from the lesson on {topic}.
-                        
-                        Here is the {reference_type.lower()} and solution from the reference material:
-                        {specific_context}
-                        
-                        Student question: {question}
-                        
-                        Explain this {reference_type.lower()} and its solution in detail, making sure to:
-                        1. Break down each step of the solution
-                        2. Explain the physics concepts involved
-                        3. Clarify any formulas used and what each variable represents
-                        4. Use LaTeX for all mathematical formulas
-                        
-                        Base your answer strictly on the reference material provided.
-                        """
-                        system_prompt = f"You are a knowledgeable physics professor helping a student understand specific {reference_type.lower()}s. Focus on explaining the {reference_type.lower()} and solution in detail."
-                    else:
-                        print(f"Could not find specific {reference_type} {reference_num}, using full context")
-                        # Use the regular RAG approach with full context
-                        prompt = f"""Answer this physics question about {topic}: {question}
-                        
-                        Use the following reference material to help formulate your answer:
-                        
-                        {context}
-                        
-                        The student is asking about {reference_type} {reference_num}, so try to identify this {reference_type.lower()} in the reference material.
-                        Provide a clear and educational explanation, using LaTeX for any mathematical formulas.
-                        If you need to include equations, use proper LaTeX notation with $ for inline equations and $$ for display equations.
-                        Base your answer on the reference material provided, but feel free to expand if needed.
-                        """
-                        system_prompt = "You are a knowledgeable physics professor helping a student understand concepts. Always provide accurate information based on the reference material."
+                    Explain this {reference_type.lower()} and its solution in detail, making sure to:
+                    1. Break down each step of the solution
+                    2. Explain the physics concepts involved
+                    3. Clarify any formulas used and what each variable represents
+                    4. Use LaTeX for all mathematical formulas
+                    
+                    Base your answer strictly on the reference material provided.
+                    """
+                    system_prompt = f"You are a knowledgeable physics professor helping a student understand specific {reference_type.lower()}s. Focus on explaining the {reference_type.lower()} and solution in detail."
                 else:
-                    # Regular question not referring to a specific problem
+                    print(f"Could not find specific {reference_type} {reference_num}, using full context")
+                    # Use the regular RAG approach with full context
                     prompt = f"""Answer this physics question about {topic}: {question}
                     
                     Use the following reference material to help formulate your answer:
                     
                     {context}
                     
+                    The student is asking about {reference_type} {reference_num}, so try to identify this {reference_type.lower()} in the reference material.
                     Provide a clear and educational explanation, using LaTeX for any mathematical formulas.
                     If you need to include equations, use proper LaTeX notation with $ for inline equations and $$ for display equations.
                     Base your answer on the reference material provided, but feel free to expand if needed.
                     """
                     system_prompt = "You are a knowledgeable physics professor helping a student understand concepts. Always provide accurate information based on the reference material."
+            else:
+                # Regular question not referring to a specific problem
+                prompt = f"""Answer this physics question about {topic}: {question}
+                
+                Use the following reference material to help formulate your answer:
+                
+                {context}
+                
+                Provide a clear and educational explanation, using LaTeX for any mathematical formulas.
+                If you need to include equations, use proper LaTeX notation with $ for inline equations and $$ for display equations.
+                Base your answer on the reference material provided, but feel free to expand if needed.
+                """
+                system_prompt = "You are a knowledgeable physics professor helping a student understand concepts. Always provide accurate information based on the reference material."
+        
+        # The summary of earlier turns goes into the system prompt, the only system message every provider keeps
+        if summary:
+            system_prompt += f"\n\nSummary of the earlier conversation with the student:\n{summary}"
+        
+        # Prepare messages for the chat API
+        messages = [{"role": "system", "content": system_prompt}]
+        
+        # Add chat history if available
+        if chat_history and len(chat_history) > 0:
+            logging.info(f"Including {len(chat_history)} previous exchanges in chat history")
+            for user_msg, assistant_msg in chat_history:
+                # Add the raw user message without the context
+                messages.append({"role": "user", "content": user_msg})
+                messages.append({"role": "assistant", "content": assistant_msg})
+        
+        # Add the current question with context as a separate message
+        # This ensures the LLM sees both the raw chat history and the current question with context
+        messages.append({"role": "user", "content": prompt})
+        
+        return messages
+    
+    async def build_conversation(self, chat_history: List[Tuple[str, str]], llm_service=None, config=None) -> Tuple[str, List[Tuple[str, str]]]:
+        """Fit the conversation history into the token budget of the conversation context.
+        
+        Args:
+            chat_history: Previous conversation history
+            llm_service: Service used to summarize older turns
+            config: Generation config of the answer; without one, older turns are dropped
             
-            # Prepare messages for the chat API
-            messages = [{"role": "system", "content": system_prompt}]
+        Returns:
+            The summary of the older turns and the recent turns to send verbatim
+        """
+        if config is None:
+            return await self.conversation_context.build(chat_history, "gpt-4")
+        
+        summary_config = replace(config, temperature=0.0, max_tokens=self.conversation_context.summary_max_tokens)
+        
+        async def summarize(summary, turns):
+            return await llm_service.generate_text(prompt="", system_prompt="", messages=build_summary_messages(summary, turns), config=summary_config)
+        
+        return await self.conversation_context.build(chat_history, config.model.value, summarize)
+    
+    def lookup_cached_answer(self, question: str, topic: str, chat_history: List[Tuple[str, str]], model, openai_client: OpenAI = None) -> Tuple[Optional[str], Optional[Dict]]:
+        """Look up an answer to a similar question in the answer cache.
+        
+        Returns:
+            The cached answer (or None on a miss) and the cache key to store a new
+            answer under (None if the question cannot be cached, e.g. without a
+            model or a client to embed the question)
+        """
+        import logging
+        
+        if self.answer_cache is None or model is None or openai_client is None:
+            return None, None
+        
+        try:
+            normalized = normalize_question(question)
+            embedding = self.generate_embeddings([normalized], openai_client)[0]
+            if embedding is None:
+                return None, None
+            cache_key = {
+                'topic': self.normalize_topic(topic),
+                'model': getattr(model, 'value', model),
+                'question': normalized,
+                'embedding': embedding,
+                'history_hash': hash_chat_history(chat_history)
+            }
+            return self.answer_cache.lookup(**cache_key), cache_key
+        except Exception as e:
+            logging.error(f"Error looking up cached answer: {str(e)}")
+            return None, None
+    
+    def store_cached_answer(self, cache_key: Optional[Dict], answer: str) -> None:
+        """Store an answer under a key from lookup_cached_answer."""
+        import logging
+        
+        if cache_key is None or not answer:
+            return
+        try:
+            self.answer_cache.store(answer=answer, **cache_key)
+            logging.info(f"Answer cache stats: {self.answer_cache.get_stats()}")
+        except Exception as e:
+            logging.error(f"Error caching answer: {str(e)}")
+    
+    async def answer_question(self, question: str, topic: str, chat_history: List[Tuple[str, str]], provider=None, model=None, llm_service=None) -> str:
+        """Answer a question about a specific topic using RAG.
+        
+        Args:
+            question: The question to answer
+            topic: The topic the question is about
+            chat_history: Previous conversation history
+            provider: Optional provider to use for generating the answer
+            model: Optional model to use for generating the answer
+            llm_service: The caller's MultiLLMService; its API keys are used for the
+                answer and the query embedding, so the shared service keeps none
+            
+        Returns:
+            The answer to the question
+        """
+        import logging
+        logging.info(f"RAG service answering question: '{question}' about topic: '{topic}'")
+        
+        try:
+            # Check if any API key is available for the specified provider
+            if provider is None:
+                return "⚠️ Error: No LLM provider specified. Please select a provider in the sidebar."
             
-            # Add chat history if available
-            if chat_history and len(chat_history) > 0:
-                logging.info(f"Including {len(chat_history)} previous exchanges in chat history")
-                for user_msg, assistant_msg in chat_history:
-                    # Add the raw user message without the context
-                    messages.append({"role": "user", "content": user_msg})
-                    messages.append({"role": "assistant", "content": assistant_msg})
+            openai_client = self.resolve_openai_client(llm_service)
             
-            # Add the current question with context as a separate message
-            # This ensures the LLM sees both the raw chat history and the current question with context
-            messages.append({"role": "user", "content": prompt})
+            # Reuse the answer to a similar question if there is one
+            cached_answer, cache_key = await asyncio.to_thread(self.lookup_cached_answer, question, topic, chat_history, model, openai_client)
+            if cached_answer is not None:
+                return cached_answer
             
-            # Use the multi_llm_service to generate the answer with the provided provider and model
-            from backend.services.multi_llm_service import MultiLLMService, LLMProvider
+            # Use the caller's multi LLM service, or the one configured from the environment
+            llm_service = llm_service or self.get_default_llm_service()
+            config = llm_service.get_generation_config(provider, model, temperature=0.7) if provider and model else None
+            
+            # Keep the history within the token budget, summarizing older turns
+            summary, recent_history = await self.build_conversation(chat_history, llm_service, config)
             
+            # Retrieval may embed the query, so keep it off the event loop
+            messages = await asyncio.to_thread(self.build_answer_messages, question, topic, recent_history, openai_client, summary)
+            
+            # Use the multi_llm_service to generate the answer with the provided provider and model
             logging.info(f"Using {provider} provider for question answering")
             
             try:
-                # Initialize the multi LLM service
-                llm_service = MultiLLMService()
-                
                 # Generate the answer using the specified provider and model
-                if provider and model:
-                    # Set the active provider and model
-                    llm_service.set_active_provider(provider)
-                    llm_service.set_active_model(model)
-                    
+                if config is not None:
                     # Pass the full messages array to the LLM service
-                    # This ensures all chat history and context is preserved
+                    # This ensures the summary, recent history and context are preserved.
+                    # The answer is cached under the requested model, so no fallback to
+                    # another provider here; the OpenAI fallback below is not cached
                     answer = await llm_service.generate_text(
                         prompt="",  # Not needed when passing messages directly
                         system_prompt="",  # Not needed when passing messages directly
-                        temperature=0.7,
-                        messages=messages  # Pass the complete messages array
+                        messages=messages,  # Pass the complete messages array
+                        config=config,
+                        allow_fallback=False
                     )
                     
                     logging.info(f"Successfully generated answer with {provider}")
+                    await asyncio.to_thread(self.store_cached_answer, cache_key, answer)
                     return answer
-                elif self.openai_client:
+                elif openai_client:
                     # Fallback to OpenAI if no provider specified but OpenAI client is available
                     logging.info("Using OpenAI for question answering")
-                    response = await asyncio.to_thread(
-                        lambda: self.openai_client.chat.completions.create(
-                            model="gpt-4",  # Using gpt-4 instead of gpt-4-turbo for better stability
-                            messages=messages,
-                            temperature=0.7
-                        )
+                    client = get_async_client("openai", openai_client.api_key)
+                    response = await client.chat.completions.create(
+                        model="gpt-4",  # Using gpt-4 instead of gpt-4-turbo for better stability
+                        messages=messages,
+                        temperature=0.7
                     )
                     answer = response.choices[0].message.content.strip()
                     logging.info("Successfully generated answer with OpenAI")
@@ -679,15 +1094,14 @@ class PhysicsRAG:
                 logging.error(f"LLM API error: {str(api_error)}")
                 
                 # Try with OpenAI as fallback if it's available and not the original provider
-                if provider != "openai" and self.openai_client:
+                if provider != "openai" and openai_client:
                     try:
                         logging.info("Trying fallback to OpenAI gpt-3.5-turbo model")
-                        response = await asyncio.to_thread(
-                            lambda: self.openai_client.chat.completions.create(
-                                model="gpt-3.5-turbo",
-                                messages=messages,
-                                temperature=0.7
-                            )
+                        client = get_async_client("openai", openai_client.api_key)
+                        response = await client.chat.completions.create(
+                            model="gpt-3.5-turbo",
+                            messages=messages,
+                            temperature=0.7
                         )
                         answer = response.choices[0].message.content.strip()
                         logging.info("Successfully generated answer with OpenAI fallback")
@@ -700,3 +1114,57 @@ class PhysicsRAG:
         except Exception as e:
             logging.error(f"Error answering question with RAG: {str(e)}")
             return f"I'm sorry, I encountered an error while answering your question: {str(e)}. Please check your API key and try again."
+    
+    async def stream_answer(self, question: str, topic: str, chat_history: List[Tuple[str, str]], provider=None, model=None, llm_service=None) -> AsyncIterator[str]:
+        """Answer a question like answer_question, streaming the answer as it is generated.
+        
+        Args:
+            question: The question to answer
+            topic: The topic the question is about
+            chat_history: Previous conversation history
+            provider: Provider to use for generating the answer
+            model: Model to use for generating the answer
+            llm_service: The caller's MultiLLMService (see answer_question)
+            
+        Yields:
+            Chunks of the answer
+        """
+        import logging
+        logging.info(f"RAG service streaming answer to: '{question}' about topic: '{topic}'")
+        
+        if provider is None:
+            yield "⚠️ Error: No LLM provider specified. Please select a provider in the sidebar."
+            return
+        
+        started = False
+        try:
+            openai_client = self.resolve_openai_client(llm_service)
+            llm_service = llm_service or self.get_default_llm_service()
+            config = llm_service.get_generation_config(provider, model, temperature=0.7)
+            
+            # Reuse the answer to a similar question if there is one
+            cached_answer, cache_key = await asyncio.to_thread(self.lookup_cached_answer, question, topic, chat_history, config.model, openai_client)
+            if cached_answer is not None:
+                yield cached_answer
+                return
+            
+            # Keep the history within the token budget, summarizing older turns
+            summary, recent_history = await self.build_conversation(chat_history, llm_service, config)
+            
+            # Retrieval may embed the query, so keep it off the event loop
+            messages = await asyncio.to_thread(self.build_answer_messages, question, topic, recent_history, openai_client, summary)
+            
+            # No fallback to another provider: the answer is cached under the requested model
+            chunks = []
+            async for chunk in llm_service.stream_text(prompt="", system_prompt="", messages=messages, config=config, allow_fallback=False):
+                started = True
+                chunks.append(chunk)
+                yield chunk
+            
+            await asyncio.to_thread(self.store_cached_answer, cache_key, "".join(chunks))
+        except Exception as e:
+            logging.error(f"Error streaming answer with RAG: {str(e)}")
+            if started:
+                yield f"\n\n⚠️ The answer was interrupted: {str(e)}"
+            else:
+                yield f"I'm sorry, I encountered an error while answering your question: {str(e)}. Please check your API key and try again."
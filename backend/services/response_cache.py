@@ -0,0 +1,257 @@
+"""
+Exact-match cache of LLM responses.
+
+Responses are keyed by a canonical hash of the request (provider, model,
+messages, temperature and max_tokens), so batch jobs and tests that send the
+same prompt again get the stored response instead of making another API call.
+Two backends are available: an in-process LRU and a SQLite file that persists
+between runs. Both evict the least recently used responses once the stored
+text exceeds a byte budget. The SQLite backend records reads in batches, so
+lookups rarely write to the database.
+
+In replay mode a miss raises ResponseCacheMiss instead of calling the
+provider, so a recorded cache can drive tests deterministically without
+network access. Reads in replay mode leave the recorded cache untouched.
+"""
+
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from config.settings import (
+    RESPONSE_CACHE_BACKEND, RESPONSE_CACHE_PATH, RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_REPLAY
+)
+
+# Reads are recorded for the LRU order in batches of this size, so lookups rarely write
+_TOUCH_BATCH = 100
+
+class ResponseCacheMiss(LookupError):
+    """Raised in replay mode when a request has no recorded response."""
+
+def make_cache_key(provider, model, messages: List[Dict[str, str]], temperature: float,
+                   max_tokens: Optional[int] = None) -> str:
+    """Build the canonical cache key for a request.
+
+    Enum values are reduced to their string values and the request is
+    serialized with sorted keys, so equal requests always hash the same.
+    """
+    request = {
+        'provider': getattr(provider, 'value', provider),
+        'model': getattr(model, 'value', model),
+        'messages': [{'role': msg.get('role'), 'content': msg.get('content')} for msg in messages],
+        'temperature': float(temperature),
+        'max_tokens': max_tokens
+    }
+    raw = json.dumps(request, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+class ResponseCache(ABC):
+    """Base class for response cache backends."""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, replay: bool = False):
+        """Initialize the cache.
+
+        Args:
+            max_bytes: Maximum total size of the stored responses (UTF-8 bytes)
+            replay: Raise ResponseCacheMiss on a miss instead of letting the request through
+        """
+        self.max_bytes = max_bytes
+        self.replay = replay
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        """Get the cached response for a key.
+
+        Returns:
+            The response, or None on a miss
+
+        Raises:
+            ResponseCacheMiss: On a miss in replay mode
+        """
+        with self._lock:
+            response = self._get(key)
+            if response is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if response is None and self.replay:
+            raise ResponseCacheMiss(f"No recorded response for request {key}")
+        return response
+
+    def put(self, key: str, response: str) -> None:
+        """Store a response, evicting the least recently used ones beyond max_bytes."""
+        size = len(response.encode('utf-8'))
+        if size > self.max_bytes:
+            logging.warning(f"Not caching response of {size} bytes (cache limit is {self.max_bytes})")
+            return
+        with self._lock:
+            self._put(key, response, size)
+
+    def clear(self) -> None:
+        """Remove all cached responses."""
+        with self._lock:
+            self._clear()
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get hit/miss counters and the current size of the cache."""
+        with self._lock:
+            entries, total_bytes = self._size()
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': entries,
+            'bytes': total_bytes,
+            'max_bytes': self.max_bytes
+        }
+
+    @abstractmethod
+    def _get(self, key: str) -> Optional[str]:
+        """Look up a response, marking it as recently used (called with the lock held)."""
+
+    @abstractmethod
+    def _put(self, key: str, response: str, size: int) -> None:
+        """Store a response and evict beyond max_bytes (called with the lock held)."""
+
+    @abstractmethod
+    def _clear(self) -> None:
+        """Remove all responses (called with the lock held)."""
+
+    @abstractmethod
+    def _size(self):
+        """Get the number of responses and their total size (called with the lock held)."""
+
+class MemoryResponseCache(ResponseCache):
+    """In-process LRU response cache."""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, replay: bool = False):
+        super().__init__(max_bytes, replay)
+        # Key -> response, ordered from least to most recently used
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+
+    def _get(self, key: str) -> Optional[str]:
+        response = self.entries.get(key)
+        if response is not None:
+            self.entries.move_to_end(key)
+        return response
+
+    def _put(self, key: str, response: str, size: int) -> None:
+        if key in self.entries:
+            self.total_bytes -= len(self.entries.pop(key).encode('utf-8'))
+        self.entries[key] = response
+        self.total_bytes += size
+        while self.total_bytes > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.total_bytes -= len(evicted.encode('utf-8'))
+
+    def _clear(self) -> None:
+        self.entries.clear()
+        self.total_bytes = 0
+
+    def _size(self):
+        return len(self.entries), self.total_bytes
+
+class SQLiteResponseCache(ResponseCache):
+    """Response cache persisted in a SQLite database."""
+
+    def __init__(self, db_path: str, max_bytes: int = 64 * 1024 * 1024, replay: bool = False):
+        """Open (or create) the cache.
+
+        Args:
+            db_path: Path to the SQLite database file
+            max_bytes: Maximum total size of the stored responses (UTF-8 bytes)
+            replay: Raise ResponseCacheMiss on a miss instead of letting the request through
+        """
+        super().__init__(max_bytes, replay)
+        self.db_path = db_path
+        # Keys read since the last write -> time of the read; written in one batch
+        self._touched = {}
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            )"""
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self.conn.commit()
+
+    def _get(self, key: str) -> Optional[str]:
+        row = self.conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if not self.replay:
+            self._touched[key] = time.time()
+            if len(self._touched) >= _TOUCH_BATCH:
+                self._record_reads()
+                self.conn.commit()
+        return row[0]
+
+    def _record_reads(self) -> None:
+        """Write the last use of the responses read since the last write (committed by the caller)."""
+        self.conn.executemany(
+            "UPDATE responses SET last_used = MAX(last_used, ?) WHERE key = ?",
+            [(used, key) for key, used in self._touched.items()]
+        )
+        self._touched.clear()
+
+    def _put(self, key: str, response: str, size: int) -> None:
+        # Pending reads first, so eviction sees the current LRU order
+        self._record_reads()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO responses (key, response, size, last_used) VALUES (?, ?, ?, ?)",
+            (key, response, size, time.time())
+        )
+        # Evict the least recently used responses until the total fits
+        total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total_bytes > self.max_bytes:
+            evict = []
+            for old_key, old_size in self.conn.execute("SELECT key, size FROM responses ORDER BY last_used"):
+                if total_bytes <= self.max_bytes:
+                    break
+                evict.append((old_key,))
+                total_bytes -= old_size
+            self.conn.executemany("DELETE FROM responses WHERE key = ?", evict)
+        self.conn.commit()
+
+    def _clear(self) -> None:
+        self._touched.clear()
+        self.conn.execute("DELETE FROM responses")
+        self.conn.commit()
+
+    def _size(self):
+        return self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+
+def create_response_cache() -> Optional[ResponseCache]:
+    """Create the response cache configured in the settings, or None if caching is off."""
+    if not RESPONSE_CACHE_BACKEND:
+        return None
+    if RESPONSE_CACHE_BACKEND == "memory":
+        return MemoryResponseCache(RESPONSE_CACHE_MAX_BYTES, replay=RESPONSE_CACHE_REPLAY)
+    if RESPONSE_CACHE_BACKEND == "sqlite":
+        return SQLiteResponseCache(str(RESPONSE_CACHE_PATH), RESPONSE_CACHE_MAX_BYTES, replay=RESPONSE_CACHE_REPLAY)
+    raise ValueError(f"Unknown response cache backend: {RESPONSE_CACHE_BACKEND}")
+
+_response_cache: Optional[ResponseCache] = None
+_response_cache_created = False
+_response_cache_lock = threading.Lock()
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Get the process-wide response cache configured in the settings, created on first use."""
+    global _response_cache, _response_cache_created
+    with _response_cache_lock:
+        if not _response_cache_created:
+            _response_cache = create_response_cache()
+            _response_cache_created = True
+        return _response_cache
@@ -0,0 +1,121 @@
+"""
+Slide decks for lessons.
+
+A lesson is split into slides once, when it is stored, and each slide is
+kept in three forms: the raw markdown, the HTML-adjusted markdown the
+slideshow renders and the plain text that is read aloud. The UI then only
+indexes into the stored list instead of re-running the regexes on every
+rerun.
+"""
+
+import re
+from typing import Dict, List
+
+from backend.services.speech_preprocessing import preprocess_math_for_speech
+
+# Bump when the segmentation or processing changes, so stored decks are rebuilt
+SLIDES_VERSION = 1
+
+_HEADER = re.compile(r'^(#{1,3})\s+(.+)$', re.MULTILINE)
+_TITLE_LINE = re.compile(r'^#\s+(?:Lesson:|Physics Learning Assistant).*$', re.MULTILINE)
+_SECTION_HEADER = re.compile(r'^##\s+(.*?)$', re.MULTILINE)
+
+# Markdown that is not read aloud
+_SPEECH_MARKUP = [
+    (re.compile(r'^#{1,6}\s+(.*)$', re.MULTILINE), r'\1.'),  # Headers become sentences
+    (re.compile(r'\[([^\]]+)\]\([^)]+\)'), r'\1'),  # Links keep their text
+    (re.compile(r'<[^>]+>'), ''),  # HTML tags
+    (re.compile(r'(\*\*|__|`)'), ''),  # Bold and code markers
+    (re.compile(r'(?<![\w*])\*(?!\s)([^*\n]+)(?<!\s)\*(?![\w*])'), r'\1'),  # Italics
+    (re.compile(r'^\s*(?:[-*+]|\d+\.)\s+', re.MULTILINE), ''),  # List markers
+]
+
+def split_lesson_into_slides(lesson_text: str) -> List[str]:
+    """Split the lesson text into individual slides.
+
+    Slides are separated by "---" lines if the lesson has them, otherwise by
+    markdown headers (#, ## or ###). A header with (almost) no content of its
+    own is merged into the slide of the following section.
+
+    Args:
+        lesson_text: The full lesson text content
+
+    Returns:
+        List of slide content strings
+    """
+    # First try to split by explicit delimiter
+    slides = [slide.strip() for slide in lesson_text.split("---") if slide.strip()]
+    if len(slides) > 1:
+        return slides
+
+    headers = list(_HEADER.finditer(lesson_text))
+    if not headers:
+        # If no headers found, treat the whole lesson as one slide
+        return [lesson_text]
+
+    slides = []
+    # Content before the first header gets a slide of its own
+    intro_text = lesson_text[:headers[0].start()].strip()
+    if intro_text:
+        slides.append(intro_text)
+
+    merged_into_previous = False
+    for i, header in enumerate(headers):
+        if merged_into_previous:
+            # This section was already added together with the previous header
+            merged_into_previous = False
+            continue
+
+        start_pos = header.start()
+        end_pos = headers[i + 1].start() if i + 1 < len(headers) else len(lesson_text)
+        section_content = lesson_text[start_pos:end_pos].strip()
+        content_after_header = section_content[len(header.group(0)):].strip()
+
+        # Merge a header with minimal content with the next section
+        if len(content_after_header.split()) < 5 and i + 1 < len(headers):
+            next_end = headers[i + 2].start() if i + 2 < len(headers) else len(lesson_text)
+            slides.append(lesson_text[start_pos:next_end].strip())
+            merged_into_previous = True
+        else:
+            slides.append(section_content)
+
+    return slides
+
+def process_slide_content(slide_content: str) -> str:
+    """Process the slide content for display.
+
+    Removes lesson title headers, renders section headers slightly smaller and
+    replaces \\cdotp with the dot operator.
+
+    Args:
+        slide_content: The raw slide content
+
+    Returns:
+        Processed slide content
+    """
+    slide_content = _TITLE_LINE.sub('', slide_content).strip()
+    slide_content = _SECTION_HEADER.sub(r'<h2 style="font-size: 1.4rem;">\1</h2>', slide_content)
+    return slide_content.replace('\\cdotp', '\\cdot')
+
+def slide_speech_text(slide_content: str) -> str:
+    """Convert a slide to the plain text that is read aloud."""
+    text = _TITLE_LINE.sub('', slide_content)
+    for pattern, replacement in _SPEECH_MARKUP:
+        text = pattern.sub(replacement, text)
+    return preprocess_math_for_speech(text)
+
+def build_slides(lesson_text: str) -> List[Dict[str, str]]:
+    """Build the slide deck for a lesson.
+
+    Returns:
+        One dict per slide with the raw "markdown", the processed "html" to
+        render and the "speech" text to read aloud
+    """
+    return [
+        {
+            'markdown': slide,
+            'html': process_slide_content(slide),
+            'speech': slide_speech_text(slide)
+        }
+        for slide in split_lesson_into_slides(lesson_text)
+    ]
@@ -1,201 +1,384 @@
 """
 Speech preprocessing utilities for converting text and mathematical expressions to speech-friendly format.
+
+Text is converted in a single pass by a small transducer. A precompiled
+scanner skips over plain text to the next character that needs converting,
+one precompiled tokenizer reads the LaTeX command, number, unit or symbol
+there, and a recursive reader turns each token into words using the tables
+below. LaTeX arguments are read as balanced groups, so nested \\frac and
+\\sqrt are spoken correctly, and no substitution ever sees the output of
+another one (a "dt" inside "width" or the "/" of an already spoken "m/s" is
+left alone).
 """
 
 import re
+from typing import Dict, Iterable, List
+
+# Words spoken for LaTeX commands without arguments
+_COMMAND_WORDS = {
+    'alpha': 'alpha', 'beta': 'beta', 'gamma': 'gamma', 'delta': 'delta', 'epsilon': 'epsilon',
+    'varepsilon': 'epsilon', 'zeta': 'zeta', 'eta': 'eta', 'theta': 'theta', 'vartheta': 'theta',
+    'kappa': 'kappa', 'lambda': 'lambda', 'mu': 'mu', 'nu': 'nu', 'xi': 'xi', 'pi': 'pi', 'rho': 'rho',
+    'sigma': 'sigma', 'tau': 'tau', 'phi': 'phi', 'varphi': 'phi', 'chi': 'chi', 'psi': 'psi',
+    'omega': 'omega', 'Gamma': 'gamma', 'Delta': 'change in', 'Theta': 'theta', 'Lambda': 'lambda',
+    'Sigma': 'sigma', 'Phi': 'phi', 'Psi': 'psi', 'Omega': 'omega',
+    'partial': 'partial derivative', 'nabla': 'del', 'infty': 'infinity', 'hbar': 'h bar',
+    'approx': 'approximately equals', 'neq': 'not equal to', 'geq': 'greater than or equal to',
+    'leq': 'less than or equal to', 'gg': 'much greater than', 'll': 'much less than',
+    'propto': 'is proportional to', 'cdot': 'times', 'cdotp': 'times', 'times': 'times',
+    'div': 'divided by', 'pm': 'plus or minus', 'mp': 'minus or plus', 'circ': 'degrees',
+    'to': 'approaches', 'rightarrow': 'gives', 'Rightarrow': 'implies', 'implies': 'implies',
+    'parallel': 'parallel to', 'perp': 'perpendicular to', 'ldots': 'and so on', 'cdots': 'and so on',
+    'sin': 'sine', 'cos': 'cosine', 'tan': 'tangent', 'arcsin': 'arc sine', 'arccos': 'arc cosine',
+    'arctan': 'arc tangent', 'ln': 'natural log of', 'log': 'log of', 'exp': 'exponential of',
+    '\\': ',', '$': 'dollars', '%': 'percent',
+}
+
+# Commands whose argument is read in text mode, and those whose argument is read as is
+_TEXT_COMMANDS = frozenset({'text', 'textbf', 'textit', 'textrm', 'emph', 'mbox'})
+_FORMAT_COMMANDS = frozenset({'mathbf', 'mathrm', 'mathit', 'mathsf', 'mathtt', 'mathcal', 'boldsymbol', 'operatorname'})
+
+# Commands that are not read
+_SILENT_COMMANDS = frozenset({
+    'displaystyle', 'scriptstyle', 'scriptscriptstyle', 'textstyle', 'left', 'right', 'big', 'Big',
+    'bigg', 'Bigg', 'quad', 'qquad', 'limits', 'langle', 'rangle', ',', ';', ':', '!', ' ', '{', '}',
+})
+
+# Commands read before their argument
+_ACCENT_COMMANDS = {'vec': 'vector', 'overrightarrow': 'vector', 'hat': 'unit vector'}
+
+# Commands with optional lower and upper limits
+_LARGE_OPERATORS = {'int': 'integral', 'iint': 'double integral', 'oint': 'closed integral', 'sum': 'sum', 'prod': 'product'}
+
+# Spoken exponents and subscripts; others are read as "to the power of ..." and after the symbol
+_POWERS = {'2': ' squared ', '3': ' cubed ', 'degrees': ' degrees '}
+_SUBSCRIPTS = {'0': 'initial', 'f': 'final', 'init': 'initial', 'final': 'final'}
+
+# Unit symbols written as \text{...} or \mathrm{...}
+_TEXT_UNITS = {
+    'm': 'meters', 'cm': 'centimeters', 'mm': 'millimeters', 'km': 'kilometers', 's': 'seconds',
+    'ms': 'milliseconds', 'kg': 'kilograms', 'g': 'grams', 'N': 'newtons', 'J': 'joules', 'kJ': 'kilojoules',
+    'W': 'watts', 'kW': 'kilowatts', 'Pa': 'pascals', 'K': 'kelvin', 'C': 'coulombs', 'V': 'volts',
+    'A': 'amperes', 'T': 'teslas', 'eV': 'electron volts', 'rad': 'radians', 'mol': 'moles', 'Ω': 'ohms',
+}
+
+# Whole-word units, differentials and indexed variables
+_UNITS = {
+    'm/s²': 'meters per second squared', 'm/s^2': 'meters per second squared', 'm/s': 'meters per second',
+    'km/h': 'kilometers per hour', 'N/m': 'newtons per meter', 'N⋅m': 'newton meters', 'N·m': 'newton meters',
+    'kg/m³': 'kilograms per cubic meter', 'J/K': 'joules per kelvin', 'W/m²': 'watts per square meter',
+    'rad/s': 'radians per second', 'Hz': 'hertz', 'kHz': 'kilohertz', 'MHz': 'megahertz',
+}
+_DIFFERENTIALS = {
+    'dx': 'change in x', 'dy': 'change in y', 'dz': 'change in z', 'dt': 'change in time',
+    'dv': 'change in velocity', 'da': 'change in acceleration', 'dE': 'change in energy',
+    'dP': 'change in momentum', 'dθ': 'change in theta', 'dφ': 'change in phi',
+}
+_INDEXED = {'v0': 'v initial', 'v1': 'v final', 't0': 't initial', 't1': 't final'}
+_SPECIAL_WORDS = {**_UNITS, **_DIFFERENTIALS, **_INDEXED}
+# Letters read as functions before parentheses
+_FUNCTION_LETTERS = frozenset('fgh')
+_UNIT_SEPARATORS = frozenset({'/', '⋅', '·'})
+
+# Symbols read the same way in prose and math
+_SYMBOLS = {
+    '×': ' cross ', '⋅': ' times ', '·': ' times ', '√': ' square root of ', 'π': ' pi ', '∞': ' infinity ',
+    '≈': ' approximately equals ', '≠': ' not equal to ', '≤': ' less than or equal to ',
+    '≥': ' greater than or equal to ', '±': ' plus or minus ', 'Δ': ' delta ', 'α': ' alpha ',
+    'β': ' beta ', 'γ': ' gamma ', 'θ': ' theta ', 'λ': ' lambda ', 'μ': ' mu ', 'ρ': ' rho ',
+    'σ': ' sigma ', 'τ': ' tau ', 'φ': ' phi ', 'ω': ' omega ', 'Ω': ' omega ', '°': ' degrees ',
+    '→': ' vector ', '⇒': ' implies ', '∈': ' is an element of ', '∉': ' is not an element of ',
+    '∫': ' integral of ', '∂': ' partial derivative of ', '∑': ' sum of ', '∏': ' product of ',
+    '⁰': ' to the power of 0 ', '¹': ' to the power of 1 ', '²': ' squared ', '³': ' cubed ',
+    '⁴': ' to the power of 4 ', '⁵': ' to the power of 5 ', '⁶': ' to the power of 6 ',
+    '⁷': ' to the power of 7 ', '⁸': ' to the power of 8 ', '⁹': ' to the power of 9 ',
+}
+
+# Operators in math, and in prose where they are unambiguous
+_MATH_OPERATORS = {
+    '+': ' plus ', '-': ' minus ', '=': ' equals ', '*': ' times ', '/': ' divided by ',
+    '<': ' less than ', '>': ' greater than ', '&': ' ', '|': ' ', '[': ' ', ']': ' ', "'": ' prime ',
+}
+_PROSE_OPERATORS = {'+': ' plus ', '=': ' equals ', '<': ' less than ', '>': ' greater than '}
+
+# A fraction or root of an expression with operators is read as "the quantity ...,"
+_COMPOUND = re.compile(r"\b(?:over|plus|minus|times|divided by|equals|root of)\b")
+_ROOTS = {'2': 'square root of', '3': 'cube root of'}
+
+def _quantity(spoken: str) -> str:
+    spoken = spoken.strip()
+    return f"the quantity {spoken}," if _COMPOUND.search(spoken) else spoken
+
+def _alternation(words: Iterable[str]) -> str:
+    # Longest first, so "m/s²" wins over "m/s"
+    return "|".join(re.escape(word) for word in sorted(words, key=len, reverse=True))
+
+_SPECIAL_WORD = rf"(?:{_alternation(_SPECIAL_WORDS)})(?![A-Za-z0-9])"
+_UNIT = re.compile(rf"(?:{_alternation(_UNITS)})(?![A-Za-z0-9])")
+_TOKEN = re.compile(rf"""
+     (?P<display>\$\$|\\\[|\\\])
+    |(?P<inline>\$|\\\(|\\\))
+    |(?P<command>\\(?:[A-Za-z]+|.))
+    |(?P<special>(?<![A-Za-z]){_SPECIAL_WORD})
+    |(?P<scientific>(?<![\w.])\d+(?:\.\d+)?e[+-]?\d+(?![\w.]))
+    |(?P<number>\d+(?:\.\d+)?)
+    |(?P<word>[A-Za-z]+)
+    |(?P<space>\s+)
+    |(?P<char>.)
+""", re.VERBOSE | re.DOTALL)
+
+# Text between two stops is passed through unchanged, so only the stops are tokenized.
+# A stop is a character that always needs converting, or a whole word that does:
+# a special word (dt, v0, Hz) or a number in scientific notation. Units with a
+# slash or a dot (m/s, N⋅m) are found at the separator, which is a stop itself.
+_STOP_WORDS = (rf"(?<![A-Za-z])(?:{_alternation(word for word in _SPECIAL_WORDS if word.isalnum())})(?![A-Za-z0-9])"
+               r"|(?<![\w.])\d+(?:\.\d+)?e[+-]?\d+(?![\w.])")
+# In prose: LaTeX, operators and symbols, but not markdown bold (removed after conversion)
+_PROSE_STOPS = re.escape("$\\{}[]^_/=+<>" + "".join(_SYMBOLS))
+_PROSE_STOP = re.compile(rf"[{_PROSE_STOPS}]|(?<!\*)\*(?!\*)|{_STOP_WORDS}", re.DOTALL)
+# In math: anything but letters, digits and spaces
+_MATH_STOP = re.compile(rf"[^A-Za-z0-9 .]|{_STOP_WORDS}", re.DOTALL)
+
+# Spaces before punctuation and after "(" are dropped, as are pauses (commas) before
+# another pause or the end of a sentence
+_LOOSE_PUNCTUATION = re.compile(r"[ ,](?:(?<= )(?=[,.;:!?)])|(?<=\( )|(?<=,)(?= ?[,.;:!?]))")
+
+class _Reader:
+    """Reads text token by token, recursing into LaTeX groups."""
+
+    def __init__(self, text: str, math: bool):
+        self.text = text
+        self.pos = 0
+        self.math = math
+        # For each open parenthesis in math, whether it holds function arguments
+        self.parens: List[bool] = []
+
+    def read(self, close: str = None) -> str:
+        """Convert tokens up to the end of the text or the given closing character."""
+        text = self.text
+        text_length = len(text)
+        pieces = []
+        append = pieces.append
+        pos = self.pos
+        while pos < text_length:
+            stop = (_MATH_STOP if self.math else _PROSE_STOP).search(text, pos)
+            if stop is None:
+                append(text[pos:])
+                pos = text_length
+                break
+            end = stop.start()
+            if text[end].isalnum():
+                # A special word or number right after other letters or digits (2dt); read them together
+                while end > pos and text[end - 1].isalnum():
+                    end -= 1
+            if end > pos:
+                append(text[pos:end])
+
+            match = _TOKEN.match(text, end)
+            token = match.group()
+            self.pos = pos = match.end()
+            if token == close:
+                break
+            if token in _UNIT_SEPARATORS:
+                unit = self._unit_around(end, pieces)
+                if unit:
+                    append(unit)
+                    pos = self.pos
+                    continue
+            append(self.convert(match))
+            pos = self.pos
+        self.pos = pos
+        return "".join(pieces)
+
+    def argument(self) -> str:
+        """Convert the argument of a command: a {group} or a single token."""
+        self.skip_space()
+        if self.pos >= len(self.text):
+            return ''
+        # A single token, even in prose, so \\vec F does not take the rest of the sentence
+        match = _TOKEN.match(self.text, self.pos)
+        self.pos = match.end()
+        if match.group() == '{':
+            return self.read('}')
+        return self.convert(match)
+
+    def _unit_around(self, position: int, pieces: List[str]) -> str:
+        """Read a unit such as m/s whose separator is at the position.
+
+        The letters before the separator were already passed through as the
+        end of the last piece, which is shortened accordingly.
+        """
+        text = self.text
+        start = position
+        while start > 0 and text[start - 1].isascii() and text[start - 1].isalpha():
+            start -= 1
+        if start == position or not pieces or not pieces[-1].endswith(text[start:position]):
+            return ''
+        unit = _UNIT.match(text, start)
+        if unit is None or unit.end() <= position:
+            return ''
+        pieces[-1] = pieces[-1][:start - position]
+        self.pos = unit.end()
+        return f" {_UNITS[unit.group()]} "
+
+    def skip_space(self) -> None:
+        while self.pos < len(self.text) and self.text[self.pos].isspace():
+            self.pos += 1
+
+    def peek(self) -> str:
+        """The next non-space character."""
+        self.skip_space()
+        return self.text[self.pos] if self.pos < len(self.text) else ''
+
+    def convert(self, match: re.Match) -> str:
+        kind = match.lastgroup
+        token = match.group()
+        if kind == 'command':
+            return self.command(token[1:])
+        if kind == 'char':
+            return self.char(token, match.start())
+        if kind == 'display' or kind == 'inline':
+            if token in ('\\(', '\\['):
+                self.math = True
+            elif token in ('\\)', '\\]'):
+                self.math = False
+            else:
+                self.math = not self.math
+            # Pause around equations
+            return ', '
+        if kind == 'special':
+            return f" {_SPECIAL_WORDS[token]} "
+        if kind == 'scientific':
+            mantissa, exponent = token.split('e')
+            return f"{mantissa} times ten to the power of {exponent}"
+        # Words, numbers and spaces
+        return token
+
+    def command(self, name: str) -> str:
+        word = _COMMAND_WORDS.get(name)
+        if word is not None:
+            return f" {word} "
+        if name in _TEXT_COMMANDS or name in _FORMAT_COMMANDS:
+            math = self.math
+            self.math = math and name in _FORMAT_COMMANDS
+            content = self.argument().strip()
+            self.math = math
+            return f" {_TEXT_UNITS.get(content, content)} "
+        if name in _SILENT_COMMANDS:
+            return ' '
+        if name in ('frac', 'dfrac', 'tfrac'):
+            numerator = _quantity(self.argument())
+            return f" {numerator} over {_quantity(self.argument())} "
+        if name == 'sqrt':
+            root = 'square root of'
+            if self.peek() == '[':
+                self.pos += 1
+                degree = self.read(']').strip()
+                root = _ROOTS.get(degree) or f"{degree} root of"
+            return f" {root} {_quantity(self.argument())} "
+        if name in _ACCENT_COMMANDS:
+            return f" {_ACCENT_COMMANDS[name]} {self.argument()} "
+        if name in _LARGE_OPERATORS:
+            limits = {}
+            while self.peek() in ('_', '^') and self.peek() not in limits:
+                marker = self.text[self.pos]
+                self.pos += 1
+                limits[marker] = self.argument().strip()
+            operator = _LARGE_OPERATORS[name]
+            if '_' in limits and '^' in limits:
+                return f" {operator} from {limits['_']} to {limits['^']} of "
+            if '_' in limits:
+                return f" {operator} over {limits['_']} of "
+            return f" {operator} of "
+        if name == 'lim':
+            if self.peek() == '_':
+                self.pos += 1
+                return f" limit as {self.argument().strip()} of "
+            return " limit of "
+        # Unknown commands are read by name
+        return f" {name} "
+
+    def char(self, token: str, position: int) -> str:
+        if token == '{':
+            return self.read('}')
+        if token == '}':
+            return ' '
+        if token == '^':
+            power = self.argument().strip()
+            return _POWERS.get(power) or f" to the power of {power} "
+        if token == '_':
+            subscript = self.argument().strip()
+            return f" {_SUBSCRIPTS.get(subscript, subscript)} "
+        symbol = _SYMBOLS.get(token)
+        if symbol is not None:
+            return symbol
+
+        if self.math:
+            if token == '(':
+                # f(x) is "f of x", m(v - u) is "m times the quantity v minus u"
+                function = self._single_letter_before(position) and self.text[position - 1] in _FUNCTION_LETTERS
+                self.parens.append(function)
+                if function:
+                    return ' of '
+                if position and (self.text[position - 1].isalnum() or self.text[position - 1] == ')'):
+                    return ' times the quantity '
+                return ' the quantity '
+            if token == ')':
+                function = self.parens.pop() if self.parens else True
+                return ' ' if function else ', '
+            if token == ',':
+                return ' and ' if self.parens and self.parens[-1] else ', '
+            return _MATH_OPERATORS.get(token, token)
+
+        if token == '*' or token == '/':
+            if self._between_operands(position):
+                return _MATH_OPERATORS[token]
+            # Markdown emphasis, or a slash between words
+            return '' if token == '*' else token
+        return _PROSE_OPERATORS.get(token, token)
+
+    def _single_letter_before(self, position: int) -> bool:
+        text = self.text
+        return position >= 1 and text[position - 1].isalpha() and (position < 2 or not text[position - 2].isalpha())
+
+    def _between_operands(self, position: int) -> bool:
+        """Whether an operator in prose stands between numbers, single letters, differentials or parentheses."""
+        text = self.text
+        before = position - 1
+        while before >= 0 and text[before] == ' ':
+            before -= 1
+        after = position + 1
+        while after < len(text) and text[after] == ' ':
+            after += 1
+        if before < 0 or after >= len(text):
+            return False
+        start = before
+        while start > 0 and text[start - 1].isalnum():
+            start -= 1
+        end = after
+        while end < len(text) and text[end].isalnum():
+            end += 1
+        return (text[before] == ')' or self._is_operand(text[start:before + 1])) and (
+            text[after] == '(' or self._is_operand(text[after:end]))
+
+    @staticmethod
+    def _is_operand(word: str) -> bool:
+        return len(word) == 1 or word.isdigit() or word in _DIFFERENTIALS or word in _INDEXED
+
+def _transduce(text: str, math: bool) -> str:
+    # Markdown bold markers are passed through with the prose and removed here
+    spoken = " ".join(_Reader(text, math).read().replace('**', '').split())
+    return _LOOSE_PUNCTUATION.sub('', spoken).strip(' ,')
 
 def preprocess_latex_for_speech(text: str) -> str:
-    """Convert LaTeX math expressions to spoken form."""
-    # Remove LaTeX text formatting commands that should be ignored
-    text_commands_to_remove = [
-        r'\\mathbf{([^}]+)}',
-        r'\\mathrm{([^}]+)}',
-        r'\\mathit{([^}]+)}',
-        r'\\mathsf{([^}]+)}',
-        r'\\mathtt{([^}]+)}',
-        r'\\text{([^}]+)}',
-        r'\\textbf{([^}]+)}',
-        r'\\textit{([^}]+)}',
-        r'\\emph{([^}]+)}',
-        r'\\mbox{([^}]+)}',
-        r'\\displaystyle',
-        r'\\scriptstyle',
-        r'\\scriptscriptstyle',
-        r'\\textstyle',
-    ]
-    
-    # Replace formatting commands with their content
-    for pattern in text_commands_to_remove:
-        if pattern.endswith('}'):
-            text = re.sub(pattern, r'\1', text)
-        else:
-            text = re.sub(pattern, '', text)
-    
-    # Handle common LaTeX commands
-    latex_replacements = {
-        r'\\frac{([^}]+)}{([^}]+)}': lambda m: f"{m.group(1)} over {m.group(2)}",
-        r'\\dfrac{([^}]+)}{([^}]+)}': lambda m: f"{m.group(1)} over {m.group(2)}",
-        r'\\sqrt{([^}]+)}': lambda m: f"square root of {m.group(1)}",
-        r'\\sqrt\[([^]]+)\]{([^}]+)}': lambda m: f"{m.group(1)} root of {m.group(2)}",
-        r'\\int_{([^}]+)}^{([^}]+)}': lambda m: f"integral from {m.group(1)} to {m.group(2)} of",
-        r'\\sum_{([^}]+)}^{([^}]+)}': lambda m: f"sum from {m.group(1)} to {m.group(2)} of",
-        r'\\prod_{([^}]+)}^{([^}]+)}': lambda m: f"product from {m.group(1)} to {m.group(2)} of",
-        r'\\lim_{([^}]+)}': lambda m: f"limit as {m.group(1)}",
-        r'\\vec{([^}]+)}': lambda m: f"vector {m.group(1)}",
-        r'\\hat{([^}]+)}': lambda m: f"unit vector {m.group(1)}",
-        r'\\partial': 'partial derivative',
-        r'\\Delta': 'change in',
-        r'\\alpha': 'alpha',
-        r'\\beta': 'beta',
-        r'\\gamma': 'gamma',
-        r'\\theta': 'theta',
-        r'\\lambda': 'lambda',
-        r'\\mu': 'mu',
-        r'\\pi': 'pi',
-        r'\\rho': 'rho',
-        r'\\sigma': 'sigma',
-        r'\\tau': 'tau',
-        r'\\phi': 'phi',
-        r'\\omega': 'omega',
-        r'\\infty': 'infinity',
-        r'\\approx': 'approximately equals',
-        r'\\neq': 'not equal to',
-        r'\\geq': 'greater than or equal to',
-        r'\\leq': 'less than or equal to',
-        r'\\cdot': 'times',
-        r'\\times': 'times',
-        r'\\div': 'divided by',
-        r'_0': ' initial',
-        r'_f': ' final',
-        r'_{init}': ' initial',
-        r'_{final}': ' final',
-        r'\\left': '',
-        r'\\right': '',
-    }
-    
-    # Apply LaTeX replacements
-    for pattern, replacement in latex_replacements.items():
-        if callable(replacement):
-            text = re.sub(pattern, replacement, text)
-        else:
-            text = re.sub(pattern, replacement, text)
-    
-    # Handle superscripts in LaTeX
-    text = re.sub(r'\^{([^}]+)}', lambda m: f" to the power of {m.group(1)}", text)
-    text = re.sub(r'\^(\d)', lambda m: f" to the power of {m.group(1)}", text)
-    
-    return text
+    """Convert a LaTeX math expression to spoken form."""
+    return _transduce(text, math=True)
 
 def preprocess_math_for_speech(text: str) -> str:
-    """Preprocess mathematical expressions for better speech synthesis."""
-    # First handle any LaTeX in the text
-    text = preprocess_latex_for_speech(text)
-    
-    # Replace common math symbols
-    replacements = {
-        '+': ' plus ',
-        '×': ' cross ',
-        '*': ' times ',
-        '/': ' divided by ',
-        '=': ' equals ',
-        '^2': ' squared ',
-        '^3': ' cubed ',
-        '^': ' to the power of ',
-        '√': ' square root of ',
-        'π': ' pi ',
-        '∞': ' infinity ',
-        '≈': ' approximately equals ',
-        '≠': ' not equal to ',
-        '≤': ' less than or equal to ',
-        '≥': ' greater than or equal to ',
-        '<': ' less than ',
-        '>': ' greater than ',
-        'Δ': ' delta ',
-        'α': ' alpha ',
-        'β': ' beta ',
-        'γ': ' gamma ',
-        'θ': ' theta ',
-        'λ': ' lambda ',
-        'ρ': ' rho ',
-        'σ': ' sigma ',
-        'φ': ' phi ',
-        'ω': ' omega ',
-        '→': ' vector ',
-        '⇒': ' implies ',
-        '∈': ' is an element of ',
-        '∉': ' is not an element of ',
-        '∫': ' integral of ',
-        '∂': ' partial derivative of ',
-        '∑': ' sum of ',
-        '∏': ' product of ',
-    }
-    
-    # Handle common physics variables and units
-    physics_replacements = {
-        'v0': 'v initial',
-        'v1': 'v final',
-        't0': 't initial',
-        't1': 't final',
-        'dx': 'change in x',
-        'dy': 'change in y',
-        'dz': 'change in z',
-        'dt': 'change in time',
-        'dv': 'change in velocity',
-        'da': 'change in acceleration',
-        'dE': 'change in energy',
-        'dP': 'change in momentum',
-        'dθ': 'change in theta',
-        'dφ': 'change in phi',
-        'm/s': 'meters per second',
-        'm/s²': 'meters per second squared',
-        'km/h': 'kilometers per hour',
-        'N/m': 'newtons per meter',
-        'N⋅m': 'newton meters',
-        'kg/m³': 'kilograms per cubic meter',
-        'J/K': 'joules per kelvin',
-        'W/m²': 'watts per square meter',
-        'rad/s': 'radians per second',
-        'Hz': 'hertz',
-        'kHz': 'kilohertz',
-        'MHz': 'megahertz',
-    }
-    
-    # Replace superscript numbers with 'to the power of'
-    text = re.sub(r'⁰', ' to the power of 0', text)
-    text = re.sub(r'¹', ' to the power of 1', text)
-    text = re.sub(r'²', ' squared ', text)
-    text = re.sub(r'³', ' cubed ', text)
-    text = re.sub(r'⁴', ' to the power of 4', text)
-    text = re.sub(r'⁵', ' to the power of 5', text)
-    text = re.sub(r'⁶', ' to the power of 6', text)
-    text = re.sub(r'⁷', ' to the power of 7', text)
-    text = re.sub(r'⁸', ' to the power of 8', text)
-    text = re.sub(r'⁹', ' to the power of 9', text)
-    
-    # Handle fractions
-    text = re.sub(r'\d+/\d+', lambda m: m.group().replace('/', ' divided by '), text)
-    
-    # Handle scientific notation
-    text = re.sub(r'(\d+)e([+-]?\d+)', lambda m: f"{m.group(1)} times ten to the power of {m.group(2)}", text)
-    
-    # Replace physics variables and units
-    for symbol, replacement in physics_replacements.items():
-        text = text.replace(symbol, replacement)
-    
-    # Replace math symbols
-    for symbol, replacement in replacements.items():
-        text = text.replace(symbol, replacement)
-    
-    # Handle function notation and parentheses
-    text = re.sub(r'([A-Za-z])\(([^)]+)\)', lambda m: f"{m.group(1)} of {m.group(2).replace(',', ' and')}", text)
-    text = re.sub(r'\(([^)]+)\)', lambda m: f" of {m.group(1)} ", text)
-    
-    # Add pauses around equations for better clarity
-    text = re.sub(r'\$(.*?)\$', r', \1, ', text)
-    text = re.sub(r'\\\((.*?)\\\)', r', \1, ', text)
-    text = re.sub(r'\\\[(.*?)\\\]', r', \1, ', text)
-    
-    # Clean up extra spaces
-    text = re.sub(r'\s+', ' ', text).strip()
-    
-    return text
+    """Preprocess mathematical expressions for better speech synthesis.
+
+    Prose is kept as is apart from symbols, units and operators between
+    operands; anything inside $...$, $$...$$, \\(...\\) or \\[...\\] is read as
+    math, with a pause before and after.
+    """
+    return _transduce(text, math=False)
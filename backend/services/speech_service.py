@@ -5,6 +5,11 @@ from pathlib import Path
 import tempfile
 from openai import OpenAI
 
+from config.settings import TTS_MODEL
+from backend.services.audio_store import audio_key
+from backend.services.container import get_container
+from backend.services.llm_clients import get_async_client
+
 # Enums for TTS providers and voices
 class TTSProvider(enum.Enum):
     OPENAI = "openai"
@@ -20,13 +25,21 @@ class TTSVoice(enum.Enum):
     SHIMMER = "shimmer"
 
 class SpeechService:
-    def __init__(self):
+    def __init__(self, audio_store=None):
         self.openai_client = None
-        self.cache_dir = Path("backend/audio/cache")
-        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.api_key = None
+        self._audio_store = audio_store
+    
+    @property
+    def audio_store(self):
+        """Store of the synthesized audio, the shared one unless another was given"""
+        if self._audio_store is None:
+            self._audio_store = get_container().audio_store
+        return self._audio_store
     
     def initialize_openai(self, api_key):
         """Initialize OpenAI client with API key"""
+        self.api_key = api_key
         self.openai_client = OpenAI(api_key=api_key)
         return self.openai_client is not None
     
@@ -38,6 +51,16 @@ class SpeechService:
             # Fallback to system TTS if provider not supported
             return self._system_tts(text, output_file)
     
+    async def synthesize(self, text, voice=TTSVoice.NOVA.value, model=TTS_MODEL):
+        """Synthesize speech with OpenAI's TTS API on the shared async client and return the MP3 bytes"""
+        api_key = self.api_key or os.environ.get("OPENAI_API_KEY")
+        if not api_key:
+            raise ValueError("OpenAI API key not set")
+        
+        client = get_async_client("openai", api_key)
+        response = await client.audio.speech.create(model=model, voice=voice, input=text)
+        return response.content
+    
     def _openai_tts(self, text, output_file, voice):
         """Use OpenAI's TTS API"""
         if not self.openai_client:
@@ -67,46 +90,33 @@ class SpeechService:
             print(f"Error in system TTS: {e}")
             return False
     
-    def cache_audio(self, text, filename, voice=TTSVoice.NOVA.value):
+    def cache_audio(self, text, voice=TTSVoice.NOVA.value):
         """Cache audio for a specific text"""
-        cache_path = self.cache_dir / f"{filename}_{voice}.mp3"
-        if not cache_path.exists():
-            return self.text_to_speech(text, str(cache_path), voice)
-        return True
+        return self.generate_speech(text, voice) is not None
     
-    def get_cached_path(self, filename, voice=TTSVoice.NOVA.value):
+    def get_cached_path(self, text, voice=TTSVoice.NOVA.value):
         """Get path to cached audio file"""
-        cache_path = self.cache_dir / f"{filename}_{voice}.mp3"
-        if cache_path.exists():
-            return str(cache_path)
-        return None
+        return self.audio_store.get(audio_key(text, voice, TTS_MODEL))
         
     def generate_speech(self, text, voice=TTSVoice.NOVA.value):
         """Generate speech from text and return the path to the audio file"""
-        # Create a unique filename based on the text content (first 20 chars)
-        import hashlib
-        text_hash = hashlib.md5(text.encode()).hexdigest()[:10]
-        filename = f"speech_{text_hash}"
-        
         # Check if we already have this audio cached
-        cached_path = self.get_cached_path(filename, voice)
+        cached_path = self.get_cached_path(text, voice)
         if cached_path:
             return cached_path
-            
-        # Generate new audio file
-        temp_file = os.path.join(str(self.cache_dir), f"{filename}_{voice}.mp3")
         
         # Get OpenAI API key from environment if not already initialized
         if not self.openai_client and "OPENAI_API_KEY" in os.environ:
             self.initialize_openai(os.environ["OPENAI_API_KEY"])
-            
-        # Generate speech
-        success = self.text_to_speech(text, temp_file, voice)
+        if not self.openai_client:
+            return None
         
-        if success:
-            return temp_file
-        else:
-            # Return a placeholder or error message if generation fails
+        # Generate speech into the shared store, under a key unique to its content
+        try:
+            response = self.openai_client.audio.speech.create(model=TTS_MODEL, voice=voice, input=text)
+            return self.audio_store.put(audio_key(text, voice, TTS_MODEL), response.content)
+        except Exception as e:
+            print(f"Error in OpenAI TTS: {e}")
             return None
 
 def recognize_speech_from_mic():
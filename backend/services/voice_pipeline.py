@@ -0,0 +1,156 @@
+"""
+Streaming voice pipeline.
+
+Answers are spoken while they are still being generated: LLM text chunks are
+segmented into sentences as they arrive, each complete sentence is converted
+to speech text and sent to TTS right away (with bounded concurrency), and the
+audio is emitted in sentence order as soon as it is ready. The listener hears
+the first sentence after roughly the time it takes to generate and synthesize
+that sentence, instead of after the whole answer plus its synthesis.
+"""
+
+import asyncio
+import logging
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Tuple, Union
+
+from config.settings import TTS_MAX_CONCURRENCY
+from backend.services.slides import slide_speech_text
+
+# Words whose trailing period does not end a sentence
+_ABBREVIATIONS = frozenset({'e.g', 'i.e', 'etc', 'vs', 'cf', 'approx', 'fig', 'eq', 'eqs', 'no', 'dr', 'mr', 'mrs', 'ms', 'prof'})
+
+# A sentence longer than this is split at the next space, so TTS never waits on a runaway sentence
+MAX_SENTENCE_CHARS = 400
+
+class SentenceSegmenter:
+    """Incrementally splits streamed text into sentences.
+
+    Sentences end at ".", "!" or "?" followed by whitespace, or at a blank line.
+    Periods after abbreviations, list numbers at the start of a line ("1.") and anything inside
+    $...$ or $$...$$ math do not end a sentence. Each character is scanned once.
+    """
+
+    def __init__(self, max_chars: int = MAX_SENTENCE_CHARS):
+        self.max_chars = max_chars
+        self._buffer = ""
+        self._scanned = 0
+        self._in_math = False
+
+    def feed(self, chunk: str) -> List[str]:
+        """Add a chunk of text and return the sentences it completed."""
+        buffer = self._buffer + chunk
+        sentences = []
+        start = 0
+        i = self._scanned
+        # The last character is only decided once the next one is known
+        while i < len(buffer) - 1:
+            char = buffer[i]
+            if char == '$' and (i == 0 or buffer[i - 1] != '\\'):
+                self._in_math = not self._in_math
+                if buffer[i + 1] == '$':
+                    i += 1
+            elif not self._in_math:
+                end = None
+                if char in '.!?' and buffer[i + 1].isspace() and not self._is_abbreviation(buffer, start, i):
+                    end = i + 1
+                elif char == '\n' and buffer[i + 1] == '\n':
+                    end = i
+                elif char == ' ' and i - start >= self.max_chars:
+                    end = i
+                if end is not None:
+                    sentence = buffer[start:end].strip()
+                    if sentence:
+                        sentences.append(sentence)
+                    start = end
+            i += 1
+        self._buffer = buffer[start:]
+        self._scanned = i - start
+        return sentences
+
+    def flush(self) -> List[str]:
+        """Return the text left over at the end of the stream."""
+        sentence = self._buffer.strip()
+        self._buffer = ""
+        self._scanned = 0
+        self._in_math = False
+        return [sentence] if sentence else []
+
+    @staticmethod
+    def _is_abbreviation(buffer: str, start: int, end: int) -> bool:
+        """Whether the word ending at a period is an abbreviation or a list number."""
+        word_start = end
+        while word_start > start and not buffer[word_start - 1].isspace():
+            word_start -= 1
+        word = buffer[word_start:end].lstrip('(').lower()
+        if word.isdigit():
+            # A list number starts its line; "The answer is 5." ends a sentence
+            line_start = word_start
+            while line_start > start and buffer[line_start - 1] in ' \t':
+                line_start -= 1
+            return line_start == start or buffer[line_start - 1] == '\n'
+        return word in _ABBREVIATIONS
+
+async def stream_with_speech(chunks: AsyncIterator[str], synthesize: Callable[[str], Awaitable[bytes]],
+                             max_concurrency: int = TTS_MAX_CONCURRENCY) -> AsyncIterator[Tuple[str, Union[str, bytes]]]:
+    """Pass a text stream through and speak it sentence by sentence.
+
+    Args:
+        chunks: The streamed answer
+        synthesize: Returns the audio of a speech text
+        max_concurrency: Maximum number of sentences synthesized at once
+
+    Yields:
+        ("text", chunk) for every chunk as soon as it arrives and ("audio", bytes)
+        for every sentence, in sentence order, as soon as its audio and that of
+        all earlier sentences is ready. Sentences whose synthesis fails are
+        skipped.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    segmenter = SentenceSegmenter()
+    # Synthesis tasks in sentence order
+    pending = deque()
+
+    async def speak(speech: str) -> Optional[bytes]:
+        async with semaphore:
+            try:
+                return await synthesize(speech)
+            except Exception as e:
+                logging.error(f"Error synthesizing sentence: {str(e)}")
+                return None
+
+    def dispatch(sentences: List[str]) -> None:
+        for sentence in sentences:
+            speech = slide_speech_text(sentence)
+            if speech.strip():
+                pending.append(asyncio.create_task(speak(speech)))
+
+    iterator = chunks.__aiter__()
+    next_chunk = asyncio.ensure_future(iterator.__anext__())
+    try:
+        while next_chunk is not None or pending:
+            waiting = [next_chunk] if next_chunk is not None else []
+            if pending:
+                waiting.append(pending[0])
+            await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+
+            while pending and pending[0].done():
+                audio = pending.popleft().result()
+                if audio:
+                    yield "audio", audio
+
+            if next_chunk is not None and next_chunk.done():
+                try:
+                    chunk = next_chunk.result()
+                except StopAsyncIteration:
+                    next_chunk = None
+                    dispatch(segmenter.flush())
+                else:
+                    next_chunk = asyncio.ensure_future(iterator.__anext__())
+                    dispatch(segmenter.feed(chunk))
+                    yield "text", chunk
+    finally:
+        if next_chunk is not None:
+            next_chunk.cancel()
+        for task in pending:
+            task.cancel()
@@ -27,14 +27,92 @@ CSS_FILE = STATIC_DIR / "style.css"
 
 # API settings
 DEFAULT_API_TIMEOUT = 60  # seconds
+LLM_CONNECT_TIMEOUT = 10  # seconds
+LLM_MAX_CONNECTIONS = 100  # Connections per pooled LLM client
+LLM_MAX_KEEPALIVE_CONNECTIONS = 20  # Idle connections kept open per client
+LLM_KEEPALIVE_EXPIRY = 30  # seconds an idle connection is kept open
 MAX_TOKENS = 4096
 DEFAULT_TEMPERATURE = 0.7
 
+# LLM response cache settings. Set RESPONSE_CACHE_BACKEND to "memory" or "sqlite" to
+# reuse responses to identical requests; RESPONSE_CACHE_REPLAY=1 fails on a miss
+# instead of calling the provider (for tests without network access).
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND")  # None disables the cache
+RESPONSE_CACHE_PATH = Path(os.getenv("RESPONSE_CACHE_PATH", str(DATA_DIR / "response_cache.db")))
+RESPONSE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+RESPONSE_CACHE_REPLAY = os.getenv("RESPONSE_CACHE_REPLAY") == "1"
+
+# Lesson storage settings
+LESSON_CACHE_MAX_ENTRIES = 64  # Lesson bodies kept in memory
+
+# Batch lesson generation settings
+LESSON_BATCH_MAX_CONCURRENCY = 8  # Lessons generated at once
+LESSON_BATCH_REQUESTS_PER_MINUTE = {"openai": 60, "anthropic": 50}  # Per provider
+LESSON_BATCH_MAX_RETRIES = 2  # Retries per lesson after a failed request
+LESSON_BATCH_JOURNAL = DATA_DIR / "lesson_batch_journal.jsonl"  # Checkpoint journal for resuming runs
+BATCH_POLL_INTERVAL = 60  # seconds between status checks of a submitted batch API job
+LESSON_EXPECTED_OUTPUT_TOKENS = 4000  # Reserved against the budget per lesson in flight
+# Estimated USD prices per million (input, output) tokens, used for cost budgets
+LLM_PRICES_PER_MILLION_TOKENS = {
+    "gpt-4.5-preview": (75.0, 150.0),
+    "gpt-4-turbo": (10.0, 30.0),
+    "gpt-4": (30.0, 60.0),
+    "gpt-3.5-turbo": (0.5, 1.5),
+    "claude-3-opus-20240229": (15.0, 75.0),
+    "claude-3-sonnet-20240229": (3.0, 15.0),
+    "claude-3-haiku-20240307": (0.25, 1.25),
+}
+
 # RAG settings
 CHUNK_SIZE = 1000
 CHUNK_OVERLAP = 200
 EMBEDDING_MODEL = "text-embedding-3-small"
-SIMILARITY_TOP_K = 5
+SIMILARITY_TOP_K = 5  # Number of chunks used as context after fusion
+RRF_K = 60  # Rank offset for reciprocal-rank fusion of vector and BM25 results
+EMBEDDING_CACHE_MAX_ENTRIES = 50000
+
+# Embedding pipeline settings
+EMBEDDING_BASE_URL = os.getenv("OPENAI_BASE_URL")  # None uses the OpenAI API
+EMBEDDING_MAX_CONCURRENCY = 4  # Embedding requests in flight
+EMBEDDING_BATCH_MAX_TOKENS = 50000  # Estimated tokens per embedding request
+EMBEDDING_BATCH_MAX_SIZE = 100  # Texts per embedding request
+EMBEDDING_MAX_RETRIES = 5  # Retries for rate-limited or failed requests
+
+# Vector index settings. Vectors are L2-normalized and searched by inner product,
+# so scores are cosine similarities. "flat" is exact and suits small corpora;
+# "ivf", "hnsw" and "ivfpq" scale to large ones.
+VECTOR_INDEX_TYPE = "flat"
+VECTOR_INDEX_PARAMS = {
+    "nlist": 256,      # IVF: number of clusters
+    "nprobe": 16,      # IVF: clusters searched per query
+    "hnsw_m": 32,      # HNSW: neighbours per node
+    "ef_search": 64,   # HNSW: search depth
+    "pq_m": 64,        # IVF-PQ: sub-quantizers (must divide the embedding dimension)
+    "pq_bits": 8,      # IVF-PQ: bits per sub-quantizer code
+}
+MIN_SIMILARITY = 0.6  # Minimum cosine similarity for a vector match to be used
+
+# Semantic answer cache settings
+ANSWER_CACHE_ENABLED = True
+ANSWER_CACHE_SIMILARITY = 0.95  # Minimum cosine similarity between questions to reuse an answer
+ANSWER_CACHE_TTL = 7 * 24 * 3600  # seconds
+ANSWER_CACHE_MAX_ENTRIES = 10000
+
+# Conversation context settings. Questions are answered with the last
+# CONVERSATION_RECENT_TURNS turns verbatim and a rolling summary of the rest
+CONVERSATION_TOKEN_BUDGET = 2000  # tokens of conversation history per question, summary included
+CONVERSATION_RECENT_TURNS = 3
+CONVERSATION_SUMMARY_MAX_TOKENS = 300
+CONVERSATION_SUMMARY_CACHE_SIZE = 1000  # cached summaries, one per summarized conversation prefix
+
+# Speech settings
+AUDIO_CACHE_DIR = BACKEND_DIR / "audio" / "cache"
+AUDIO_CACHE_MAX_BYTES = 512 * 1024 * 1024  # Least recently used clips are deleted beyond this
+AUDIO_CACHE_MAX_AGE = 30 * 24 * 3600  # seconds since a clip was last used
+TTS_MODEL = "tts-1"
+TTS_VOICE = "nova"
+TTS_MAX_CONCURRENCY = 4  # Slides synthesized at once
+TTS_MAX_INPUT_CHARS = 4096  # Longest text accepted by one TTS request; longer texts are split
 
 # UI settings
 DEFAULT_MODE = "browse"
@@ -1,134 +1,31 @@
-import re
 import streamlit as st
 
-def display_lesson_slideshow(lesson_text):
+def display_lesson_slideshow(slides):
     """
     Display lesson content as a slideshow with navigation buttons.
     
     Args:
-        lesson_text: The full lesson text content
+        slides: The lesson's slide deck, as returned by PhysicsService.get_lesson_slides
         
     Returns:
-        str: The current slide text
+        dict: The current slide
     """
-    # Split the lesson into slides
-    slides = split_lesson_into_slides(lesson_text)
-    
     # Get current slide index
     current_slide_index = st.session_state.slide_index
     
     # Ensure index is within bounds
     current_slide_index = max(0, min(current_slide_index, len(slides) - 1))
-    
-    # Process the slide content
-    current_slide = process_slide_content(slides[current_slide_index])
+    current_slide = slides[current_slide_index]
     
     # Display the slide content in a container
     with st.container(border=True):
-        st.markdown(current_slide, unsafe_allow_html=True)
+        st.markdown(current_slide['html'], unsafe_allow_html=True)
     
     # Navigation buttons below the slide - centered and wider
     render_navigation_buttons(current_slide_index, len(slides))
     
-    # Return the current slide text
-    return slides[current_slide_index]
-
-def split_lesson_into_slides(lesson_text):
-    """
-    Split the lesson text into individual slides.
-    
-    Args:
-        lesson_text: The full lesson text content
-        
-    Returns:
-        list: List of slide content strings
-    """
-    # First try to split by explicit delimiter
-    slides = [slide.strip() for slide in lesson_text.split("---") if slide.strip()]
-    
-    # If no explicit delimiter found, split by headers (# or ##)
-    if len(slides) <= 1:
-        # Match markdown headers (# Header or ## Header)
-        header_pattern = re.compile(r'^(#{1,3})\s+(.+)$', re.MULTILINE)
-        
-        # Find all headers in the text
-        headers = list(header_pattern.finditer(lesson_text))
-        
-        if headers:
-            # Extract introduction text (content before the first header)
-            intro_text = ""
-            if headers[0].start() > 0:
-                intro_text = lesson_text[:headers[0].start()].strip()
-            
-            slides = []
-            # If there's introduction text, add it with the main title
-            if intro_text:
-                main_title = lesson_text.split('\n')[0] if '\n' in lesson_text else "Introduction"
-                slides.append(f"{main_title}\n\n{intro_text}")
-            
-            # Process headers and create slides, merging headers with minimal content
-            processed_slides = []
-            for i, header in enumerate(headers):
-                start_pos = header.start()
-                
-                # Determine end position (next header or end of text)
-                if i < len(headers) - 1:
-                    end_pos = headers[i + 1].start()
-                else:
-                    end_pos = len(lesson_text)
-                
-                # Extract current section content
-                section_content = lesson_text[start_pos:end_pos].strip()
-                header_text = header.group(0)
-                content_after_header = section_content[len(header_text):].strip()
-                
-                # Skip if this header was already processed as part of a merge
-                if i > 0 and any(header_text in slide for slide in processed_slides[-1:]):
-                    continue
-                    
-                # If there's minimal content after this header and not the last header
-                if (not content_after_header or len(content_after_header.split()) < 5) and i < len(headers) - 1:
-                    # Look ahead to next section
-                    next_header = headers[i + 1]
-                    next_end = headers[i + 2].start() if i + 2 < len(headers) else len(lesson_text)
-                    # Merge this header with next section
-                    merged_content = lesson_text[start_pos:next_end].strip()
-                    processed_slides.append(merged_content)
-                else:
-                    # Add as a regular slide
-                    processed_slides.append(section_content)
-            
-            # Use the processed slides
-            slides = processed_slides
-        else:
-            # If no headers found, treat the whole lesson as one slide
-            slides = [lesson_text]
-    
-    return slides
-
-def process_slide_content(slide_content):
-    """
-    Process the slide content to improve formatting and readability.
-    
-    Args:
-        slide_content: The raw slide content
-        
-    Returns:
-        str: Processed slide content
-    """
-    # Remove any "Lesson: XYZ" headers from the slide content
-    slide_content = re.sub(r'^#\s+Lesson:.*$', '', slide_content, flags=re.MULTILINE).strip()
-    
-    # Remove "Physics Learning Assistant" header if present
-    slide_content = re.sub(r'^#\s+Physics Learning Assistant.*$', '', slide_content, flags=re.MULTILINE).strip()
-    
-    # Make section headers slightly smaller
-    slide_content = re.sub(r'^##\s+(.*?)$', r'<h2 style="font-size: 1.4rem;">\1</h2>', slide_content, flags=re.MULTILINE)
-    
-    # Replace \cdotp with proper dot operator
-    slide_content = re.sub(r'\\cdotp', r'\\cdot', slide_content)
-    
-    return slide_content
+    # Return the current slide
+    return current_slide
 
 def render_navigation_buttons(current_index, total_slides):
     """
@@ -1,5 +1,5 @@
 import streamlit as st
-from frontend.utils.async_utils import run_async
+from frontend.utils.async_utils import iterate_async
 
 def render_qa_section(physics_service):
     """
@@ -76,24 +76,25 @@ def process_submitted_question(physics_service):
         st.write("**You asked:**")
         st.write(st.session_state.current_question)
         
-        with st.spinner(f"LLM is generating a response using {st.session_state.llm_provider.value} {st.session_state.llm_model.value}..."):
-            # Format chat history for the RAG service
-            formatted_chat_history = []
-            for exchange in st.session_state.chat_history:
-                formatted_chat_history.append((exchange["user"], exchange["assistant"]))
-            
-            # Pass the active provider, model, and chat history to the physics service
-            answer = run_async(physics_service.answer_question(
-                st.session_state.current_question,
-                st.session_state.current_topic,
-                formatted_chat_history,
-                provider=st.session_state.llm_provider,
-                model=st.session_state.llm_model
-            ))
-            
-            # Add the response below the question
-            st.write("**Response:**")
-            st.markdown(answer)
+        # Format chat history for the RAG service
+        formatted_chat_history = []
+        for exchange in st.session_state.chat_history:
+            formatted_chat_history.append((exchange["user"], exchange["assistant"]))
+        
+        # Add the response below the question, rendering it as it streams in
+        st.write("**Response:**")
+        st.caption(f"Generated with {st.session_state.llm_provider.value} {st.session_state.llm_model.value}")
+        
+        # Pass the active provider, model, and chat history to the physics service
+        answer = st.write_stream(iterate_async(physics_service.stream_answer(
+            st.session_state.current_question,
+            st.session_state.current_topic,
+            formatted_chat_history,
+            provider=st.session_state.llm_provider,
+            model=st.session_state.llm_model
+        )))
+        if not isinstance(answer, str):
+            answer = "".join(str(part) for part in answer)
         
         # Create a new exchange
         new_exchange = {
@@ -2,19 +2,17 @@ import streamlit as st
 from backend.services.multi_llm_service import LLMProvider, LLMModel
 from frontend.utils.api_keys import load_api_keys_from_secrets, setup_openai_api
 
-def render_sidebar(llm_service, physics_service, rag_service):
+def render_sidebar(llm_service):
     """
     Render the sidebar with navigation and configuration options.
     
     Args:
-        llm_service: The LLM service instance
-        physics_service: The physics service instance
-        rag_service: The RAG service instance
+        llm_service: This session's LLM service instance
     """
     with st.sidebar:
         render_navigation()
         render_model_configuration(llm_service)
-        render_api_keys(llm_service, physics_service, rag_service)
+        render_api_keys(llm_service)
 
 def render_navigation():
     """Render the navigation buttons in the sidebar."""
@@ -97,14 +95,12 @@ def render_model_configuration(llm_service):
     
     st.write("---")
 
-def render_api_keys(llm_service, physics_service, rag_service):
+def render_api_keys(llm_service):
     """
     Render the API keys section.
     
     Args:
-        llm_service: The LLM service instance
-        physics_service: The physics service instance
-        rag_service: The RAG service instance
+        llm_service: This session's LLM service instance
     """
     st.write("### API Keys")
     st.write("Enter API keys for the providers you want to use:")
@@ -122,7 +118,7 @@ def render_api_keys(llm_service, physics_service, rag_service):
     )
     
     # Set up OpenAI API key
-    if setup_openai_api(openai_key, llm_service, physics_service, rag_service):
+    if setup_openai_api(openai_key, llm_service):
         st.success("✅ OpenAI API key set successfully!")
     
     # Anthropic API Key
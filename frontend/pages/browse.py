@@ -29,6 +29,7 @@ def render_browse_page(physics_service):
                             st.session_state.slide_index = 0
                             # Reset current lesson to force regeneration
                             st.session_state.current_lesson = None
+                            st.session_state.current_slides = None
                             st.rerun()
                 else:
                     st.write("No topics available for this chapter yet.")
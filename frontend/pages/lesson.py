@@ -36,9 +36,9 @@ def render_lesson_page(physics_service):
         # Generate or load lesson
         with st.spinner("Loading lesson..."):
             # Check if we have a cached lesson
-            if st.session_state.current_lesson is None:
-                st.session_state.current_lesson = run_async(
-                    physics_service.generate_lesson(st.session_state.current_topic)
+            if st.session_state.current_slides is None:
+                st.session_state.current_slides = run_async(
+                    physics_service.get_lesson_slides(st.session_state.current_topic)
                 )
             
             # Initialize slide index in session state if not already set
@@ -46,7 +46,7 @@ def render_lesson_page(physics_service):
                 st.session_state.slide_index = 0
             
             # Display the lesson as a slideshow
-            display_lesson_slideshow(st.session_state.current_lesson)
+            display_lesson_slideshow(st.session_state.current_slides)
             
             # Render the Q&A section
             render_qa_section(physics_service)
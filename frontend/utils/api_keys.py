@@ -1,6 +1,4 @@
-import os
 import streamlit as st
-from openai import OpenAI
 from backend.services.multi_llm_service import LLMProvider
 
 def check_api_key(llm_service):
@@ -52,32 +50,23 @@ def load_api_keys_from_secrets():
     
     return default_openai_key, default_anthropic_key
 
-def setup_openai_api(openai_key, llm_service, physics_service, rag_service):
+def setup_openai_api(openai_key, llm_service):
     """
-    Set up the OpenAI API key for all services.
+    Set up the OpenAI API key for this session.
+    
+    The key is only stored in the session's LLM service; the shared RAG service
+    uses it for query embeddings through that service, so it never leaks into
+    other sessions.
     
     Args:
         openai_key: The OpenAI API key
-        llm_service: The LLM service instance
-        physics_service: The physics service instance
-        rag_service: The RAG service instance
+        llm_service: This session's LLM service instance
         
     Returns:
         bool: True if the API key was set successfully, False otherwise
     """
     if openai_key and openai_key.startswith("sk-"):
-        # Set API key for all services
-        os.environ["OPENAI_API_KEY"] = openai_key
         llm_service.set_api_key(LLMProvider.OPENAI, openai_key)
-        
-        # Update RAG service with the API key
-        if hasattr(physics_service, 'rag_service') and physics_service.rag_service:
-            physics_service.rag_service.openai_client = OpenAI(api_key=openai_key)
-        
-        # Also ensure the RAG service directly has the API key
-        if rag_service:
-            rag_service.openai_client = OpenAI(api_key=openai_key)
-        
         return True
     elif openai_key:
         st.error("❌ Invalid OpenAI API key. It should start with 'sk-'.")
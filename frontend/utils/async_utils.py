@@ -1,4 +1,26 @@
 import asyncio
+import threading
+
+# A single event loop, running in a background thread, shared by all sessions.
+# The pooled async LLM clients are bound to the loop they were created on, so
+# reusing one loop keeps their connections alive between Streamlit reruns.
+_loop = None
+_loop_lock = threading.Lock()
+
+def get_event_loop():
+    """
+    Get the shared background event loop, starting it on first use.
+    
+    Returns:
+        The running event loop
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None or _loop.is_closed():
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="async-utils-loop", daemon=True).start()
+            _loop = loop
+        return _loop
 
 def run_async(func):
     """
@@ -10,8 +32,31 @@ def run_async(func):
     Returns:
         The result of the async function
     """
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    result = loop.run_until_complete(func)
-    loop.close()
-    return result
+    return asyncio.run_coroutine_threadsafe(func, get_event_loop()).result()
+
+def iterate_async(async_iterator):
+    """
+    Helper function to consume an async iterator from synchronous code.
+    
+    Items are yielded as soon as they are produced, so the result can be passed
+    to st.write_stream to render a streamed response incrementally.
+    
+    Args:
+        async_iterator: An async iterator (e.g. an async generator)
+        
+    Yields:
+        The items of the async iterator
+    """
+    async def next_item():
+        return await async_iterator.__anext__()
+    
+    loop = get_event_loop()
+    try:
+        while True:
+            try:
+                yield asyncio.run_coroutine_threadsafe(next_item(), loop).result()
+            except StopAsyncIteration:
+                break
+    finally:
+        if hasattr(async_iterator, 'aclose'):
+            asyncio.run_coroutine_threadsafe(async_iterator.aclose(), loop).result()
@@ -1,5 +1,5 @@
 import streamlit as st
-from backend.services.multi_llm_service import LLMProvider, LLMModel
+from backend.services.multi_llm_service import MultiLLMService, LLMProvider, LLMModel
 
 def initialize_session_state():
     """Initialize all session state variables needed for the application."""
@@ -8,6 +8,8 @@ def initialize_session_state():
         st.session_state.mode = 'browse'  # 'browse' or 'lesson' or 'qa' or 'about' or 'how_to_use'
     if 'current_lesson' not in st.session_state:
         st.session_state.current_lesson = None
+    if 'current_slides' not in st.session_state:
+        st.session_state.current_slides = None
     if 'slide_index' not in st.session_state:
         st.session_state.slide_index = 0
     
@@ -37,10 +39,26 @@ def initialize_session_state():
     if 'question_submitted' not in st.session_state:
         st.session_state.question_submitted = False
 
+def initialize_session_services(container):
+    """Create this session's services on top of the shared ones in the container.
+    
+    Args:
+        container: The process-wide service container
+        
+    Returns:
+        tuple: (llm_service, physics_service) for this session
+    """
+    if 'llm_service' not in st.session_state:
+        st.session_state.llm_service = MultiLLMService()
+    if 'physics_service' not in st.session_state:
+        st.session_state.physics_service = container.create_physics_service(st.session_state.llm_service)
+    return st.session_state.llm_service, st.session_state.physics_service
+
 def reset_lesson_state():
     """Reset all session state variables related to lessons."""
     st.session_state.mode = 'browse'
     st.session_state.current_lesson = None
+    st.session_state.current_slides = None
     st.session_state.slide_index = 0
     if 'topics' in st.session_state:
         del st.session_state.topics
@@ -0,0 +1,46 @@
+"""
+Benchmark of the speech preprocessing of the stored lessons.
+
+Run with `python tests/benchmark_speech_preprocessing.py`; it is not collected
+by pytest. Reports the best time per 12 KB of lesson text over several rounds.
+"""
+
+import sys
+import time
+import asyncio
+from pathlib import Path
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from backend.services.lesson_storage import LessonStorage
+from backend.services.speech_preprocessing import preprocess_math_for_speech
+
+LESSONS_DIR = Path(__file__).parent.parent / "backend" / "data" / "lessons"
+ROUNDS = 7
+
+async def load_lessons():
+    """Read every stored lesson (lesson files are imported into the database first)."""
+    storage = LessonStorage(str(LESSONS_DIR))
+    lessons = [await storage.get_lesson(topic) for topic in sorted(await storage.get_all_topics())]
+    return [lesson for lesson in lessons if lesson]
+
+def main():
+    texts = asyncio.run(load_lessons())
+    if not texts:
+        print(f"No lessons found in {LESSONS_DIR}")
+        return
+    total_chars = sum(len(text) for text in texts)
+
+    best = float('inf')
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        for text in texts:
+            preprocess_math_for_speech(text)
+        best = min(best, time.perf_counter() - start)
+
+    print(f"{len(texts)} lessons, {total_chars / 1000:.0f} KB")
+    print(f"{best * 1000:.1f} ms in total, {best / total_chars * 12000 * 1e6:.0f} µs per 12 KB")
+
+if __name__ == "__main__":
+    main()
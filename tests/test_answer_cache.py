@@ -0,0 +1,56 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from backend.services.answer_cache import SemanticAnswerCache, normalize_question, hash_chat_history
+
+QUESTION = normalize_question("What is the speed of the ball after 3 s?")
+EMBEDDING = np.array([1.0, 0.0, 0.0, 0.0], dtype='float32')
+
+def rotated(similarity):
+    """An embedding with the given cosine similarity to EMBEDDING."""
+    return np.array([similarity, np.sqrt(1 - similarity ** 2), 0.0, 0.0], dtype='float32')
+
+def make_cache(tmp_path, **options):
+    cache = SemanticAnswerCache(str(tmp_path / "answers.db"), similarity_threshold=0.95, **options)
+    cache.store("kinematics", "gpt-4", QUESTION, EMBEDDING, "12 m/s")
+    return cache
+
+def test_normalization():
+    assert normalize_question("  What is   WORK?? ") == "what is work"
+    assert hash_chat_history([]) == ""
+    assert hash_chat_history([("Hi", "Hello")]) != hash_chat_history([("Hi", "Hello there")])
+
+def test_similarity_threshold(tmp_path):
+    cache = make_cache(tmp_path)
+
+    assert cache.lookup("kinematics", "gpt-4", QUESTION, rotated(0.97)) == "12 m/s"
+    assert cache.lookup("kinematics", "gpt-4", QUESTION, rotated(0.9)) is None
+    # Embeddings are compared after normalization
+    assert cache.lookup("kinematics", "gpt-4", QUESTION, 5 * EMBEDDING) == "12 m/s"
+    assert cache.get_stats()['hits'] == 2 and cache.get_stats()['misses'] == 1
+
+def test_questions_with_different_numbers_never_match(tmp_path):
+    cache = make_cache(tmp_path)
+    other = normalize_question("What is the speed of the ball after 5 s?")
+
+    assert cache.lookup("kinematics", "gpt-4", other, EMBEDDING) is None
+
+def test_answers_are_scoped_by_topic_model_and_history(tmp_path):
+    cache = make_cache(tmp_path)
+    history = hash_chat_history([("What is a vector?", "A quantity with a direction.")])
+    cache.store("kinematics", "gpt-4", QUESTION, EMBEDDING, "12 m/s, as before", history_hash=history)
+
+    assert cache.lookup("dynamics", "gpt-4", QUESTION, EMBEDDING) is None
+    assert cache.lookup("kinematics", "claude-3-haiku-20240307", QUESTION, EMBEDDING) is None
+    assert cache.lookup("kinematics", "gpt-4", QUESTION, EMBEDDING) == "12 m/s"
+    assert cache.lookup("kinematics", "gpt-4", QUESTION, EMBEDDING, history_hash=history) == "12 m/s, as before"
+
+def test_expired_answers_are_not_reused(tmp_path):
+    cache = make_cache(tmp_path, ttl=0)
+
+    assert cache.lookup("kinematics", "gpt-4", QUESTION, EMBEDDING) is None
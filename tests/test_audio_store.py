@@ -0,0 +1,53 @@
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from backend.services.audio_store import AudioStore, audio_key
+
+def test_least_recently_used_clips_are_evicted_beyond_the_cap(tmp_path):
+    store = AudioStore(tmp_path, max_bytes=250, max_age=None)
+    store.put("a", b"a" * 100)
+    store.put("b", b"b" * 100)
+    # Using "a" makes "b" the least recently used clip
+    assert store.get("a")
+    store.put("c", b"c" * 100)
+    assert store.get("b") is None and not store.path("b").exists()
+    assert Path(store.get("a")).read_bytes() == b"a" * 100
+    assert store.get("c")
+    stats = store.get_stats()
+    assert stats['entries'] == 2 and stats['bytes'] == 200 and stats['evictions'] == 1
+
+def test_order_and_expiry_survive_restarts(tmp_path):
+    store = AudioStore(tmp_path, max_bytes=1000, max_age=3600)
+    store.put("old", b"x" * 10)
+    store.put("new", b"y" * 10)
+    two_hours_ago = time.time() - 7200
+    os.utime(store.path("old"), (two_hours_ago, two_hours_ago))
+
+    reopened = AudioStore(tmp_path, max_bytes=1000, max_age=3600)
+    assert reopened.get("old") is None and not store.path("old").exists()
+    assert reopened.get("new")
+
+def test_concurrent_writes_of_the_same_clip(tmp_path):
+    store = AudioStore(tmp_path, max_bytes=10_000, max_age=None)
+    key = audio_key("The net force is zero.", "nova", "tts-1")
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        paths = set(pool.map(lambda _: store.put(key, b"audio" * 100), range(32)))
+    assert len(paths) == 1
+    assert Path(paths.pop()).read_bytes() == b"audio" * 100
+    assert list(tmp_path.glob("*.tmp")) == []
+    assert store.get_stats()['bytes'] == 500
+
+def test_cap_applies_to_clips_of_all_processes(tmp_path):
+    stores = [AudioStore(tmp_path, max_bytes=250, max_age=None) for _ in range(2)]
+    for i in range(6):
+        stores[i % 2].put(f"clip-{i}", b"x" * 100)
+
+    # Each store only wrote 300 bytes itself, but the directory stays within the cap
+    assert sum(path.stat().st_size for path in tmp_path.glob("*.mp3")) <= 250
+    assert sorted(path.stem for path in tmp_path.glob("*.mp3")) == ["clip-4", "clip-5"]
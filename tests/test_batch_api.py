@@ -0,0 +1,113 @@
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from backend.services.batch_api import LocalBatchBackend, AnthropicBatchBackend, OpenAIBatchBackend
+from backend.services.lesson_storage import LessonStorage
+from backend.services.lesson_generation.batch_generator import BatchLessonGenerator
+from backend.services.multi_llm_service import MultiLLMService, LLMProvider, LLMModel, GenerationConfig
+
+CONFIG = GenerationConfig(provider=LLMProvider.OPENAI, model=LLMModel.GPT4, temperature=0.5)
+
+def make_service():
+    service = MultiLLMService(response_cache=None)
+    service.api_keys = {}
+    service.clients = {}
+    return service
+
+def respond(body):
+    prompt = body['messages'][-1]['content']
+    if 'Broken' in prompt:
+        raise ValueError("rejected")
+    return f"Lesson text for: {prompt.splitlines()[0]}"
+
+def test_payload_formats():
+    request = make_service().build_batch_request("req-1", "What is work?", "Be brief.", config=CONFIG)
+
+    openai_line = OpenAIBatchBackend(client=None).build_payload([request])[0]
+    assert openai_line['url'] == '/v1/chat/completions'
+    assert openai_line['body']['model'] == 'gpt-4'
+    assert openai_line['body']['messages'][0] == {'role': 'system', 'content': 'Be brief.'}
+
+    anthropic_line = AnthropicBatchBackend(client=None).build_payload([request])[0]
+    assert anthropic_line['params']['system'] == 'Be brief.'
+    assert anthropic_line['params']['messages'] == [{'role': 'user', 'content': 'What is work?'}]
+    assert anthropic_line['params']['max_tokens'] == 4000
+
+def test_run_batch_with_local_backend(tmp_path):
+    service = make_service()
+    backend = LocalBatchBackend(str(tmp_path / "batches"), respond)
+    requests = [service.build_batch_request(f"req-{i}", f"Question {i}", config=CONFIG) for i in range(3)]
+    requests.append(service.build_batch_request("req-broken", "Broken question", config=CONFIG))
+
+    results = asyncio.run(service.run_batch(requests, backend, poll_interval=0))
+
+    assert results["req-1"].text == "Lesson text for: Question 1"
+    assert results["req-broken"].text is None and "rejected" in results["req-broken"].error
+    # The submitted payload is kept as JSONL
+    batch_dir = next((tmp_path / "batches").iterdir())
+    assert len((batch_dir / "input.jsonl").read_text().splitlines()) == 4
+
+def test_batch_lessons_are_ingested_into_storage(tmp_path):
+    storage = LessonStorage(str(tmp_path / "lessons"))
+    backend = LocalBatchBackend(str(tmp_path / "batches"), respond)
+    generator = BatchLessonGenerator(make_service(), storage, CONFIG, journal_path=str(tmp_path / "journal.jsonl"))
+    topics = ["Work and Energy", "Broken Topic", "Momentum"]
+
+    stats = asyncio.run(generator.run_batch_api(topics, backend=backend, poll_interval=0))
+
+    assert stats['generated'] == 2 and stats['failed'] == 1
+    lesson = asyncio.run(storage.get_lesson("Momentum"))
+    assert lesson.startswith("Lesson text for: Create a comprehensive physics lesson about Momentum")
+    assert asyncio.run(storage.get_lesson("Broken Topic")) is None
+
+    # A second run only resubmits the failed topic
+    stats = asyncio.run(generator.run_batch_api(topics, backend=backend, poll_interval=0))
+    assert stats['skipped'] == 2 and stats['failed'] == 1
+    records = [json.loads(line) for line in (tmp_path / "journal.jsonl").read_text().splitlines()]
+    assert sum(1 for record in records if record['status'] == 'batch_submitted') == 2
+
+def test_forced_regeneration_resumes_instead_of_starting_over(tmp_path):
+    storage = LessonStorage(str(tmp_path / "lessons"))
+    broken = {"Broken Topic"}
+
+    def respond_until_fixed(body):
+        if any(topic in body['messages'][-1]['content'] for topic in broken):
+            raise ValueError("rejected")
+        return "Lesson text"
+
+    backend = LocalBatchBackend(str(tmp_path / "batches"), respond_until_fixed)
+    generator = BatchLessonGenerator(make_service(), storage, CONFIG, journal_path=str(tmp_path / "journal.jsonl"))
+    topics = ["Work and Energy", "Broken Topic", "Momentum"]
+
+    stats = asyncio.run(generator.run_batch_api(topics, force=True, backend=backend, poll_interval=0))
+    assert stats['generated'] == 2 and stats['failed'] == 1
+
+    # Running the forced regeneration again only retries the topic it has not regenerated yet
+    broken.clear()
+    stats = asyncio.run(generator.run_batch_api(topics, force=True, backend=backend, poll_interval=0))
+    assert stats['skipped'] == 2 and stats['generated'] == 1
+
+    # Once it has finished, the next forced run regenerates every topic again
+    stats = asyncio.run(generator.run_batch_api(topics, force=True, backend=backend, poll_interval=0))
+    assert stats['skipped'] == 0 and stats['generated'] == 3
+
+def test_lessons_that_cannot_be_stored_are_not_journaled_as_generated(tmp_path):
+    class FailingStorage(LessonStorage):
+        def _store_lesson(self, topic, content, model, prompt_hash):
+            if topic == "Momentum":
+                raise OSError("disk full")
+            super()._store_lesson(topic, content, model, prompt_hash)
+
+    storage = FailingStorage(str(tmp_path / "lessons"))
+    backend = LocalBatchBackend(str(tmp_path / "batches"), respond)
+    generator = BatchLessonGenerator(make_service(), storage, CONFIG, journal_path=str(tmp_path / "journal.jsonl"))
+
+    stats = asyncio.run(generator.run_batch_api(["Work and Energy", "Momentum"], backend=backend, poll_interval=0))
+
+    assert stats['generated'] == 1 and stats['failed'] == 1
+    assert "Momentum" not in generator.journal.load()
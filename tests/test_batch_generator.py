@@ -0,0 +1,149 @@
+import asyncio
+import json
+import sys
+from dataclasses import replace
+from pathlib import Path
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from backend.services.embedding_pipeline import count_tokens
+from backend.services.lesson_storage import LessonStorage
+from backend.services.lesson_generation.batch_generator import BatchLessonGenerator, LESSON_SYSTEM_PROMPT, build_lesson_prompt
+from backend.services.multi_llm_service import LLMProvider, LLMModel, GenerationConfig
+
+CONFIG = GenerationConfig(provider=LLMProvider.OPENAI, model=LLMModel.GPT4, temperature=0.5, max_tokens=1000)
+TOPICS = ["Work and Energy", "Broken Topic", "Momentum"]
+
+class FakeLLMService:
+    """Answers generate_text without network access, recording the calls."""
+
+    def __init__(self, broken=(), lesson="Lesson text", delay=0.0):
+        self.broken = set(broken)
+        self.lesson = lesson
+        self.delay = delay
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def generate_text(self, prompt, system_prompt="", config=None, allow_fallback=True, use_cache=True):
+        self.calls.append({'prompt': prompt, 'allow_fallback': allow_fallback, 'use_cache': use_cache})
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            if any(topic in prompt for topic in self.broken):
+                raise ValueError("rejected")
+            return self.lesson
+        finally:
+            self.in_flight -= 1
+
+def make_generator(tmp_path, llm_service, storage=None, **options):
+    options.setdefault('max_retries', 0)
+    return BatchLessonGenerator(
+        llm_service, storage or LessonStorage(str(tmp_path / "lessons")), options.pop('config', CONFIG),
+        requests_per_minute={"openai": 0}, journal_path=str(tmp_path / "journal.jsonl"), backoff_base=0, **options
+    )
+
+def journal_records(tmp_path):
+    return [json.loads(line) for line in (tmp_path / "journal.jsonl").read_text().splitlines()]
+
+def test_concurrency_is_bounded(tmp_path):
+    llm_service = FakeLLMService(delay=0.01)
+    generator = make_generator(tmp_path, llm_service, max_concurrency=2)
+    topics = [f"Topic {i}" for i in range(6)]
+
+    stats = asyncio.run(generator.run(topics))
+
+    assert stats['generated'] == 6
+    assert llm_service.max_in_flight == 2
+    assert sorted(asyncio.run(generator.lesson_storage.get_all_topics())) == topics
+    # Lessons are generated fresh by the requested model
+    assert all(not call['use_cache'] and not call['allow_fallback'] for call in llm_service.calls)
+
+def test_budget_stops_new_topics(tmp_path):
+    model = CONFIG.model.value
+    input_tokens = count_tokens(build_lesson_prompt("Topic 0") + LESSON_SYSTEM_PROMPT, model)
+    expected_tokens = input_tokens + CONFIG.max_tokens
+    # Lessons as long as max_tokens, so generated lessons use up their reservation
+    llm_service = FakeLLMService(lesson="word " * CONFIG.max_tokens, delay=0.01)
+    generator = make_generator(tmp_path, llm_service, max_concurrency=4, token_budget=int(expected_tokens * 2.5))
+
+    stats = asyncio.run(generator.run([f"Topic {i}" for i in range(4)]))
+
+    # Concurrent workers reserve their expected usage, so only two topics start
+    assert stats['generated'] == 2 and stats['over_budget'] == 2
+    assert len(llm_service.calls) == 2
+    assert stats['tokens'] <= generator.token_budget
+
+def test_resume_skips_finished_and_unchanged_topics(tmp_path):
+    llm_service = FakeLLMService(broken={"Broken Topic"})
+    generator = make_generator(tmp_path, llm_service)
+
+    stats = asyncio.run(generator.run(TOPICS))
+    assert stats['generated'] == 2 and stats['failed'] == 1
+
+    # The next run only retries the failed topic
+    llm_service.broken.clear()
+    llm_service.calls.clear()
+    stats = asyncio.run(generator.run(TOPICS))
+    assert stats['skipped'] == 2 and stats['generated'] == 1
+    assert len(llm_service.calls) == 1 and "Broken Topic" in llm_service.calls[0]['prompt']
+
+    # A changed request (here the temperature) regenerates every topic
+    changed = make_generator(tmp_path, llm_service, config=replace(CONFIG, temperature=0.2))
+    stats = asyncio.run(changed.run(TOPICS))
+    assert stats['skipped'] == 0 and stats['generated'] == 3
+
+def test_stored_prompt_hash_counts_without_journal(tmp_path):
+    storage = LessonStorage(str(tmp_path / "lessons"))
+    llm_service = FakeLLMService()
+    generator = make_generator(tmp_path, llm_service, storage=storage)
+    job = generator.build_job("Momentum")
+    asyncio.run(storage.store_lesson("Momentum", "Stored lesson", model=CONFIG.model, prompt_hash=job.request_hash))
+    asyncio.run(storage.store_lesson("Work and Energy", "Stored lesson", model=CONFIG.model, prompt_hash="outdated"))
+
+    stats = asyncio.run(generator.run(["Momentum", "Work and Energy"]))
+
+    assert stats['skipped'] == 1 and stats['generated'] == 1
+    assert asyncio.run(storage.get_lesson("Momentum")) == "Stored lesson"
+
+def test_forced_run_is_resumed_and_finished(tmp_path):
+    llm_service = FakeLLMService(broken={"Broken Topic"})
+    generator = make_generator(tmp_path, llm_service)
+    asyncio.run(generator.run(TOPICS))
+    llm_service.broken.clear()
+    asyncio.run(generator.run(TOPICS))
+
+    # A forced run regenerates unchanged topics, but stays open while a topic fails
+    llm_service.broken.add("Broken Topic")
+    stats = asyncio.run(generator.run(TOPICS, force=True))
+    assert stats['generated'] == 2 and stats['failed'] == 1
+    assert not any(record['status'] == 'forced_run_finished' for record in journal_records(tmp_path))
+
+    # Running it again resumes it and finishes it
+    llm_service.broken.clear()
+    stats = asyncio.run(generator.run(TOPICS, force=True))
+    assert stats['skipped'] == 2 and stats['generated'] == 1
+    records = journal_records(tmp_path)
+    started = [record for record in records if record['status'] == 'forced_run_started']
+    finished = [record for record in records if record['status'] == 'forced_run_finished']
+    assert len(started) == 1 and [record['run_id'] for record in finished] == [started[0]['run_id']]
+
+    # The next forced run starts over
+    stats = asyncio.run(generator.run(TOPICS, force=True))
+    assert stats['skipped'] == 0 and stats['generated'] == 3
+
+def test_lessons_that_cannot_be_stored_count_as_failed(tmp_path):
+    class FailingStorage(LessonStorage):
+        def _store_lesson(self, topic, content, model, prompt_hash):
+            if topic == "Momentum":
+                raise OSError("disk full")
+            super()._store_lesson(topic, content, model, prompt_hash)
+
+    generator = make_generator(tmp_path, FakeLLMService(), storage=FailingStorage(str(tmp_path / "lessons")))
+
+    stats = asyncio.run(generator.run(TOPICS))
+
+    assert stats['generated'] == 2 and stats['failed'] == 1
+    assert "Momentum" not in generator.journal.load()
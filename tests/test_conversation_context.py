@@ -0,0 +1,59 @@
+import asyncio
+import sys
+from pathlib import Path
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from backend.services.conversation_context import ConversationContext, count_turn_tokens
+
+MODEL = "claude-3-5-sonnet"
+
+def conversation(turns):
+    return [(f"Question {i} about momentum?", f"Answer {i}: momentum is $p = mv$. " * 10) for i in range(turns)]
+
+class RecordingSummarizer:
+    """Summarizer that records the turns it is asked to fold in."""
+
+    def __init__(self):
+        self.calls = []
+
+    async def __call__(self, summary, turns):
+        self.calls.append([user for user, _ in turns])
+        return (summary + " " + " ".join(user for user, _ in turns)).strip()
+
+def test_short_conversations_are_sent_verbatim():
+    context = ConversationContext(max_tokens=2000, recent_turns=3, summary_max_tokens=100)
+    summarize = RecordingSummarizer()
+    summary, recent = asyncio.run(context.build(conversation(3), MODEL, summarize))
+    assert summary == "" and recent == conversation(3)
+    assert summarize.calls == []
+
+def test_older_turns_are_summarized_incrementally():
+    context = ConversationContext(max_tokens=2000, recent_turns=3, summary_max_tokens=100)
+    summarize = RecordingSummarizer()
+    history = conversation(8)
+
+    for turns in range(4, 9):
+        summary, recent = asyncio.run(context.build(history[:turns], MODEL, summarize))
+        assert recent == history[turns - 3:turns]
+        assert summary == " ".join(user for user, _ in history[:turns - 3])
+
+    # Each turn is summarized once, when it leaves the verbatim window
+    assert summarize.calls == [[f"Question {i} about momentum?"] for i in range(5)]
+    assert context.get_stats()['summarized_turns'] == 5
+
+def test_history_stays_within_the_budget():
+    turn_tokens = count_turn_tokens(conversation(1)[0], MODEL)
+    context = ConversationContext(max_tokens=2 * turn_tokens + 100, recent_turns=5, summary_max_tokens=100)
+    summary, recent = asyncio.run(context.build(conversation(6), MODEL, RecordingSummarizer()))
+    assert len(recent) == 2
+    assert sum(count_turn_tokens(turn, MODEL) for turn in recent) + 100 <= context.max_tokens
+
+def test_older_turns_are_dropped_when_summarizing_fails():
+    async def failing(summary, turns):
+        raise RuntimeError("rate limited")
+
+    context = ConversationContext(max_tokens=2000, recent_turns=2, summary_max_tokens=100)
+    summary, recent = asyncio.run(context.build(conversation(5), MODEL, failing))
+    assert summary == "" and recent == conversation(5)[3:]
@@ -0,0 +1,30 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from backend.services.embedding_cache import EmbeddingCache
+
+def test_cached_vectors_do_not_change_after_eviction(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.db"), max_entries=1)
+    cache.put("model", "first", [1.0, 2.0])
+    cache.flush()
+    vector = cache.get("model", "first")
+    cache.put("model", "second", [3.0, 4.0])
+    cache.flush()
+    assert np.array_equal(vector, [1.0, 2.0])
+    assert cache.get("model", "first") is None
+
+def test_processes_sharing_a_cache_never_read_each_others_vectors(tmp_path):
+    # Two instances stand in for two processes opening the same cache
+    first = EmbeddingCache(str(tmp_path / "cache.db"))
+    second = EmbeddingCache(str(tmp_path / "cache.db"))
+    first.put("model", "a", [1.0])
+    first.flush()
+    second.put("model", "b", [2.0])
+    second.flush()
+    assert np.array_equal(second.get("model", "a"), [1.0])
+    assert np.array_equal(first.get("model", "b"), [2.0])
@@ -0,0 +1,179 @@
+import base64
+import hashlib
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from backend.services.embedding_pipeline import EmbeddingPipeline
+from backend.services.llm_clients import get_client
+
+DIMENSION = 8
+
+def fake_embedding(text):
+    """Deterministic embedding derived from the text hash."""
+    digest = hashlib.sha256(text.encode('utf-8')).digest()[:DIMENSION]
+    return np.frombuffer(digest, dtype=np.uint8).astype('float32')
+
+class FakeEmbeddingsServer:
+    """Local stand-in for the OpenAI embeddings endpoint.
+
+    Batches with an input containing "INVALID" get a 400 response, inputs
+    containing "DOWN" always get a 500 and inputs containing "FLAKY" get a 429
+    on their first attempt.
+    """
+
+    def __init__(self):
+        self.requests = []
+        self.seen_flaky = set()
+        self.lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                texts = body['input']
+                with server.lock:
+                    server.requests.append(texts)
+                    flaky = [text for text in texts if 'FLAKY' in text and text not in server.seen_flaky]
+                    server.seen_flaky.update(flaky)
+
+                if any('INVALID' in text for text in texts):
+                    return self.reply(400, {'error': {'message': 'bad input', 'type': 'invalid_request_error'}})
+                if any('DOWN' in text for text in texts):
+                    return self.reply(500, {'error': {'message': 'boom', 'type': 'server_error'}})
+                if flaky:
+                    return self.reply(429, {'error': {'message': 'slow down', 'type': 'rate_limit'}})
+
+                data = []
+                for i, text in enumerate(texts):
+                    vector = fake_embedding(text)
+                    if body.get('encoding_format') == 'base64':
+                        embedding = base64.b64encode(vector.tobytes()).decode('ascii')
+                    else:
+                        embedding = vector.tolist()
+                    data.append({'object': 'embedding', 'index': i, 'embedding': embedding})
+                # Return items out of order; clients must sort them by index
+                data.reverse()
+                self.reply(200, {
+                    'object': 'list',
+                    'data': data,
+                    'model': body['model'],
+                    'usage': {'prompt_tokens': len(texts), 'total_tokens': len(texts)}
+                })
+
+            def reply(self, status, payload):
+                raw = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/v1"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+def make_pipeline(url, **kwargs):
+    options = dict(max_concurrency=3, max_batch_size=4, max_retries=2, backoff_base=0.01)
+    options.update(kwargs)
+    return EmbeddingPipeline(api_key='sk-test', model='text-embedding-ada-002', base_url=url, **options)
+
+def test_embeds_all_texts_in_order():
+    texts = [f"chunk number {i}" for i in range(10)]
+    with FakeEmbeddingsServer() as server:
+        pipeline = make_pipeline(server.url)
+        results = pipeline.embed_sync(texts)
+
+    assert sorted(results) == list(range(10))
+    for i, text in enumerate(texts):
+        np.testing.assert_array_equal(results[i], fake_embedding(text))
+    # 10 texts with at most 4 per request
+    assert len(server.requests) == 3
+    assert pipeline.last_run_stats['embedded'] == 10
+    assert pipeline.last_run_stats['failed'] == 0
+
+def test_batches_respect_token_budget():
+    pipeline = make_pipeline(None, max_batch_size=100, max_batch_tokens=30)
+    texts = ["x" * 40] * 5  # About 11 tokens each with the character estimate, 10 with tiktoken
+    for batch in pipeline.make_batches(texts):
+        assert sum(pipeline.count_tokens(texts[i]) for i in batch) <= 30 or len(batch) == 1
+    assert sorted(i for batch in pipeline.make_batches(texts) for i in batch) == list(range(5))
+
+def test_rate_limited_batch_is_retried():
+    texts = ["FLAKY text", "plain text"]
+    with FakeEmbeddingsServer() as server:
+        results = make_pipeline(server.url).embed_sync(texts)
+
+    assert sorted(results) == [0, 1]
+    assert len(server.requests) == 2
+
+def test_failing_batch_is_left_out():
+    texts = ["good one", "good two", "DOWN here", "good three", "good four"]
+    with FakeEmbeddingsServer() as server:
+        pipeline = make_pipeline(server.url, max_batch_size=2)
+        results = pipeline.embed_sync(texts)
+
+    # The batch holding "DOWN here" (texts 2 and 3) is missing, not zero-filled
+    assert sorted(results) == [0, 1, 4]
+    assert pipeline.last_run_stats['failed'] == 2
+    # One attempt plus two retries for the failing batch
+    assert sum(1 for request in server.requests if "DOWN here" in request) == 3
+
+def test_rejected_batch_is_split():
+    texts = [f"text {i}" for i in range(3)] + ["INVALID text"]
+    with FakeEmbeddingsServer() as server:
+        results = make_pipeline(server.url).embed_sync(texts)
+
+    # Only the rejected text is lost
+    assert sorted(results) == [0, 1, 2]
+
+def test_async_handlers_await_embed():
+    import asyncio
+
+    async def handler(url):
+        pipeline = make_pipeline(url)
+        # Blocking the handler's event loop is refused
+        with pytest.raises(RuntimeError):
+            pipeline.embed_sync(["from an async handler"])
+        return await pipeline.embed(["from an async handler", "and another text"])
+
+    with FakeEmbeddingsServer() as server:
+        results = asyncio.run(handler(server.url))
+
+    assert sorted(results) == [0, 1]
+    np.testing.assert_array_equal(results[1], fake_embedding("and another text"))
+
+def test_single_request_uses_shared_sync_client(monkeypatch):
+    import asyncio
+
+    def no_event_loop(coroutine):
+        coroutine.close()
+        raise AssertionError("a single request should not start an event loop")
+
+    monkeypatch.setattr(asyncio, 'run', no_event_loop)
+    with FakeEmbeddingsServer() as server:
+        first = make_pipeline(server.url).embed_sync(["a query"])
+        second = make_pipeline(server.url).embed_sync(["another query"])
+
+    np.testing.assert_array_equal(first[0], fake_embedding("a query"))
+    np.testing.assert_array_equal(second[0], fake_embedding("another query"))
+    assert get_client("openai", 'sk-test') is get_client("openai", 'sk-test')
@@ -0,0 +1,95 @@
+import asyncio
+import json
+import sys
+import threading
+from pathlib import Path
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from backend.services.lesson_storage import LessonStorage
+
+def seed_file_layout(storage_dir):
+    """Write lessons the way the file-based storage did: an index and one .md file per topic."""
+    storage_dir.mkdir(parents=True)
+    (storage_dir / "Work_and_Energy.md").write_text("## Introduction\nWork is force times displacement.")
+    (storage_dir / "Newton_s_Laws.md").write_text("## Introduction\nThree laws of motion.")
+    # Written without updating the index
+    (storage_dir / "Momentum.md").write_text("## Introduction\nMomentum is mass times velocity.")
+    index = {
+        "Work and Energy": str(storage_dir / "Work_and_Energy.md"),
+        # Indexed under its original topic, at a path relative to an old working directory
+        "Newton's Laws": "old/checkout/backend/data/lessons/Newton_s_Laws.md"
+    }
+    (storage_dir / "lessons_index.json").write_text(json.dumps(index))
+
+def test_lesson_files_are_imported_once(tmp_path):
+    storage_dir = tmp_path / "lessons"
+    seed_file_layout(storage_dir)
+
+    storage = LessonStorage(str(storage_dir))
+    assert sorted(asyncio.run(storage.get_all_topics())) == ["Momentum", "Newton's Laws", "Work and Energy"]
+    assert asyncio.run(storage.get_lesson("Newton's Laws")) == "## Introduction\nThree laws of motion."
+    assert asyncio.run(storage.get_lesson("Momentum")) == "## Introduction\nMomentum is mass times velocity."
+    metadata = asyncio.run(storage.get_lesson_metadata("Work and Energy"))
+    assert metadata['checksum'] == LessonStorage.checksum("## Introduction\nWork is force times displacement.")
+    assert asyncio.run(storage.get_slides("Work and Energy"))
+
+    # Later changes are not undone by importing the files again on the next start
+    asyncio.run(storage.store_lesson("Work and Energy", "Regenerated lesson", model="gpt-4"))
+    asyncio.run(storage.delete_lesson("Momentum"))
+    restarted = LessonStorage(str(storage_dir))
+    assert sorted(asyncio.run(restarted.get_all_topics())) == ["Newton's Laws", "Work and Energy"]
+    assert asyncio.run(restarted.get_lesson("Work and Energy")) == "Regenerated lesson"
+
+    # The old files are left in place
+    assert sorted(path.name for path in storage_dir.glob("*.md")) == ["Momentum.md", "Newton_s_Laws.md", "Work_and_Energy.md"]
+    assert (storage_dir / "lessons_index.json").exists()
+
+def test_concurrent_writers_and_readers(tmp_path):
+    storage_dir = str(tmp_path / "lessons")
+    storages = [LessonStorage(storage_dir) for _ in range(2)]
+    errors = []
+
+    def work(worker):
+        try:
+            storage = storages[worker % 2]
+            for i in range(10):
+                topic = f"Topic {worker}-{i}"
+                assert asyncio.run(storage.store_lesson(topic, f"Lesson {worker}-{i}"))
+                assert asyncio.run(storage.get_lesson(topic)) == f"Lesson {worker}-{i}"
+                # Lessons written through the other connection are visible too
+                assert asyncio.run(storages[(worker + 1) % 2].get_lesson(topic)) == f"Lesson {worker}-{i}"
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=work, args=(worker,)) for worker in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    topics = asyncio.run(LessonStorage(storage_dir).get_all_metadata())
+    assert len(topics) == 40
+
+def test_cached_lessons_are_revalidated_after_other_writers(tmp_path):
+    storage_dir = str(tmp_path / "lessons")
+    reader = LessonStorage(storage_dir)
+    writer = LessonStorage(storage_dir)
+    asyncio.run(writer.store_lesson("Momentum", "First version"))
+    asyncio.run(writer.store_lesson("Work and Energy", "Unchanged"))
+    assert asyncio.run(reader.get_lesson("Momentum")) == "First version"
+    assert asyncio.run(reader.get_lesson("Work and Energy")) == "Unchanged"
+
+    # Served from memory while the database is unchanged
+    asyncio.run(reader.get_lesson("Momentum"))
+    assert reader.get_cache_stats()['hits'] == 1 and reader.get_cache_stats()['revalidations'] == 0
+
+    # Another connection replaces one lesson and deletes the other: neither is served stale
+    asyncio.run(writer.store_lesson("Momentum", "Second version"))
+    assert asyncio.run(reader.get_lesson("Momentum")) == "Second version"
+    assert asyncio.run(reader.get_slides("Momentum"))[0]['markdown'].strip() == "Second version"
+    asyncio.run(writer.delete_lesson("Work and Energy"))
+    assert asyncio.run(reader.get_lesson("Work and Energy")) is None
+    assert reader.get_cache_stats()['revalidations'] == 2
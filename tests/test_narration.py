@@ -0,0 +1,71 @@
+import asyncio
+import sys
+from pathlib import Path
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from backend.services.audio_store import AudioStore
+from backend.services.narration import NarrationService, audio_key
+from backend.services.slides import build_slides
+
+LESSON = """## Introduction
+Newton's laws describe how forces change the motion of bodies.
+
+## Second Law
+The net force equals mass times acceleration, $F = ma$.
+
+## Third Law
+Every action has an equal and opposite reaction.
+"""
+
+class RecordingSpeechService:
+    """Speech service that returns the text as audio and records the peak concurrency."""
+
+    def __init__(self):
+        self.calls = []
+        self.in_flight = 0
+        self.peak = 0
+
+    async def synthesize(self, text, voice, model):
+        self.calls.append(text)
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        return text.encode('utf-8')
+
+def test_audio_key_ignores_whitespace():
+    assert audio_key("a  b\nc", "nova", "tts-1") == audio_key("a b c", "nova", "tts-1")
+    assert audio_key("a b c", "nova", "tts-1") != audio_key("a b c", "alloy", "tts-1")
+
+def test_slides_are_synthesized_once_with_bounded_concurrency(tmp_path):
+    speech = RecordingSpeechService()
+    narration = NarrationService(speech, audio_store=AudioStore(tmp_path), max_concurrency=2)
+    slides = build_slides(LESSON)
+
+    async def run():
+        # Overlapping requests for the same slides share one synthesis each
+        return await asyncio.gather(narration.narrate_slides(slides), narration.narrate_slides(slides))
+
+    first, second = asyncio.run(run())
+    assert first == second and all(first)
+    assert len(speech.calls) == len(slides)
+    assert speech.peak <= 2
+    assert Path(first[1]).read_bytes() == slides[1]['speech'].encode('utf-8')
+
+    # Editing one slide only re-synthesizes that slide
+    edited = build_slides(LESSON.replace("equal and opposite", "equal but opposite"))
+    paths = asyncio.run(narration.narrate_slides(edited))
+    assert len(speech.calls) == len(slides) + 1
+    assert paths[:2] == first[:2] and paths[2] != first[2]
+
+def test_long_texts_are_synthesized_in_pieces(tmp_path):
+    speech = RecordingSpeechService()
+    narration = NarrationService(speech, audio_store=AudioStore(tmp_path))
+    text = " ".join(f"Sentence number {i} is about forces." for i in range(300))
+
+    path = asyncio.run(narration.synthesize(text))
+    assert len(speech.calls) > 1 and all(len(piece) <= 4096 for piece in speech.calls)
+    assert Path(path).read_bytes() == "".join(speech.calls).encode('utf-8')
+    assert all(piece.endswith('.') for piece in speech.calls)
@@ -0,0 +1,120 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from backend.services.multi_llm_service import MultiLLMService, LLMProvider, LLMModel, GenerationConfig
+from backend.services.response_cache import (
+    MemoryResponseCache, SQLiteResponseCache, ResponseCacheMiss, make_cache_key
+)
+
+MESSAGES = [
+    {"role": "system", "content": "You are a physics professor."},
+    {"role": "user", "content": "What is the work-energy theorem?"}
+]
+
+def make_service(cache):
+    service = MultiLLMService(response_cache=cache)
+    service.api_keys = {}
+    service.clients = {}
+    return service
+
+def test_key_is_canonical():
+    key = make_cache_key(LLMProvider.OPENAI, LLMModel.GPT4, MESSAGES, 0.7)
+    # Enum members and their values, dict key order and int/float temperatures hash the same
+    reordered = [{"content": msg["content"], "role": msg["role"]} for msg in MESSAGES]
+    assert make_cache_key("openai", "gpt-4", reordered, 0.7) == key
+    assert make_cache_key("openai", "gpt-4", MESSAGES, 1) == make_cache_key("openai", "gpt-4", MESSAGES, 1.0)
+    # Any change to the request changes the key
+    assert make_cache_key(LLMProvider.OPENAI, LLMModel.GPT4, MESSAGES, 0.2) != key
+    assert make_cache_key(LLMProvider.OPENAI, LLMModel.GPT4, MESSAGES, 0.7, max_tokens=100) != key
+    assert make_cache_key(LLMProvider.OPENAI, LLMModel.GPT35_TURBO, MESSAGES, 0.7) != key
+    assert make_cache_key(LLMProvider.OPENAI, LLMModel.GPT4, MESSAGES[:1], 0.7) != key
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_evicts_least_recently_used_beyond_byte_limit(backend, tmp_path):
+    if backend == "memory":
+        cache = MemoryResponseCache(max_bytes=25)
+    else:
+        cache = SQLiteResponseCache(str(tmp_path / "responses.db"), max_bytes=25)
+
+    cache.put("a", "x" * 10)
+    cache.put("b", "y" * 10)
+    assert cache.get("a") == "x" * 10  # "b" is now the least recently used
+    cache.put("c", "z" * 10)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "x" * 10
+    assert cache.get("c") == "z" * 10
+    stats = cache.get_stats()
+    assert stats["entries"] == 2
+    assert stats["bytes"] == 20
+    assert stats["hits"] == 3 and stats["misses"] == 1
+
+def test_sqlite_cache_persists(tmp_path):
+    path = str(tmp_path / "responses.db")
+    SQLiteResponseCache(path).put("key", "stored answer")
+    assert SQLiteResponseCache(path).get("key") == "stored answer"
+
+def test_sqlite_reads_do_not_write(tmp_path):
+    path = str(tmp_path / "responses.db")
+    SQLiteResponseCache(path).put("key", "stored answer")
+
+    for cache in (SQLiteResponseCache(path), SQLiteResponseCache(path, replay=True)):
+        changes = cache.conn.total_changes
+        for _ in range(5):
+            assert cache.get("key") == "stored answer"
+        assert cache.conn.total_changes == changes
+
+    # Replay reads are never recorded, even past the write batch
+    replay = SQLiteResponseCache(path, replay=True)
+    for _ in range(200):
+        replay.get("key")
+    assert replay.conn.total_changes == 0
+
+def test_generate_text_uses_cache_and_bypass():
+    cache = MemoryResponseCache()
+    service = make_service(cache)
+    service.api_keys[LLMProvider.OPENAI] = "sk-test"
+    calls = []
+
+    async def fake_generate(prompt, system_prompt, messages, config):
+        calls.append(config)
+        return f"answer {len(calls)}"
+
+    service._generate_openai = fake_generate
+    config = GenerationConfig(provider=LLMProvider.OPENAI, model=LLMModel.GPT4, temperature=0.0)
+
+    async def run():
+        first = await service.generate_text("", "", messages=MESSAGES, config=config)
+        second = await service.generate_text("", "", messages=MESSAGES, config=config)
+        bypassed = await service.generate_text("", "", messages=MESSAGES, config=config, use_cache=False)
+        streamed = [chunk async for chunk in service.stream_text("", "", messages=MESSAGES, config=config)]
+        return first, second, bypassed, streamed
+
+    first, second, bypassed, streamed = asyncio.run(run())
+    assert first == second == "answer 1"
+    assert bypassed == "answer 2"
+    assert streamed == ["answer 1"]
+    assert len(calls) == 2
+
+def test_replay_without_network(tmp_path):
+    path = str(tmp_path / "responses.db")
+    config = GenerationConfig(provider=LLMProvider.ANTHROPIC, model=LLMModel.CLAUDE_3_HAIKU, temperature=0.0)
+
+    # Record a response as a previous run would have
+    recorder = make_service(SQLiteResponseCache(path))
+    key = recorder._response_cache_key("What is work?", "Be brief.", None, config)
+    recorder.response_cache.put(key, "Work is force times displacement.")
+
+    # Replay needs neither API keys nor network access
+    service = make_service(SQLiteResponseCache(path, replay=True))
+    answer = asyncio.run(service.generate_text("What is work?", "Be brief.", config=config))
+    assert answer == "Work is force times displacement."
+
+    with pytest.raises(ResponseCacheMiss):
+        asyncio.run(service.generate_text("What is power?", "Be brief.", config=config))
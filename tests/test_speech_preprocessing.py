@@ -0,0 +1,26 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from backend.services.speech_preprocessing import preprocess_latex_for_speech, preprocess_math_for_speech
+
+GOLDEN = json.loads((Path(__file__).parent / "data" / "speech_preprocessing_golden.json").read_text(encoding='utf-8'))
+
+@pytest.mark.parametrize("case", GOLDEN, ids=[case["name"] for case in GOLDEN])
+def test_golden_corpus(case):
+    assert preprocess_math_for_speech(case["input"]) == case["expected"]
+
+def test_latex_is_read_as_math():
+    assert preprocess_latex_for_speech("\\frac{a+b}{2}") == "the quantity a plus b, over 2"
+    assert preprocess_latex_for_speech("x - y") == "x minus y"
+    assert preprocess_math_for_speech("a well-known result") == "a well-known result"
+
+def test_symbols_are_read_next_to_special_words():
+    # θ is also the last letter of the special word dθ
+    assert preprocess_latex_for_speech("dθ + θ") == "change in theta plus theta"
+    assert preprocess_math_for_speech("use dt, not 3e8 dt") == "use change in time, not 3 times ten to the power of 8 change in time"
@@ -0,0 +1,63 @@
+import asyncio
+import sys
+from pathlib import Path
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from backend.services.voice_pipeline import SentenceSegmenter, stream_with_speech
+
+ANSWER = ("The net force is $F = m \\cdot a$. For example, e.g. a 2 kg mass. "
+          "It accelerates at 3.5 m/s^2! Next:\n\n1. Draw the forces. $$a = \\frac{F}{m}. b$$ Done")
+
+def segment(text, chunk_size):
+    segmenter = SentenceSegmenter()
+    sentences = []
+    for i in range(0, len(text), chunk_size):
+        sentences.extend(segmenter.feed(text[i:i + chunk_size]))
+    return sentences + segmenter.flush()
+
+def test_segmentation_does_not_depend_on_chunking():
+    expected = [
+        "The net force is $F = m \\cdot a$.",
+        "For example, e.g. a 2 kg mass.",
+        "It accelerates at 3.5 m/s^2!",
+        "Next:",
+        "1. Draw the forces.",
+        "$$a = \\frac{F}{m}. b$$ Done",
+    ]
+    for chunk_size in (1, 2, 3, 7, len(ANSWER)):
+        assert segment(ANSWER, chunk_size) == expected
+
+def test_sentences_can_end_in_a_number():
+    text = "The answer is 5. Next we divide by 2. Then:\n  3. Check the units."
+    for chunk_size in (1, 4, len(text)):
+        assert segment(text, chunk_size) == ["The answer is 5.", "Next we divide by 2.", "Then:\n  3. Check the units."]
+
+def test_audio_is_streamed_in_order_before_the_answer_ends():
+    sentences_done = asyncio.Event()
+
+    async def chunks():
+        for word in "First sentence here. Second one is longer. Third.".split(" "):
+            yield word + " "
+            await asyncio.sleep(0.01)
+        # Hold the stream open until the first audio has been emitted
+        await asyncio.wait_for(sentences_done.wait(), 1)
+
+    async def synthesize(text):
+        # Later sentences finish first
+        await asyncio.sleep(0.05 if text.startswith("First") else 0.01)
+        return text.encode('utf-8')
+
+    async def run():
+        events = []
+        async for kind, value in stream_with_speech(chunks(), synthesize):
+            events.append((kind, value))
+            if kind == "audio":
+                sentences_done.set()
+        return events
+
+    events = asyncio.run(run())
+    audio = [value.decode('utf-8') for kind, value in events if kind == "audio"]
+    assert audio == ["First sentence here.", "Second one is longer.", "Third."]
+    assert "".join(value for kind, value in events if kind == "text").strip() == "First sentence here. Second one is longer. Third."